@@ -0,0 +1,78 @@
+"""
+Authentification JWT sans lecture de la table users à chaque requête.
+
+Les jetons portent la version de jeton de l'utilisateur (claim 'ver',
+CustomUser.token_version). CachedJWTAuthentication cherche l'utilisateur en
+cache sous auth:user:<id>:<version> ; à défaut, elle le lit en base et ne le
+met en cache (AUTH_USER_CACHE['TTL']) que si la version du jeton est la
+version courante. Incrémenter token_version révoque donc tous les jetons
+émis jusque-là : un jeton d'une ancienne version manque le cache puis est
+refusé après lecture en base.
+
+Tout enregistrement d'un utilisateur (rôle, is_active, mot de passe...)
+efface ses entrées du cache (accounts/signals.py). Avec un cache local au
+processus (sans CACHE_URL), les autres workers ne voient la modification
+qu'à l'expiration du TTL : d'où un TTL court.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+VERSION_CLAIM = 'ver'
+
+
+def _cache_key(user_id, version):
+    return f'auth:user:{user_id}:{version}'
+
+
+def token_version(token):
+    # Jetons émis avant l'ajout du claim : version initiale
+    return token.get(VERSION_CLAIM, 0)
+
+
+def invalidate_user(user):
+    """Efface l'utilisateur du cache, après validation de la transaction."""
+    # Version courante et précédente (revoke_tokens vient peut-être de l'incrémenter)
+    keys = [_cache_key(user.pk, version) for version in {user.token_version, user.token_version - 1} if version >= 0]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def revoke_tokens(user, update_fields=()):
+    """Invalide tous les jetons émis pour `user` ; enregistre aussi `update_fields`."""
+    user.token_version += 1
+    user.save(update_fields=['token_version', 'updated_at', *update_fields])
+
+
+class VersionedRefreshToken(RefreshToken):
+    """Jeton de rafraîchissement portant la version de jeton ; l'accès l'hérite."""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token[VERSION_CLAIM] = user.token_version
+        return token
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken("Le jeton ne désigne aucun utilisateur")
+
+        version = token_version(validated_token)
+        key = _cache_key(user_id, version)
+        user = cache.get(key)
+        if user is not None:
+            return user
+
+        user = super().get_user(validated_token)
+        if user.token_version != version:
+            raise AuthenticationFailed("Jeton révoqué", code='token_revoked')
+        cache.set(key, user, settings.AUTH_USER_CACHE['TTL'])
+        return user
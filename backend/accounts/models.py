@@ -11,6 +11,8 @@ class CustomUser(AbstractUser):
     phone = models.CharField(max_length=20, blank=True)
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='vendeur')
     avatar = models.ImageField(upload_to='avatars/', blank=True, null=True)
+    # Incrémentée pour révoquer tous les jetons JWT émis (accounts/authentication.py)
+    token_version = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
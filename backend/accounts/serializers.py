@@ -1,6 +1,10 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from .authentication import VersionedRefreshToken, token_version
 
 User = get_user_model()
 
@@ -40,3 +44,21 @@ class PasswordResetConfirmSerializer(serializers.Serializer):
         if attrs['password'] != attrs['password2']:
             raise serializers.ValidationError({"password": "Les mots de passe ne correspondent pas."})
         return attrs
+
+class VersionedTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = VersionedRefreshToken
+
+class VersionedTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refuse de rafraîchir un jeton révoqué (version dépassée) ou d'un compte désactivé."""
+    token_class = VersionedRefreshToken
+    
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        current = (
+            User.objects.filter(pk=refresh[api_settings.USER_ID_CLAIM], is_active=True)
+            .values_list('token_version', flat=True)
+            .first()
+        )
+        if current is None or current != token_version(refresh):
+            raise AuthenticationFailed("Jeton révoqué", code='token_revoked')
+        return super().validate(attrs)
@@ -0,0 +1,35 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.tokens import default_token_generator
+from django.test import TestCase
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from rest_framework.test import APIClient
+
+from .authentication import VersionedRefreshToken
+
+User = get_user_model()
+
+
+class PasswordResetTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='vendeur', email='vendeur@example.com', password='Ancien-mot-2024')
+        self.api = APIClient()
+
+    def test_reset_revokes_issued_tokens(self):
+        access = str(VersionedRefreshToken.for_user(self.user).access_token)
+        self.api.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.assertEqual(self.api.get('/api/auth/me/').status_code, 200)
+
+        # Entrées du cache d'authentification effacées au commit
+        with self.captureOnCommitCallbacks(execute=True):
+            response = APIClient().post('/api/auth/password-reset-confirm/', {
+                'uid': urlsafe_base64_encode(force_bytes(self.user.pk)),
+                'token': default_token_generator.make_token(self.user),
+                'password': 'Nouveau-mot-2024', 'password2': 'Nouveau-mot-2024',
+            }, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.token_version, 1)
+        self.assertTrue(self.user.check_password('Nouveau-mot-2024'))
+        self.assertEqual(self.api.get('/api/auth/me/').status_code, 401)
@@ -2,13 +2,13 @@ from rest_framework import generics, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import get_user_model
 from django.core.mail import send_mail
 from django.conf import settings
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
+from .authentication import VersionedRefreshToken, revoke_tokens
 from .serializers import UserSerializer, RegisterSerializer, PasswordResetRequestSerializer, PasswordResetConfirmSerializer
 
 User = get_user_model()
@@ -23,7 +23,7 @@ class RegisterView(generics.CreateAPIView):
         serializer.is_valid(raise_exception=True)
         user = serializer.save()
         
-        refresh = RefreshToken.for_user(user)
+        refresh = VersionedRefreshToken.for_user(user)
         
         return Response({
             'user': UserSerializer(user).data,
@@ -69,7 +69,8 @@ def password_reset_confirm(request):
         
         if default_token_generator.check_token(user, serializer.validated_data['token']):
             user.set_password(serializer.validated_data['password'])
-            user.save()
+            # Révoque les jetons émis avant la réinitialisation
+            revoke_tokens(user, update_fields=['password'])
             return Response({'message': 'Mot de passe réinitialisé avec succès.'}, status=status.HTTP_200_OK)
         else:
             return Response({'error': 'Token invalide.'}, status=status.HTTP_400_BAD_REQUEST)
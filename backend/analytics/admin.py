@@ -1,2 +1,17 @@
 from django.contrib import admin
-# Analytics app n'a pas de modèles
+from .models import DailySalesSummary, DailyProductSales
+
+
+@admin.register(DailySalesSummary)
+class DailySalesSummaryAdmin(admin.ModelAdmin):
+    list_display = ['date', 'store', 'payment_method', 'order_count', 'revenue_ttc']
+    list_filter = ['store', 'payment_method']
+    date_hierarchy = 'date'
+
+
+@admin.register(DailyProductSales)
+class DailyProductSalesAdmin(admin.ModelAdmin):
+    list_display = ['date', 'store', 'product', 'quantity', 'revenue_ttc']
+    list_filter = ['store']
+    list_select_related = ['product']
+    date_hierarchy = 'date'
@@ -0,0 +1,140 @@
+"""
+Maintenance des agrégats de ventes journaliers.
+
+apply_order() ajoute (sign=1) ou retire (sign=-1) une commande des agrégats
+en quatre requêtes, quel que soit son nombre de lignes : les lignes
+manquantes sont créées à zéro (INSERT ... ON CONFLICT DO NOTHING) puis
+incrémentées par un UPDATE avec F(), ce qui reste correct quand deux caisses
+valident en même temps.
+"""
+
+from collections import OrderedDict
+from datetime import datetime, time
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, IntegerField, Q, Sum, Value, When
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from orders.models import Order, OrderItem
+from .models import DailyProductSales, DailySalesSummary
+
+
+def order_day(order):
+    return timezone.localdate(order.completed_at or order.created_at)
+
+
+def _per_product(items):
+    totals = OrderedDict()
+    for item in items:
+        quantity, ht, ttc = totals.get(item.product_id, (0, Decimal('0'), Decimal('0')))
+        totals[item.product_id] = (
+            quantity + item.quantity,
+            ht + item.subtotal_ht,
+            ttc + item.subtotal_ttc,
+        )
+    return totals
+
+
+def _case(values, output_field):
+    return Case(
+        *[When(product_id=pk, then=Value(value)) for pk, value in values.items()],
+        output_field=output_field,
+    )
+
+
+def apply_order(order, items, sign=1):
+    day = order_day(order)
+    
+    key = {'date': day, 'store': order.store_id, 'payment_method': order.payment_method}
+    DailySalesSummary.objects.bulk_create([DailySalesSummary(**key)], ignore_conflicts=True)
+    DailySalesSummary.objects.filter(**key).update(
+        order_count=F('order_count') + sign,
+        revenue_ht=F('revenue_ht') + sign * order.subtotal_ht,
+        total_tva=F('total_tva') + sign * order.total_tva,
+        revenue_ttc=F('revenue_ttc') + sign * order.total_ttc,
+        updated_at=timezone.now(),
+    )
+    
+    totals = _per_product(items)
+    if not totals:
+        return
+    DailyProductSales.objects.bulk_create(
+        [DailyProductSales(date=day, store=order.store_id, product_id=pk) for pk in totals],
+        ignore_conflicts=True,
+    )
+    money = DecimalField(max_digits=14, decimal_places=2)
+    DailyProductSales.objects.filter(date=day, store=order.store_id, product_id__in=totals.keys()).update(
+        quantity=F('quantity') + _case({pk: sign * t[0] for pk, t in totals.items()}, IntegerField()),
+        revenue_ht=F('revenue_ht') + _case({pk: sign * t[1] for pk, t in totals.items()}, money),
+        revenue_ttc=F('revenue_ttc') + _case({pk: sign * t[2] for pk, t in totals.items()}, money),
+        updated_at=timezone.now(),
+    )
+
+
+def _completed_between(prefix, start, end):
+    """Filtre des commandes terminées dont la date de vente est dans [start, end[."""
+    completed_at, created_at = f'{prefix}completed_at', f'{prefix}created_at'
+    return Q(**{f'{prefix}status': 'completed'}) & (
+        Q(**{f'{completed_at}__gte': start, f'{completed_at}__lt': end})
+        | Q(**{f'{completed_at}__isnull': True, f'{created_at}__gte': start, f'{created_at}__lt': end})
+    )
+
+
+def rebuild_range(start_day, end_day):
+    """Recalcule les agrégats des jours [start_day, end_day[ par requêtes groupées."""
+    tz = timezone.get_current_timezone()
+    start = timezone.make_aware(datetime.combine(start_day, time.min), tz)
+    end = timezone.make_aware(datetime.combine(end_day, time.min), tz)
+    
+    summaries = (
+        Order.objects
+        .filter(_completed_between('', start, end))
+        .annotate(day=TruncDate(Coalesce('completed_at', 'created_at')))
+        .values('day', 'store', 'payment_method')
+        .annotate(
+            order_count=Count('id'),
+            revenue_ht=Sum('subtotal_ht'),
+            total_tva=Sum('total_tva'),
+            revenue_ttc=Sum('total_ttc'),
+        )
+        .order_by()
+    )
+    product_sales = (
+        OrderItem.objects
+        .filter(_completed_between('order__', start, end))
+        .annotate(day=TruncDate(Coalesce('order__completed_at', 'order__created_at')))
+        .values('day', 'order__store', 'product_id')
+        .annotate(
+            total_quantity=Sum('quantity'),
+            total_ht=Sum('subtotal_ht'),
+            total_ttc=Sum('subtotal_ttc'),
+        )
+        .order_by()
+    )
+    
+    with transaction.atomic():
+        DailySalesSummary.objects.filter(date__gte=start_day, date__lt=end_day).delete()
+        DailyProductSales.objects.filter(date__gte=start_day, date__lt=end_day).delete()
+        DailySalesSummary.objects.bulk_create(
+            [
+                DailySalesSummary(
+                    date=row['day'], store=row['store'], payment_method=row['payment_method'],
+                    order_count=row['order_count'], revenue_ht=row['revenue_ht'],
+                    total_tva=row['total_tva'], revenue_ttc=row['revenue_ttc'],
+                )
+                for row in summaries.iterator()
+            ],
+            batch_size=1000,
+        )
+        DailyProductSales.objects.bulk_create(
+            (
+                DailyProductSales(
+                    date=row['day'], store=row['order__store'], product_id=row['product_id'],
+                    quantity=row['total_quantity'], revenue_ht=row['total_ht'], revenue_ttc=row['total_ttc'],
+                )
+                for row in product_sales.iterator()
+            ),
+            batch_size=1000,
+        )
@@ -0,0 +1,67 @@
+"""
+Cache des rapports analytiques.
+
+Chaque rapport est mis en cache par (nom, période, granularité, magasin).
+La clé inclut le numéro de génération de chaque mois couvert : une commande
+validée ou annulée incrémente la génération de son mois, ce qui invalide
+uniquement les rapports dont la période contient ce mois.
+"""
+
+import hashlib
+from datetime import date
+
+from django.core.cache import cache
+
+REPORT_TIMEOUT = 60 * 60
+GENERATION_TIMEOUT = None
+CANCELLATIONS = 'cancellations'
+
+
+def _generation_key(scope):
+    return f'analytics:generation:{scope}'
+
+
+def month_scope(day):
+    return f'{day.year:04d}-{day.month:02d}'
+
+
+def months_between(start, end):
+    """Mois (AAAA-MM) couverts par la période [start, end]."""
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        yield month_scope(date(year, month, 1))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def bump(scope):
+    key = _generation_key(scope)
+    if cache.add(key, 1, GENERATION_TIMEOUT):
+        return
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Clé expirée entre add() et incr()
+        cache.set(key, 1, GENERATION_TIMEOUT)
+
+
+def invalidate_day(day, cancelled=False):
+    bump(month_scope(day))
+    if cancelled:
+        bump(CANCELLATIONS)
+
+
+def cached_report(name, start, end, params, compute, extra_scopes=()):
+    scopes = list(months_between(start, end)) + list(extra_scopes)
+    keys = [_generation_key(scope) for scope in scopes]
+    generations = cache.get_many(keys)
+    fingerprint = '|'.join(
+        [name, start.isoformat(), end.isoformat()]
+        + [f'{k}={v}' for k, v in sorted(params.items())]
+        + [str(generations.get(key, 0)) for key in keys]
+    )
+    key = 'analytics:report:' + hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()
+    report = cache.get(key)
+    if report is None:
+        report = compute()
+        cache.set(key, report, REPORT_TIMEOUT)
+    return report
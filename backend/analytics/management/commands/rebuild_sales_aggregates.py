@@ -0,0 +1,40 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+
+from analytics.aggregates import rebuild_range
+from orders.models import Order
+
+
+class Command(BaseCommand):
+    help = "Recalcule les agrégats de ventes journaliers à partir des commandes, par tranches de jours"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='start', type=date.fromisoformat, help="Premier jour (AAAA-MM-JJ)")
+        parser.add_argument('--to', dest='end', type=date.fromisoformat, help="Dernier jour inclus (AAAA-MM-JJ)")
+        parser.add_argument('--chunk-days', type=int, default=31, help="Nombre de jours par transaction")
+
+    def handle(self, *args, **options):
+        start, end = options['start'], options['end']
+        if start is None or end is None:
+            first = Order.objects.aggregate(first=Min('created_at'))['first']
+            if first is None:
+                self.stdout.write("Aucune commande : rien à recalculer")
+                return
+            start = start or timezone.localdate(first)
+            end = end or timezone.localdate()
+        if end < start:
+            raise CommandError("--to doit être postérieur à --from")
+        if options['chunk_days'] < 1:
+            raise CommandError("--chunk-days doit être positif")
+
+        chunk = timedelta(days=options['chunk_days'])
+        current = start
+        while current <= end:
+            chunk_end = min(current + chunk, end + timedelta(days=1))
+            rebuild_range(current, chunk_end)
+            self.stdout.write(f"  {current} -> {chunk_end - timedelta(days=1)}")
+            current = chunk_end
+        self.stdout.write(self.style.SUCCESS("Agrégats de ventes recalculés"))
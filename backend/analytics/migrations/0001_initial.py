@@ -0,0 +1,67 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('products', '0002_product_size'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyProductSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('store', models.CharField(max_length=20)),
+                ('quantity', models.IntegerField(default=0)),
+                ('revenue_ht', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('revenue_ttc', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'daily_product_sales',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailySalesSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('store', models.CharField(max_length=20)),
+                ('payment_method', models.CharField(max_length=20)),
+                ('order_count', models.IntegerField(default=0)),
+                ('revenue_ht', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_tva', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('revenue_ttc', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'daily_sales_summaries',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailysalessummary',
+            constraint=models.UniqueConstraint(fields=('date', 'store', 'payment_method'), name='daily_sales_summary_unique'),
+        ),
+        migrations.AddField(
+            model_name='dailyproductsales',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='products.product'),
+        ),
+        migrations.AddIndex(
+            model_name='dailyproductsales',
+            index=models.Index(fields=['product', 'date'], name='daily_produ_product_f84a03_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailyproductsales',
+            constraint=models.UniqueConstraint(fields=('date', 'store', 'product'), name='daily_product_sales_unique'),
+        ),
+    ]
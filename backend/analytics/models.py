@@ -0,0 +1,52 @@
+from django.db import models
+from products.models import Product
+
+
+class DailySalesSummary(models.Model):
+    """Chiffre d'affaires agrégé par jour, magasin et moyen de paiement."""
+    date = models.DateField()
+    store = models.CharField(max_length=20)
+    payment_method = models.CharField(max_length=20)
+    
+    order_count = models.IntegerField(default=0)
+    revenue_ht = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_tva = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    revenue_ttc = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'daily_sales_summaries'
+        ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'store', 'payment_method'], name='daily_sales_summary_unique'),
+        ]
+    
+    def __str__(self):
+        return f"{self.date} {self.store} {self.payment_method}"
+
+
+class DailyProductSales(models.Model):
+    """Quantités et chiffre d'affaires agrégés par jour, magasin et produit."""
+    date = models.DateField()
+    store = models.CharField(max_length=20)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='daily_sales')
+    
+    quantity = models.IntegerField(default=0)
+    revenue_ht = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    revenue_ttc = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'daily_product_sales'
+        ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'store', 'product'], name='daily_product_sales_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['product', 'date']),
+        ]
+    
+    def __str__(self):
+        return f"{self.date} {self.store} {self.product_id}"
@@ -0,0 +1,140 @@
+"""
+Rapports analytiques calculés par la base (GROUP BY sur des Trunc*).
+
+Les ventes et les produits sont lus dans les agrégats journaliers, les
+clients dans les commandes (index orders(client, created_at)). Tous datent
+une vente de sa validation, à défaut de sa création (aggregates.order_day) :
+c'est aussi le mois dont la génération est incrémentée (cache.py).
+"""
+
+from datetime import datetime, time, timedelta
+
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce, TruncDay, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from orders.models import Order
+from .models import DailyProductSales, DailySalesSummary
+
+# Date d'une vente, comme aggregates.order_day()
+SOLD_AT = Coalesce('completed_at', 'created_at')
+
+TRUNCATIONS = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+
+def _day_bounds(start, end):
+    tz = timezone.get_current_timezone()
+    return (
+        timezone.make_aware(datetime.combine(start, time.min), tz),
+        timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min), tz),
+    )
+
+
+def _period(value):
+    if isinstance(value, datetime):
+        value = timezone.localtime(value).date()
+    return value
+
+
+def sales_report(start, end, granularity, store=None):
+    """Chiffre d'affaires par période et par magasin."""
+    queryset = DailySalesSummary.objects.filter(date__gte=start, date__lte=end)
+    if store:
+        queryset = queryset.filter(store=store)
+    rows = (
+        queryset
+        .annotate(period=TRUNCATIONS[granularity]('date'))
+        .values('period', 'store')
+        .annotate(
+            order_count=Sum('order_count'),
+            revenue_ht=Sum('revenue_ht'),
+            total_tva=Sum('total_tva'),
+            revenue_ttc=Sum('revenue_ttc'),
+        )
+        .order_by('period', 'store')
+    )
+    return [dict(row, period=_period(row['period'])) for row in rows]
+
+
+def product_report(start, end, store=None, order_by='quantity', limit=20):
+    """Meilleures ventes de la période, par quantité ou par marge."""
+    queryset = DailyProductSales.objects.filter(date__gte=start, date__lte=end)
+    if store:
+        queryset = queryset.filter(store=store)
+    money = DecimalField(max_digits=14, decimal_places=2)
+    rows = (
+        queryset
+        .values('product_id', 'product__reference', 'product__name', 'product__purchase_price_ht')
+        .annotate(
+            quantity_sold=Sum('quantity'),
+            revenue_ht=Sum('revenue_ht'),
+            revenue_ttc=Sum('revenue_ttc'),
+        )
+        .annotate(
+            # Marge calculée sur le prix d'achat actuel ; nulle si inconnu
+            margin_ht=ExpressionWrapper(
+                F('revenue_ht') - F('quantity_sold') * F('product__purchase_price_ht'),
+                output_field=money,
+            ),
+        )
+        .filter(quantity_sold__gt=0)
+    )
+    if order_by == 'margin':
+        rows = rows.order_by(F('margin_ht').desc(nulls_last=True), 'product_id')
+    else:
+        rows = rows.order_by('-quantity_sold', 'product_id')
+    return [
+        {
+            'product_id': row['product_id'],
+            'reference': row['product__reference'],
+            'name': row['product__name'],
+            'quantity_sold': row['quantity_sold'],
+            'revenue_ht': row['revenue_ht'],
+            'revenue_ttc': row['revenue_ttc'],
+            'margin_ht': row['margin_ht'],
+        }
+        for row in rows[:limit]
+    ]
+
+
+def client_report(start, end, granularity, store=None):
+    """
+    Clients nouveaux / fidèles par période.
+
+    Un client est « nouveau » sur une période si son premier achat terminé
+    tombe dans cette période, « fidèle » s'il avait déjà acheté avant.
+    """
+    range_start, range_end = _day_bounds(start, end)
+    first_purchase = (
+        Order.objects
+        .filter(client=OuterRef('client'), status='completed')
+        .annotate(sold_at=SOLD_AT)
+        .order_by('sold_at')
+        .values('sold_at')[:1]
+    )
+    queryset = (
+        Order.objects.filter(status='completed')
+        .annotate(sold_at=SOLD_AT)
+        .filter(sold_at__gte=range_start, sold_at__lt=range_end)
+    )
+    if store:
+        queryset = queryset.filter(store=store)
+    rows = (
+        queryset
+        .annotate(
+            period=TRUNCATIONS[granularity]('sold_at'),
+            first_purchase=Subquery(first_purchase),
+        )
+        .values('period')
+        .annotate(
+            order_count=Count('id'),
+            new_clients=Count('client', distinct=True, filter=Q(first_purchase__gte=F('period'))),
+            returning_clients=Count('client', distinct=True, filter=Q(first_purchase__lt=F('period'))),
+        )
+        .order_by('period')
+    )
+    return [dict(row, period=_period(row['period'])) for row in rows]
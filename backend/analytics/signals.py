@@ -0,0 +1,21 @@
+from django.db import transaction
+from django.dispatch import receiver
+
+from orders.signals import order_cancelled, order_completed
+from .aggregates import apply_order, order_day
+from .cache import invalidate_day
+
+
+@receiver(order_completed)
+def add_order_to_aggregates(sender, order, items, **kwargs):
+    apply_order(order, items, sign=1)
+    day = order_day(order)
+    # Après le commit : un rapport recalculé entre-temps verrait l'ancien état
+    transaction.on_commit(lambda: invalidate_day(day))
+
+
+@receiver(order_cancelled)
+def remove_order_from_aggregates(sender, order, items, **kwargs):
+    apply_order(order, items, sign=-1)
+    day = order_day(order)
+    transaction.on_commit(lambda: invalidate_day(day, cancelled=True))
@@ -0,0 +1,49 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from clients.models import Client
+from orders.models import Order
+
+User = get_user_model()
+
+
+class ClientReportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='gerant', email='gerant@example.com', password='gerant')
+        client = Client.objects.create(first_name='Anne', last_name='Durand', email='anne@example.com', phone='0100000000')
+        cls.order = Order.objects.create(
+            order_number='TEST-1', client=client, user=cls.user, store_id='garches', status='pending',
+            subtotal_ht=Decimal('100.00'), total_tva=Decimal('20.00'), total_ttc=Decimal('120.00'),
+        )
+        # Commande ouverte le mois précédent, validée ce mois-ci
+        today = timezone.localdate()
+        cls.month_start = today.replace(day=1)
+        Order.objects.filter(pk=cls.order.pk).update(created_at=timezone.now() - timedelta(days=today.day + 1))
+
+    def setUp(self):
+        cache.clear()
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def report(self):
+        response = self.api.get('/api/analytics/clients/', {'from': self.month_start.isoformat()})
+        self.assertEqual(response.status_code, 200)
+        return response.data['results']
+
+    def test_sale_dated_by_completion_and_cache_invalidated(self):
+        self.assertEqual(self.report(), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.api.patch(f'/api/orders/{self.order.pk}/', {'status': 'completed'}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        [row] = self.report()
+        self.assertEqual(row['period'], self.month_start)
+        self.assertEqual(row['order_count'], 1)
+        self.assertEqual(row['new_clients'], 1)
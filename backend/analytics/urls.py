@@ -3,4 +3,7 @@ from . import views
 
 urlpatterns = [
     path('dashboard/', views.dashboard_stats, name='dashboard'),
+    path('sales/', views.sales_stats, name='sales-stats'),
+    path('products/', views.product_stats, name='product-stats'),
+    path('clients/', views.client_stats, name='client-stats'),
 ]
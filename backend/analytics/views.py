@@ -1,23 +1,110 @@
+from datetime import date, timedelta
+
+from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from django.db.models import Sum, Count
+from django.db.models import F, Sum
+from django.utils import timezone
 from orders.models import Order
 from products.models import Product
 from clients.models import Client
+from .cache import CANCELLATIONS, cached_report
+from .models import DailySalesSummary
+from .reports import TRUNCATIONS, client_report, product_report, sales_report
+
+MAX_RANGE_DAYS = 3 * 366
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def dashboard_stats(request):
+    # Les totaux de ventes sont lus dans les agrégats journaliers, dont la
+    # taille ne dépend pas du nombre de commandes
+    sales = DailySalesSummary.objects.aggregate(
+        revenue=Sum('revenue_ttc'),
+        orders=Sum('order_count'),
+    )
     stats = {
-        'totalRevenue': Order.objects.filter(status='completed').aggregate(Sum('total_ttc'))['total_ttc__sum'] or 0,
-        'totalOrders': Order.objects.count(),
+        'totalRevenue': sales['revenue'] or 0,
+        'totalOrders': sales['orders'] or 0,
         'totalClients': Client.objects.filter(is_active=True).count(),
         'totalProducts': Product.objects.filter(is_active=True).count(),
-        'lowStockProducts': list(Product.objects.filter(total_stock__lte=5).values('id', 'name', 'reference', 'total_stock')[:10]),
+        'lowStockProducts': list(
+            # Index partiel products_low_stock_idx
+            Product.objects
+            .filter(is_active=True, total_stock__lte=F('alert_stock'))
+            .order_by('total_stock')
+            .values('id', 'name', 'reference', 'total_stock')[:10]
+        ),
         'recentOrders': list(Order.objects.select_related('client').order_by('-created_at')[:10].values(
             'id', 'order_number', 'client__first_name', 'client__last_name', 'store', 'total_ttc', 'status'
         ))
     }
     return Response(stats)
+
+
+def _report_params(request, default_granularity='day'):
+    """Lit from/to/granularity/store ; lève ValueError si invalide."""
+    params = request.query_params
+    end = date.fromisoformat(params['to']) if params.get('to') else timezone.localdate()
+    start = date.fromisoformat(params['from']) if params.get('from') else end - timedelta(days=29)
+    if start > end:
+        raise ValueError("'from' doit précéder 'to'")
+    if (end - start).days > MAX_RANGE_DAYS:
+        raise ValueError(f"Période limitée à {MAX_RANGE_DAYS} jours")
+    granularity = params.get('granularity', default_granularity)
+    if granularity not in TRUNCATIONS:
+        raise ValueError(f"Granularité inconnue : {granularity}")
+    return start, end, granularity, params.get('store') or None
+
+
+def _report_response(name, request, compute, default_granularity='day', extra_scopes=(), **extra_params):
+    try:
+        start, end, granularity, store = _report_params(request, default_granularity)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    params = dict(extra_params, granularity=granularity, store=store or '')
+    results = cached_report(
+        name, start, end, params,
+        lambda: compute(start, end, granularity, store),
+        extra_scopes=extra_scopes,
+    )
+    return Response({
+        'from': start,
+        'to': end,
+        'granularity': granularity,
+        'store': store,
+        'results': results,
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def sales_stats(request):
+    return _report_response('sales', request, sales_report)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def product_stats(request):
+    order_by = request.query_params.get('order_by', 'quantity')
+    if order_by not in ('quantity', 'margin'):
+        return Response({'error': "order_by : 'quantity' ou 'margin'"}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+    except ValueError:
+        return Response({'error': 'limit invalide'}, status=status.HTTP_400_BAD_REQUEST)
+    return _report_response(
+        'products', request,
+        lambda start, end, granularity, store: product_report(start, end, store, order_by, limit),
+        order_by=order_by, limit=limit,
+    )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def client_stats(request):
+    # Une annulation peut changer le premier achat d'un client, donc la
+    # répartition nouveaux / fidèles de périodes postérieures
+    return _report_response('clients', request, client_report, default_granularity='month', extra_scopes=[CANCELLATIONS])
@@ -0,0 +1,57 @@
+"""
+Jeu de données synthétique des mesures de performance.
+
+seed_benchmark_data le crée, run_benchmarks le lit. Toutes ses lignes sont
+repérables par PREFIX (références produit, e-mails clients, numéros de
+commande et de facture) : les mesures tirent leurs échantillons parmi elles.
+À lancer sur une base dédiée, jamais sur la production :
+
+    DATABASE_URL=postgres://.../bench python manage.py migrate
+    DATABASE_URL=postgres://.../bench python manage.py seed_benchmark_data
+    DATABASE_URL=postgres://.../bench python manage.py run_benchmarks --output baseline.json
+"""
+
+from contextlib import contextmanager
+
+PREFIX = 'BENCH'
+USERNAME = 'benchmark'
+EMAIL_DOMAIN = 'bench.example.com'
+
+BRANDS = ['Origine', 'Lapierre', 'Cannondale', 'Shimano', 'Giant', 'Trek', 'Look', 'Time', 'Mavic', 'Abus']
+FAMILIES = {
+    'bike': ['Vélo route', 'VTT', 'Vélo électrique', 'Gravel', 'Vélo ville'],
+    'accessory': ['Casque', 'Antivol', 'Éclairage', 'Sacoche', 'Compteur'],
+    'part': ['Chaîne', 'Cassette', 'Pneu', 'Chambre à air', 'Plaquettes', 'Dérailleur'],
+}
+FIRST_NAMES = ['Camille', 'Léa', 'Manon', 'Chloé', 'Louis', 'Hugo', 'Lucas', 'Jules', 'Nathan', 'Inès', 'Paul', 'Emma']
+LAST_NAMES = ['Martin', 'Bernard', 'Dubois', 'Thomas', 'Robert', 'Richard', 'Petit', 'Durand', 'Leroy', 'Moreau']
+CITIES = ["Ville-d'Avray", 'Garches', 'Saint-Cloud', 'Sèvres', 'Chaville', 'Rueil-Malmaison', 'Versailles']
+
+
+def reference(i):
+    return f'{PREFIX}-{i:06d}'
+
+
+def barcode(i):
+    return f'{PREFIX}{i:09d}'
+
+
+@contextmanager
+def explicit_dates(*fields):
+    """
+    Laisse bulk_create écrire les dates fournies : auto_now_add les
+    remplacerait par l'heure courante.
+
+        with explicit_dates((Order, 'created_at')):
+            Order.objects.bulk_create(orders)
+    """
+    saved = []
+    for model, name in fields:
+        field = model._meta.get_field(name)
+        saved.append((field, field.auto_now_add))
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, value in saved:
+            field.auto_now_add = value
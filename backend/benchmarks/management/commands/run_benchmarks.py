@@ -0,0 +1,258 @@
+import json
+import platform
+import re
+import statistics
+import time
+from itertools import cycle
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from benchmarks import dataset
+from clients.models import Client
+from inventory.models import Store
+from invoices.models import Invoice
+from orders.models import Order
+from products.models import Product
+
+User = get_user_model()
+
+# Nombre de requêtes SQL, lu dans l'en-tête Server-Timing (bike_erp/metrics.py)
+QUERIES_PATTERN = re.compile(r'desc="(\d+) req\. SQL"')
+DB_PATTERN = re.compile(r'db;dur=([\d.]+)')
+SAMPLE_SIZE = 200
+
+
+class Case:
+    """
+    Un endpoint mesuré. `request(client, sample)` envoie une requête ;
+    `write` : la requête est annulée (rollback) pour laisser le jeu intact.
+    """
+
+    def __init__(self, name, request, write=False, prepare=None):
+        self.name = name
+        self.request = request
+        self.write = write
+        self.prepare = prepare
+
+
+def _checkout(client, sample):
+    products = next(sample['baskets'])
+    return client.post('/api/orders/', {
+        'client': next(sample['clients']),
+        'store': sample['store'],
+        'payment_method': 'card',
+        'items': [
+            {
+                'product': product.pk, 'quantity': 1,
+                'unit_price_ht': str(product.price_ht),
+                'unit_price_ttc': str(product.price_ttc),
+                'tva_rate': str(product.tva_rate),
+            }
+            for product in products
+        ],
+    }, format='json')
+
+
+def _reset_pdf(sample):
+    # Facture à rendre : sinon le PDF en cache serait renvoyé sans rendu
+    invoice = next(sample['invoices'])
+    Invoice.objects.filter(pk=invoice).update(pdf_status='not_generated', pdf_content_hash='')
+    sample['invoice'] = invoice
+
+
+CASES = [
+    Case('products-list', lambda client, sample: client.get('/api/products/')),
+    Case('products-list-compact', lambda client, sample: client.get('/api/products/?compact=1')),
+    Case('products-search', lambda client, sample: client.get(f"/api/products/?search={next(sample['terms'])}")),
+    Case('products-suggest', lambda client, sample: client.get(f"/api/products/suggest/?q={next(sample['terms'])}")),
+    Case('barcode-lookup', lambda client, sample: client.get(f"/api/products/barcode/{next(sample['barcodes'])}/")),
+    Case('checkout', _checkout, write=True),
+    Case('orders-list', lambda client, sample: client.get('/api/orders/')),
+    Case('orders-list-compact', lambda client, sample: client.get('/api/orders/?compact=1')),
+    Case('dashboard', lambda client, sample: client.get('/api/analytics/dashboard/')),
+    # Rendu synchrone (tâche Celery en mode eager) déclenché par le téléchargement
+    Case('invoice-pdf', lambda client, sample: client.get(f"/api/invoices/{sample['invoice']}/download/"),
+         prepare=_reset_pdf),
+]
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure les endpoints critiques (catalogue, recherche, code-barres, caisse, "
+        "commandes, tableau de bord, PDF) sur le jeu de seed_benchmark_data, via le "
+        "client de test. --output écrit les résultats en JSON ; --compare les confronte "
+        "à une référence et échoue si une médiane régresse au-delà de --threshold."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--only', nargs='+', metavar='CAS', help="Cas à mesurer (par défaut : tous)")
+        parser.add_argument('--output', help="Fichier JSON où écrire les résultats (référence)")
+        parser.add_argument('--compare', help="Fichier JSON de référence à comparer")
+        parser.add_argument(
+            '--threshold', type=float, default=0.2,
+            help="Régression tolérée sur la médiane, en fraction (0.2 = +20 %%)",
+        )
+
+    def handle(self, *args, **options):
+        names = [case.name for case in CASES]
+        unknown = set(options['only'] or ()) - set(names)
+        if unknown:
+            raise CommandError(f"Cas inconnu(s) : {', '.join(sorted(unknown))} (disponibles : {', '.join(names)})")
+        if options['iterations'] < 1:
+            raise CommandError("--iterations doit être positif")
+        cases = [case for case in CASES if not options['only'] or case.name in options['only']]
+        baseline = self.load(options['compare']) if options['compare'] else None
+
+        user = User.objects.filter(username=dataset.USERNAME).first()
+        if user is None:
+            raise CommandError("Jeu de données absent : lancer d'abord seed_benchmark_data")
+        sample = self.sample()
+        client = APIClient()
+        client.force_authenticate(user)
+
+        setup_test_environment()
+        try:
+            # Rendu PDF dans le processus ; budgets de requêtes sans effet sur les temps
+            with override_settings(CELERY_TASK_ALWAYS_EAGER=True, QUERY_BUDGET='off'):
+                results = {}
+                for case in cases:
+                    results[case.name] = self.measure(case, client, sample, options['warmup'], options['iterations'])
+                    self.report(case.name, results[case.name], baseline)
+        finally:
+            teardown_test_environment()
+
+        report = {
+            'meta': {
+                'date': timezone.now().isoformat(),
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'iterations': options['iterations'],
+                'dataset': {
+                    'products': Product.objects.count(),
+                    'clients': Client.objects.count(),
+                    'orders': Order.objects.count(),
+                },
+            },
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as handle:
+                json.dump(report, handle, indent=2, ensure_ascii=False)
+            self.stdout.write(f"Résultats écrits dans {options['output']}")
+        if baseline is not None:
+            self.compare(results, baseline, options['threshold'])
+
+    def sample(self):
+        """Échantillons du jeu de données, parcourus en boucle par les mesures."""
+        store = Store.objects.filter(is_active=True).values_list('code', flat=True).first()
+        products = list(
+            Product.objects.filter(
+                reference__startswith=f'{dataset.PREFIX}-', is_active=True,
+                store_stocks__store=store, store_stocks__quantity__gte=5,
+            )
+            .order_by('?')[:SAMPLE_SIZE]
+        )
+        clients = list(
+            Client.objects.filter(email__endswith=f'@{dataset.EMAIL_DOMAIN}')
+            .order_by('?').values_list('pk', flat=True)[:SAMPLE_SIZE]
+        )
+        invoices = list(
+            Invoice.objects.filter(invoice_number__startswith=f'{dataset.PREFIX}-')
+            .order_by('?').values_list('pk', flat=True)[:SAMPLE_SIZE]
+        )
+        if not products or not clients or not invoices:
+            raise CommandError("Jeu de données incomplet : relancer seed_benchmark_data sur une base vide")
+        terms = sorted({word.lower() for product in products for word in product.name.split()[:2]})
+        return {
+            'barcodes': cycle([product.barcode for product in products]),
+            'terms': cycle(terms),
+            'clients': cycle(clients),
+            'invoices': cycle(invoices),
+            # Paniers de 1 à 4 articles en stock dans le magasin
+            'baskets': cycle([products[i:i + 1 + i % 4] for i in range(len(products))]),
+            'store': store,
+        }
+
+    def measure(self, case, client, sample, warmup, iterations):
+        durations, queries, db_times = [], [], []
+        for iteration in range(warmup + iterations):
+            if case.prepare:
+                case.prepare(sample)
+            start = time.perf_counter()
+            if case.write:
+                with transaction.atomic():
+                    response = case.request(client, sample)
+                    elapsed = time.perf_counter() - start
+                    transaction.set_rollback(True)
+            else:
+                response = case.request(client, sample)
+                elapsed = time.perf_counter() - start
+            if response.status_code >= 400:
+                raise CommandError(f"{case.name} : HTTP {response.status_code} {getattr(response, 'data', '')}")
+            if iteration < warmup:
+                continue
+            durations.append(elapsed * 1000)
+            timing = response.get('Server-Timing', '')
+            match = QUERIES_PATTERN.search(timing)
+            if match:
+                queries.append(int(match.group(1)))
+            db = DB_PATTERN.search(timing)
+            if db:
+                db_times.append(float(db.group(1)))
+        return {
+            'median_ms': round(statistics.median(durations), 2),
+            'p95_ms': round(_percentile(durations, 0.95), 2),
+            'min_ms': round(min(durations), 2),
+            'mean_ms': round(statistics.fmean(durations), 2),
+            'queries': max(queries) if queries else None,
+            'db_median_ms': round(statistics.median(db_times), 2) if db_times else None,
+        }
+
+    def report(self, name, result, baseline):
+        line = (
+            f"{name:<22} médiane {result['median_ms']:>9.2f} ms  p95 {result['p95_ms']:>9.2f} ms  "
+            f"SQL {result['queries']!s:>4}"
+        )
+        previous = (baseline or {}).get('results', {}).get(name)
+        if previous:
+            change = result['median_ms'] / previous['median_ms'] - 1 if previous['median_ms'] else 0
+            line += f"  ({change:+.0%})"
+        self.stdout.write(line)
+
+    def load(self, path):
+        try:
+            with open(path, encoding='utf-8') as handle:
+                return json.load(handle)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"Référence illisible ({path}) : {exc}")
+
+    def compare(self, results, baseline, threshold):
+        """Régression : médiane au-delà du seuil, ou requêtes SQL supplémentaires."""
+        regressions = []
+        for name, result in results.items():
+            previous = baseline.get('results', {}).get(name)
+            if previous is None:
+                continue
+            if result['median_ms'] > previous['median_ms'] * (1 + threshold):
+                regressions.append(
+                    f"{name} : médiane {previous['median_ms']:.2f} -> {result['median_ms']:.2f} ms"
+                )
+            if None not in (result['queries'], previous.get('queries')) and result['queries'] > previous['queries']:
+                regressions.append(f"{name} : {previous['queries']} -> {result['queries']} requêtes SQL")
+        if regressions:
+            for regression in regressions:
+                self.stdout.write(self.style.ERROR(f"  RÉGRESSION {regression}"))
+            raise CommandError(f"{len(regressions)} régression(s) par rapport à la référence")
+        self.stdout.write(self.style.SUCCESS(f"Aucune régression au-delà de {threshold:.0%}"))
@@ -0,0 +1,209 @@
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from benchmarks import dataset
+from bike_erp.conditional import mark_changed
+from clients.models import Client
+from clients.stats import recompute_client_stats
+from inventory.models import Store, StoreStock
+from invoices.models import Invoice
+from orders.models import Order, OrderItem
+from products.models import Category, Product
+from sync.log import record_changes
+
+User = get_user_model()
+
+CENT = Decimal('0.01')
+PRICE_RANGES = {'bike': (400, 6000), 'accessory': (10, 250), 'part': (5, 150)}
+PAYMENT_METHODS = ['card', 'card', 'card', 'cash', 'check', 'transfer']
+# Commandes terminées, annulées, en attente (en proportion)
+STATUSES = (['completed'] * 90) + (['cancelled'] * 5) + (['pending'] * 5)
+# Part des ventes portée par les produits les plus demandés
+HOT_SHARE = 0.8
+HOT_PRODUCTS = 0.2
+
+
+class Command(BaseCommand):
+    help = (
+        "Crée le jeu de données synthétique des mesures de performance (produits, "
+        "stocks des deux magasins, clients, commandes avec lignes et factures) par "
+        "bulk_create, puis recalcule agrégats et statistiques. Base dédiée uniquement."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=20000)
+        parser.add_argument('--clients', type=int, default=50000)
+        parser.add_argument('--orders', type=int, default=500000)
+        parser.add_argument('--max-items', type=int, default=4, help="Lignes par commande, au plus")
+        parser.add_argument('--days', type=int, default=730, help="Historique des commandes, en jours")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Commandes par transaction")
+        parser.add_argument('--seed', type=int, default=42, help="Graine du générateur (jeu reproductible)")
+
+    def handle(self, *args, **options):
+        for name in ('products', 'clients', 'orders', 'max_items', 'days', 'batch_size'):
+            if options[name] < 1:
+                raise CommandError(f"--{name.replace('_', '-')} doit être positif")
+        if Product.objects.filter(reference__startswith=f'{dataset.PREFIX}-').exists():
+            raise CommandError(
+                "Jeu de données déjà présent : repartir d'une base vide (migrate sur une base dédiée)"
+            )
+        stores = list(Store.objects.filter(is_active=True).values_list('code', flat=True))
+        if not stores:
+            raise CommandError("Aucun magasin actif")
+
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        started = time.perf_counter()
+
+        user = User.objects.filter(username=dataset.USERNAME).first()
+        if user is None:
+            user = User.objects.create_user(
+                username=dataset.USERNAME, email=f'{dataset.USERNAME}@{dataset.EMAIL_DOMAIN}', password=None,
+            )
+        products = self.seed_products(options['products'], stores)
+        client_ids = self.seed_clients(options['clients'])
+        self.seed_orders(options['orders'], options['max_items'], options['days'], products, client_ids, stores, user)
+
+        self.stdout.write("Agrégats de ventes, statistiques clients, journal de synchronisation...")
+        call_command('rebuild_sales_aggregates', stdout=self.stdout)
+        recompute_client_stats(Client.objects.filter(email__endswith=f'@{dataset.EMAIL_DOMAIN}'))
+        record_changes(Product, [product[0] for product in products])
+        mark_changed(Product, Category, StoreStock)
+        if connection.vendor == 'postgresql':
+            # Statistiques du planificateur à jour après le chargement en masse
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Jeu de données créé en {time.perf_counter() - started:.0f} s : {len(products)} produits, "
+            f"{len(client_ids)} clients, {options['orders']} commandes"
+        ))
+
+    def seed_products(self, count, stores):
+        """Retourne [(pk, price_ht, price_ttc, tva_rate)]."""
+        rng = self.rng
+        categories = {
+            family: Category.objects.create(name=f'{dataset.PREFIX} {family}')
+            for family in dataset.FAMILIES
+        }
+        created = []
+        for start in range(0, count, self.batch_size):
+            products, stocks = [], []
+            for i in range(start, min(start + self.batch_size, count)):
+                product_type = rng.choice(['bike', 'accessory', 'accessory', 'part', 'part', 'part'])
+                low, high = PRICE_RANGES[product_type]
+                price_ttc = Decimal(rng.uniform(low, high)).quantize(CENT)
+                price_ht = (price_ttc / Decimal('1.2')).quantize(CENT)
+                quantities = {store: rng.choice([0, 1, 2, 3, 5, 8, 12, 20, 40]) for store in stores}
+                brand = rng.choice(dataset.BRANDS)
+                products.append(Product(
+                    reference=dataset.reference(i),
+                    barcode=dataset.barcode(i),
+                    name=f"{rng.choice(dataset.FAMILIES[product_type])} {brand} {rng.randint(100, 999)}",
+                    brand=brand,
+                    product_type=product_type,
+                    category=categories[product_type],
+                    price_ht=price_ht,
+                    price_ttc=price_ttc,
+                    tva_rate=Decimal('20.00'),
+                    purchase_price_ht=(price_ht * Decimal('0.6')).quantize(CENT),
+                    total_stock=sum(quantities.values()),
+                    alert_stock=5,
+                ))
+                stocks.append(quantities)
+            with transaction.atomic():
+                Product.objects.bulk_create(products)
+                StoreStock.objects.bulk_create([
+                    StoreStock(product=product, store_id=store, quantity=quantity, alert_level=3)
+                    for product, quantities in zip(products, stocks)
+                    for store, quantity in quantities.items()
+                ])
+            created.extend((p.pk, p.price_ht, p.price_ttc, p.tva_rate) for p in products)
+            self.stdout.write(f"  produits : {len(created)}/{count}")
+        return created
+
+    def seed_clients(self, count):
+        rng = self.rng
+        ids = []
+        for start in range(0, count, self.batch_size):
+            clients = Client.objects.bulk_create([
+                Client(
+                    first_name=rng.choice(dataset.FIRST_NAMES),
+                    last_name=rng.choice(dataset.LAST_NAMES),
+                    email=f'client{i}@{dataset.EMAIL_DOMAIN}',
+                    phone=f'06{rng.randint(0, 99999999):08d}',
+                    city=rng.choice(dataset.CITIES),
+                    postal_code=f'92{rng.randint(100, 999)}',
+                )
+                for i in range(start, min(start + self.batch_size, count))
+            ])
+            ids.extend(client.pk for client in clients)
+            self.stdout.write(f"  clients : {len(ids)}/{count}")
+        return ids
+
+    def seed_orders(self, count, max_items, days, products, client_ids, stores, user):
+        rng = self.rng
+        now = timezone.now()
+        hot = products[:max(1, int(len(products) * HOT_PRODUCTS))]
+        span = days * 86400
+
+        for start in range(0, count, self.batch_size):
+            orders, lines = [], []
+            for i in range(start, min(start + self.batch_size, count)):
+                items = {}
+                for _ in range(rng.randint(1, max_items)):
+                    product = rng.choice(hot if rng.random() < HOT_SHARE else products)
+                    items[product[0]] = (product, rng.choice([1, 1, 1, 2, 3]))
+                subtotal_ht = sum(product[1] * quantity for product, quantity in items.values())
+                total_ttc = sum(product[2] * quantity for product, quantity in items.values())
+                created_at = now - timedelta(seconds=rng.randrange(span))
+                status = rng.choice(STATUSES)
+                orders.append(Order(
+                    order_number=f'{dataset.PREFIX}-C{i:07d}',
+                    client_id=rng.choice(client_ids),
+                    user=user,
+                    store_id=rng.choice(stores),
+                    status=status,
+                    payment_method=rng.choice(PAYMENT_METHODS),
+                    subtotal_ht=subtotal_ht,
+                    total_tva=total_ttc - subtotal_ht,
+                    total_ttc=total_ttc,
+                    created_at=created_at,
+                    completed_at=created_at if status == 'completed' else None,
+                ))
+                lines.append(items.values())
+
+            with transaction.atomic(), dataset.explicit_dates(
+                (Order, 'created_at'), (Invoice, 'invoice_date'), (Invoice, 'created_at'),
+            ):
+                Order.objects.bulk_create(orders)
+                OrderItem.objects.bulk_create([
+                    OrderItem(
+                        order=order, product_id=product[0], quantity=quantity,
+                        unit_price_ht=product[1], unit_price_ttc=product[2], tva_rate=product[3],
+                        subtotal_ht=product[1] * quantity, subtotal_ttc=product[2] * quantity,
+                    )
+                    for order, items in zip(orders, lines)
+                    for product, quantity in items
+                ])
+                Invoice.objects.bulk_create([
+                    Invoice(
+                        invoice_number=f'{dataset.PREFIX}-F{order.order_number[len(dataset.PREFIX) + 2:]}',
+                        order=order,
+                        invoice_date=timezone.localdate(order.created_at),
+                        due_date=timezone.localdate(order.created_at) + timedelta(days=30),
+                        is_paid=True,
+                        paid_at=order.created_at,
+                        created_at=order.created_at,
+                    )
+                    for order in orders if order.status == 'completed'
+                ])
+            self.stdout.write(f"  commandes : {start + len(orders)}/{count}")
@@ -1 +1,4 @@
 # bike_erp/__init__.py
+from .celery import app as celery_app
+
+__all__ = ('celery_app',)
@@ -0,0 +1,15 @@
+"""
+Application Celery du projet (génération PDF asynchrone).
+
+Lancer un worker : celery -A bike_erp worker -l info
+"""
+
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bike_erp.settings')
+
+app = Celery('bike_erp')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
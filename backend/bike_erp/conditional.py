@@ -0,0 +1,107 @@
+"""
+GET conditionnels sur les listes de l'API : ETag et Last-Modified.
+
+Le validateur d'une liste est max(updated_at) et le nombre de lignes du
+queryset filtré (le décompte couvre les suppressions). Il est mis en cache
+par modèle, par « génération » du modèle et par filtre : tant que rien n'a
+changé, vérifier un If-None-Match ne coûte qu'une lecture du cache, et une
+liste inchangée répond 304 sans requête SQL.
+
+La génération d'un modèle (horodatage en cache) est renouvelée après chaque
+écriture : récepteurs post_save/post_delete des applications, et
+mark_changed() après les UPDATE en lot (journal de stock, statistiques
+clients, import du catalogue). Les modèles dont dépend la représentation
+(conditional_dependencies, ex. Category pour category_name des produits)
+entrent dans l'ETag par leur génération. Une écriture qui n'appellerait pas
+mark_changed() reste visible au plus tard après CONDITIONAL_GET['TTL'].
+
+    class ProductViewSet(ConditionalListMixin, viewsets.ModelViewSet):
+        conditional_dependencies = (Category,)
+"""
+
+import hashlib
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+# Paramètres sans effet sur les lignes retenues : ils changent l'ETag, pas le validateur
+PRESENTATION_PARAMS = {'page', 'page_size', 'cursor', 'ordering', 'fields', 'omit', 'compact', 'format'}
+
+
+def _generation_key(model):
+    return f'conditional:generation:{model._meta.label_lower}'
+
+
+def mark_changed(*models):
+    """Renouvelle la génération des modèles, après validation de la transaction."""
+    keys = [_generation_key(model) for model in models]
+    transaction.on_commit(lambda: cache.set_many({key: time.time_ns() for key in keys}, timeout=None))
+
+
+def generations(models):
+    """{modèle: génération} ; une génération absente du cache est créée."""
+    keys = {model: _generation_key(model) for model in models}
+    values = cache.get_many(keys.values())
+    for model, key in keys.items():
+        if key not in values:
+            cache.add(key, time.time_ns(), timeout=None)
+            values[key] = cache.get(key)
+    return {model: values[key] for model, key in keys.items()}
+
+
+def _as_datetime(generation):
+    return datetime.fromtimestamp(generation / 1e9, tz=dt_timezone.utc)
+
+
+class ConditionalListMixin:
+    conditional_dependencies = ()
+    conditional_field = 'updated_at'
+
+    def list(self, request, *args, **kwargs):
+        etag, last_modified = self.list_validators(request)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = super().list(request, *args, **kwargs)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def list_validators(self, request):
+        """(ETag, Last-Modified en secondes) de la liste demandée."""
+        model = self.get_queryset().model
+        models = [model, *self.conditional_dependencies]
+        current = generations(models)
+        params = sorted(
+            (name, values) for name, values in request.query_params.lists()
+            if name not in PRESENTATION_PARAMS
+        )
+        digest = hashlib.md5(repr((current[model], params)).encode('utf-8')).hexdigest()
+        key = f'conditional:list:{model._meta.label_lower}:{digest}'
+        state = cache.get(key)
+        if state is None:
+            state = (
+                self.filter_queryset(self.get_queryset())
+                .order_by()
+                .aggregate(last=Max(self.conditional_field), count=Count('pk'))
+            )
+            cache.set(key, state, settings.CONDITIONAL_GET['TTL'])
+
+        # Last-Modified : dernière écriture connue, sur le modèle ou ses dépendances
+        changed = [_as_datetime(generation) for generation in current.values()]
+        if state['last'] is not None:
+            changed.append(state['last'])
+        last_modified = int(max(changed).timestamp())
+
+        signature = repr((
+            state['last'] and state['last'].isoformat(), state['count'],
+            [current[dependency] for dependency in self.conditional_dependencies],
+            sorted(request.query_params.lists()),
+        ))
+        etag = '"{}"'.format(hashlib.md5(signature.encode('utf-8')).hexdigest())
+        return etag, last_modified
@@ -0,0 +1,190 @@
+"""
+Livraison des fichiers (factures PDF, images produit) sans occuper un worker
+gunicorn pendant le téléchargement.
+
+La vue vérifie les droits puis appelle deliver() ; le transfert des octets
+est confié, selon FILE_DELIVERY['BACKEND'], à :
+
+- 'django'     : le worker lit et envoie le fichier (développement) ;
+- 'x-accel'    : nginx, par l'en-tête X-Accel-Redirect vers une location
+                 interne (FILE_DELIVERY['INTERNAL_PREFIX']) :
+
+                     location /protected-media/ {
+                         internal;
+                         alias /app/backend/media/;
+                     }
+
+- 'x-sendfile' : Apache (mod_xsendfile) ou lighttpd, chemin absolu du
+                 fichier dans X-Sendfile ;
+- 's3'         : redirection vers une URL signée du bucket (django-storages),
+                 valable FILE_DELIVERY['URL_TTL'] secondes ;
+- 'signed'     : doublure locale de 's3' : redirection vers /api/files/<jeton>/,
+                 dont la signature et l'expiration sont vérifiées par
+                 signed_file() avant de servir le fichier depuis le disque.
+
+Un chemin de classe (module.Classe) est aussi accepté.
+
+    return deliver(request, invoice.pdf_file, filename='facture.pdf')
+"""
+
+import abc
+import mimetypes
+import posixpath
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core import signing
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden, HttpResponseRedirect
+from django.urls import reverse
+from django.utils.http import content_disposition_header
+from django.utils.module_loading import import_string
+from django.views.decorators.http import require_GET
+
+SIGNING_SALT = 'bike_erp.delivery'
+
+
+def _config():
+    return settings.FILE_DELIVERY
+
+
+def safe_name(name):
+    """Nom de fichier relatif au stockage, sans remontée de répertoire."""
+    normalized = posixpath.normpath(name or '')
+    if not name or normalized != name or normalized.startswith(('/', '../')) or normalized == '..':
+        raise Http404("Fichier introuvable")
+    return normalized
+
+
+def _content_type(name, content_type):
+    return content_type or mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+
+class StreamingDelivery:
+    """Le worker Django envoie le fichier lui-même."""
+
+    def response(self, request, name, storage, *, filename, as_attachment, content_type, cache_control):
+        try:
+            handle = storage.open(name, 'rb')
+        except FileNotFoundError:
+            raise Http404("Fichier introuvable")
+        response = FileResponse(
+            handle, as_attachment=as_attachment, filename=filename or posixpath.basename(name),
+            content_type=_content_type(name, content_type),
+        )
+        if cache_control:
+            response['Cache-Control'] = cache_control
+        return response
+
+
+class XAccelRedirectDelivery:
+    """Réponse vide ; le serveur frontal envoie le fichier désigné par l'en-tête."""
+
+    header = 'X-Accel-Redirect'
+
+    def target(self, name, storage):
+        return _config()['INTERNAL_PREFIX'] + quote(name)
+
+    def response(self, request, name, storage, *, filename, as_attachment, content_type, cache_control):
+        response = HttpResponse(content_type=_content_type(name, content_type))
+        response[self.header] = self.target(name, storage)
+        # Conservés par nginx sur la réponse finale
+        response['Content-Disposition'] = content_disposition_header(
+            as_attachment, filename or posixpath.basename(name),
+        )
+        if cache_control:
+            response['Cache-Control'] = cache_control
+        return response
+
+
+class XSendfileDelivery(XAccelRedirectDelivery):
+    header = 'X-Sendfile'
+
+    def target(self, name, storage):
+        return storage.path(name)
+
+
+class RedirectDelivery(abc.ABC):
+    """Redirection vers une URL signée à durée de vie courte."""
+
+    @abc.abstractmethod
+    def signed_url(self, request, name, storage, *, filename, as_attachment, content_type, cache_control):
+        """URL absolue du fichier, valable FILE_DELIVERY['URL_TTL'] secondes."""
+
+    def response(self, request, name, storage, **options):
+        response = HttpResponseRedirect(self.signed_url(request, name, storage, **options))
+        # La redirection peut resservir tant que l'URL reste valable
+        response['Cache-Control'] = f"private, max-age={_config()['URL_TTL'] // 2}"
+        return response
+
+
+class S3RedirectDelivery(RedirectDelivery):
+    """URL présignée du bucket (S3Boto3Storage de django-storages)."""
+
+    def signed_url(self, request, name, storage, *, filename, as_attachment, content_type, cache_control):
+        parameters = {
+            'ResponseContentDisposition': content_disposition_header(
+                as_attachment, filename or posixpath.basename(name),
+            ),
+            'ResponseContentType': _content_type(name, content_type),
+        }
+        if cache_control:
+            parameters['ResponseCacheControl'] = cache_control
+        return storage.url(name, parameters=parameters, expire=_config()['URL_TTL'])
+
+
+class SignedURLDelivery(RedirectDelivery):
+    """URL signée servie par signed_file() : même contrat que 's3', sur disque local."""
+
+    def signed_url(self, request, name, storage, *, filename, as_attachment, content_type, cache_control):
+        token = signing.dumps(
+            {'n': name, 'f': filename, 'a': as_attachment, 't': content_type, 'c': cache_control},
+            salt=SIGNING_SALT, compress=True,
+        )
+        return request.build_absolute_uri(reverse('signed-file', args=[token]))
+
+
+BACKENDS = {
+    'django': StreamingDelivery,
+    'x-accel': XAccelRedirectDelivery,
+    'x-sendfile': XSendfileDelivery,
+    's3': S3RedirectDelivery,
+    'signed': SignedURLDelivery,
+}
+
+
+def get_backend():
+    backend = _config()['BACKEND']
+    return (BACKENDS.get(backend) or import_string(backend))()
+
+
+def deliver(request, file, *, filename=None, as_attachment=True, content_type=None,
+            cache_control=None, storage=None):
+    """
+    Réponse qui livre `file` (FieldFile ou nom dans le stockage). Les droits
+    d'accès doivent avoir été vérifiés par l'appelant.
+    """
+    if hasattr(file, 'storage'):
+        storage, name = file.storage, file.name
+    else:
+        storage, name = storage or default_storage, file
+    return get_backend().response(
+        request, safe_name(name), storage,
+        filename=filename, as_attachment=as_attachment,
+        content_type=content_type, cache_control=cache_control,
+    )
+
+
+@require_GET
+def signed_file(request, token):
+    """GET /api/files/<jeton>/ : la signature tient lieu d'autorisation."""
+    try:
+        data = signing.loads(token, salt=SIGNING_SALT, max_age=_config()['URL_TTL'])
+    except signing.SignatureExpired:
+        return HttpResponseForbidden("Lien expiré")
+    except signing.BadSignature:
+        return HttpResponseForbidden("Signature invalide")
+    return StreamingDelivery().response(
+        request, safe_name(data['n']), default_storage,
+        filename=data['f'], as_attachment=data['a'], content_type=data['t'], cache_control=data['c'],
+    )
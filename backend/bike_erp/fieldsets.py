@@ -0,0 +1,303 @@
+"""
+Projections des réponses de l'API : ?fields=, ?omit= et ?compact=1.
+
+    GET /api/products/?fields=id,name,reference,price_ttc,stock_garches
+    GET /api/clients/?omit=notes,address
+    GET /api/products/?compact=1&fields=id,name,reference,price_ttc,total_stock
+
+Sur les actions list et retrieve :
+- un nom inconnu (ni champ du sérialiseur, ni colonne compacte) est refusé
+  par une réponse 400 qui liste les noms en cause ;
+- le sérialiseur (SparseFieldsetsMixin) ne construit que les champs demandés ;
+- la vue (SparseFieldsetsViewMixin) restreint le SELECT aux colonnes de ces
+  champs (QuerySet.only()) et abandonne les select_related/prefetch_related
+  qu'aucun champ demandé ne lit.
+
+?compact=1 (action list des ViewSets qui déclarent compact_fields) : les
+lignes sont lues par QuerySet.values() et renvoyées telles quelles, sans
+sérialiseur. Les clés étrangères valent l'identifiant ; les décimaux sont
+rendus en chaînes, comme par les sérialiseurs (render_decimals) ; ?fields=
+et ?omit= s'appliquent aux colonnes du SELECT.
+"""
+
+from decimal import Decimal
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from rest_framework import serializers
+from rest_framework.response import Response
+
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+COMPACT_PARAM = 'compact'
+
+
+def _split(value):
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+class Fieldset:
+    """Champs demandés : include (None = tous) moins omit."""
+
+    def __init__(self, include=None, omit=()):
+        self.include = include
+        self.omit = set(omit)
+
+    @classmethod
+    def from_request(cls, request):
+        params = request.query_params
+        if FIELDS_PARAM not in params and OMIT_PARAM not in params:
+            return None
+        include = _split(params[FIELDS_PARAM]) if FIELDS_PARAM in params else None
+        return cls(include, _split(params.get(OMIT_PARAM, '')))
+
+    def wants(self, name):
+        return (self.include is None or name in self.include) and name not in self.omit
+
+    def unknown(self, available):
+        """{paramètre: noms absents de `available`}, pour les paramètres en cause."""
+        unknown = {
+            FIELDS_PARAM: (self.include or set()) - available,
+            OMIT_PARAM: self.omit - available,
+        }
+        return {param: names for param, names in unknown.items() if names}
+
+
+class SparseFieldsetsMixin:
+    """
+    Sérialiseur réduit au Fieldset passé dans le contexte ('fieldset'), pour
+    le sérialiseur racine seulement : les sérialiseurs imbriqués restent complets.
+
+    Les clés calculées dans to_representation sont déclarées par
+    derived_fields() avec le champ dont elles dépendent : ce champ est alors
+    construit (et ses préchargements conservés) mais retiré de la réponse
+    s'il n'est pas demandé.
+    """
+
+    @property
+    def fieldset(self):
+        if not self._is_root_serializer():
+            return None
+        return self.context.get('fieldset')
+
+    def _is_root_serializer(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+    def derived_fields(self):
+        """{clé calculée: champ source}."""
+        return {}
+
+    def available_field_names(self):
+        """Noms acceptés par ?fields= / ?omit=."""
+        return set(super().get_fields()) | set(self.derived_fields())
+
+    def get_fields(self):
+        fields = super().get_fields()
+        fieldset = self.fieldset
+        if fieldset is None:
+            return fields
+        needed = {name for name in fields if fieldset.wants(name)}
+        for name, source in self.derived_fields().items():
+            if fieldset.wants(name) and source in fields:
+                needed.add(source)
+        return {name: field for name, field in fields.items() if name in needed}
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        fieldset = self.fieldset
+        if fieldset is not None:
+            for name in [name for name in data if not fieldset.wants(name)]:
+                del data[name]
+        return data
+
+
+class SparseFieldsetsViewMixin:
+    """
+    ?fields= / ?omit= poussés jusqu'au SQL, et lecture compacte des listes.
+
+    compact_fields : colonnes de values() pour ?compact=1 (noms de champs ou
+    chemins 'relation__champ') ; compact_annotations : {clé: expression}
+    ajoutées au même values(). Sans compact_fields, ?compact est ignoré.
+    """
+    fieldset_actions = ('list', 'retrieve')
+    compact_fields = None
+    compact_annotations = {}
+
+    def get_fieldset(self):
+        if not hasattr(self, '_fieldset'):
+            # Mis en place avant la validation : la réponse 400 elle-même
+            # (formulaires de l'API navigable) relit le contexte
+            self._fieldset = None
+            if self.action in self.fieldset_actions and self.request.method in ('GET', 'HEAD'):
+                fieldset = Fieldset.from_request(self.request)
+                if fieldset is not None:
+                    unknown = fieldset.unknown(self.available_field_names())
+                    if unknown:
+                        raise serializers.ValidationError({
+                            param: f"Champ(s) inconnu(s) : {', '.join(sorted(names))}"
+                            for param, names in unknown.items()
+                        })
+                self._fieldset = fieldset
+        return self._fieldset
+
+    def available_field_names(self):
+        if self.is_compact():
+            return set(self.compact_fields) | set(self.get_compact_annotations())
+        serializer = self.get_serializer_class()(context={'request': self.request, 'view': self})
+        if isinstance(serializer, SparseFieldsetsMixin):
+            return serializer.available_field_names()
+        return set(serializer.fields)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fieldset'] = self.get_fieldset()
+        return context
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.get_fieldset() is not None and not self.is_compact():
+            queryset = self.project_queryset(queryset)
+        return queryset
+
+    def project_queryset(self, queryset):
+        """
+        Colonnes lues par les champs restants du sérialiseur. Si l'un d'eux
+        lit autre chose qu'une colonne (propriété, méthode, source='*'),
+        seul l'élagage des relations est appliqué.
+        """
+        opts = queryset.model._meta
+        roots = set()
+        columns = set()
+        projectable = True
+        for field in self.get_serializer().fields.values():
+            if field.write_only:
+                continue
+            if not field.source_attrs:
+                projectable = False
+                continue
+            root = field.source_attrs[0]
+            roots.add(root)
+            try:
+                model_field = opts.get_field(root)
+            except FieldDoesNotExist:
+                projectable = False
+                continue
+            if model_field.concrete and not model_field.many_to_many:
+                columns.add(root)
+
+        select_related = self._kept_select_related(queryset.query.select_related, roots)
+        prefetch = [
+            lookup for lookup in queryset._prefetch_related_lookups
+            if getattr(lookup, 'prefetch_through', lookup).split('__')[0] in roots
+        ]
+        queryset = queryset.select_related(None).prefetch_related(None)
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        if projectable:
+            # created_at sert de position à la pagination par curseur
+            try:
+                columns.add(opts.get_field('created_at').name)
+            except FieldDoesNotExist:
+                pass
+            queryset = queryset.only(*columns, *{path.split('__')[0] for path in select_related})
+        return queryset
+
+    @staticmethod
+    def _kept_select_related(tree, roots, prefix=''):
+        if not isinstance(tree, dict):
+            return []
+        paths = []
+        for name, subtree in tree.items():
+            if prefix or name in roots:
+                path = prefix + name
+                paths.append(path)
+                paths.extend(SparseFieldsetsViewMixin._kept_select_related(subtree, roots, path + '__'))
+        return paths
+
+    def is_compact(self):
+        return (
+            self.action == 'list'
+            and self.compact_fields is not None
+            and self.request.query_params.get(COMPACT_PARAM) in ('1', 'true')
+        )
+
+    def get_compact_annotations(self):
+        return dict(self.compact_annotations)
+
+    def list(self, request, *args, **kwargs):
+        if not self.is_compact():
+            return super().list(request, *args, **kwargs)
+
+        fieldset = self.get_fieldset() or Fieldset()
+        names = [name for name in self.compact_fields if fieldset.wants(name)]
+        annotations = {
+            name: expression for name, expression in self.get_compact_annotations().items()
+            if fieldset.wants(name)
+        }
+        # Position de la pagination par curseur, retirée ensuite si non demandée
+        queryset = self.filter_queryset(self.get_queryset()).prefetch_related(None)
+        hidden = [
+            name for name in ('id', 'created_at')
+            if name not in names and name not in annotations and _has_field(queryset.model, name)
+        ]
+        rows = queryset.values(*names, *hidden, **annotations)
+        page = self.paginate_queryset(rows)
+        results = page if page is not None else list(rows)
+        for row in results:
+            for name in hidden:
+                del row[name]
+        render_decimals(queryset.model, results)
+        if page is not None:
+            return self.get_paginated_response(results)
+        return Response(results)
+
+
+def _has_field(model, name):
+    try:
+        model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return False
+    return True
+
+
+def _model_field(model, path):
+    """Champ du modèle désigné par un chemin 'relation__champ', ou None."""
+    field = None
+    for name in path.split('__'):
+        if model is None:
+            return None
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return None
+        model = field.related_model
+    return field
+
+
+def render_decimals(model, rows):
+    """
+    Décimaux des lignes de values() rendus en chaînes, avec le nombre de
+    décimales du champ, comme par serializers.DecimalField ("240.00" et non
+    240.0) : un champ a le même type JSON quel que soit le mode de lecture.
+    """
+    if not rows:
+        return rows
+    fields = {}
+    for name, value in rows[0].items():
+        model_field = _model_field(model, name)
+        if isinstance(model_field, models.DecimalField):
+            fields[name] = serializers.DecimalField(
+                max_digits=model_field.max_digits, decimal_places=model_field.decimal_places,
+            )
+        elif isinstance(value, Decimal):
+            fields[name] = serializers.DecimalField(max_digits=None, decimal_places=None)
+    for row in rows:
+        for name, field in fields.items():
+            if row[name] is not None:
+                row[name] = field.to_representation(row[name])
+    return rows
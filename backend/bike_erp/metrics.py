@@ -0,0 +1,268 @@
+"""
+Mesures par requête : nombre de requêtes SQL, temps base de données, temps
+de sérialisation et durée totale.
+
+RequestMetricsMiddleware chronomètre chaque requête et renvoie les mesures
+dans l'en-tête Server-Timing (visible dans l'onglet Réseau du navigateur) :
+
+    Server-Timing: db;dur=12.4;desc="7 req. SQL", serialize;dur=3.1, app;dur=20.0, total;dur=35.5
+
+Le temps SQL est mesuré par un execute_wrapper de la connexion (un appel de
+fonction par requête, sans la liste des requêtes de CaptureQueriesContext) ;
+la sérialisation est le rendu de la réponse par TimedJSONRenderer.
+
+Chaque route (nom de l'URL et méthode) garde dans le processus ses compteurs
+et les dernières durées (METRICS['RESERVOIR']) dont sont tirés p50, p95 et
+p99. GET /api/metrics/ les expose au format texte de Prometheus, avec
+l'en-tête Authorization: Bearer <METRICS['TOKEN']>. Avec plusieurs workers
+gunicorn, chaque processus a ses propres mesures : le serveur Prometheus
+les agrège par instance.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden, HttpResponseNotFound
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET
+from rest_framework.renderers import JSONRenderer
+
+logger = logging.getLogger(__name__)
+
+QUANTILES = (0.5, 0.95, 0.99)
+METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_current = ContextVar('request_metrics', default=None)
+
+
+def _config():
+    return settings.METRICS
+
+
+class RequestMetrics:
+    """Mesures de la requête en cours ; durées en secondes."""
+
+    __slots__ = ('started', 'queries', 'db_time', 'serialize_time')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        # execute_wrapper : chronomètre chaque requête SQL
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def as_log(self):
+        """Champs pour extra= des journaux, durées en millisecondes."""
+        return {
+            'queries': self.queries,
+            'db_ms': round(self.db_time * 1000, 1),
+            'serialize_ms': round(self.serialize_time * 1000, 1),
+            'elapsed_ms': round(self.elapsed * 1000, 1),
+        }
+
+
+def current_metrics():
+    """Mesures de la requête en cours, ou None hors requête."""
+    return _current.get()
+
+
+class TimedJSONRenderer(JSONRenderer):
+    """JSONRenderer dont le temps de rendu est compté dans la requête en cours."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        start = time.perf_counter()
+        try:
+            return super().render(data, accepted_media_type, renderer_context)
+        finally:
+            metrics = _current.get()
+            if metrics is not None:
+                metrics.serialize_time += time.perf_counter() - start
+
+
+class RouteStats:
+    __slots__ = ('count', 'errors', 'queries', 'duration', 'db_time', 'serialize_time', 'recent')
+
+    def __init__(self, size):
+        self.count = 0
+        self.errors = 0
+        self.queries = 0
+        self.duration = 0.0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+        self.recent = deque(maxlen=size)
+
+
+class Registry:
+    """Statistiques par (route, méthode), partagées par les threads du processus."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def record(self, route, method, status_code, metrics, duration):
+        key = (route, method)
+        with self._lock:
+            stats = self._routes.get(key)
+            if stats is None:
+                stats = self._routes[key] = RouteStats(_config()['RESERVOIR'])
+            stats.count += 1
+            stats.errors += status_code >= 500
+            stats.queries += metrics.queries
+            stats.duration += duration
+            stats.db_time += metrics.db_time
+            stats.serialize_time += metrics.serialize_time
+            stats.recent.append(duration)
+
+    def snapshot(self):
+        """[(route, méthode, RouteStats copiée, durées récentes triées)]."""
+        with self._lock:
+            items = [
+                (route, method, _copy(stats), sorted(stats.recent))
+                for (route, method), stats in sorted(self._routes.items())
+            ]
+        return items
+
+    def clear(self):
+        with self._lock:
+            self._routes.clear()
+
+
+def _copy(stats):
+    copy = RouteStats(0)
+    for name in RouteStats.__slots__[:-1]:
+        setattr(copy, name, getattr(stats, name))
+    return copy
+
+
+registry = Registry()
+
+
+def quantile(values, q):
+    """Quantile d'une liste triée (rang le plus proche), 0 si elle est vide."""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def route_name(request):
+    match = getattr(request, 'resolver_match', None)
+    # Nom de l'URL plutôt que le chemin : une série par route, pas par objet
+    return match.view_name if match is not None else 'unmatched'
+
+
+def server_timing(metrics, total):
+    app = max(total - metrics.db_time - metrics.serialize_time, 0.0)
+    return (
+        f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.queries} req. SQL", '
+        f'serialize;dur={metrics.serialize_time * 1000:.1f}, '
+        f'app;dur={app * 1000:.1f}, '
+        f'total;dur={total * 1000:.1f}'
+    )
+
+
+class RequestMetricsMiddleware:
+    """
+    Premier middleware de la liste : la durée totale couvre les autres
+    middlewares (sessions, authentification) et leurs requêtes SQL.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not _config()['ENABLED']:
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        total = metrics.elapsed
+        route = route_name(request)
+        response['Server-Timing'] = server_timing(metrics, total)
+        method = request.method if request.method in METHODS else 'OTHER'
+        registry.record(route, method, response.status_code, metrics, total)
+        if total * 1000 >= _config()['SLOW_REQUEST_MS']:
+            logger.warning(
+                "Requête lente : %s %s", request.method, request.path,
+                extra={'route': route, 'status': response.status_code, **metrics.as_log()},
+            )
+        return response
+
+
+def _labels(**labels):
+    escaped = (
+        (name, str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n'))
+        for name, value in labels.items()
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def render_prometheus(snapshot):
+    """Format texte d'exposition de Prometheus (version 0.0.4)."""
+    lines = [
+        '# HELP bike_erp_request_duration_seconds Durée des requêtes HTTP (quantiles sur les dernières requêtes).',
+        '# TYPE bike_erp_request_duration_seconds summary',
+    ]
+    for route, method, stats, recent in snapshot:
+        for q in QUANTILES:
+            labels = _labels(route=route, method=method, quantile=q)
+            lines.append(f'bike_erp_request_duration_seconds{labels} {quantile(recent, q):.6f}')
+        labels = _labels(route=route, method=method)
+        lines.append(f'bike_erp_request_duration_seconds_sum{labels} {stats.duration:.6f}')
+        lines.append(f'bike_erp_request_duration_seconds_count{labels} {stats.count}')
+
+    counters = [
+        ('db_seconds_total', 'Temps passé en base de données.', 'db_time'),
+        ('serialize_seconds_total', 'Temps de sérialisation des réponses.', 'serialize_time'),
+        ('queries_total', 'Requêtes SQL exécutées.', 'queries'),
+        ('errors_total', 'Réponses 5xx.', 'errors'),
+    ]
+    for name, help_text, attribute in counters:
+        lines.append(f'# HELP bike_erp_request_{name} {help_text}')
+        lines.append(f'# TYPE bike_erp_request_{name} counter')
+        for route, method, stats, _ in snapshot:
+            value = getattr(stats, attribute)
+            value = f'{value:.6f}' if isinstance(value, float) else value
+            lines.append(f'bike_erp_request_{name}{_labels(route=route, method=method)} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+@require_GET
+def metrics_view(request):
+    """GET /api/metrics/ : mesures du processus, pour Prometheus."""
+    token = _config()['TOKEN']
+    if not token:
+        # Sans jeton configuré, l'endpoint n'existe pas
+        return HttpResponseNotFound()
+    scheme, _, credentials = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not constant_time_compare(credentials, token):
+        return HttpResponseForbidden()
+    response = HttpResponse(render_prometheus(registry.snapshot()), content_type=PROMETHEUS_CONTENT_TYPE)
+    response['Cache-Control'] = 'no-store'
+    return response
@@ -0,0 +1,22 @@
+from django.utils.cache import patch_cache_control, patch_vary_headers
+
+API_PREFIX = '/api/'
+
+
+class ApiCacheControlMiddleware:
+    """
+    Réponses de l'API authentifiée : jamais dans un cache partagé, et
+    toujours revalidées par le navigateur (les listes répondent 304 si
+    leur ETag n'a pas changé, voir bike_erp/conditional.py).
+    """
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+    
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.path.startswith(API_PREFIX):
+            if not response.has_header('Cache-Control'):
+                patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ['Authorization'])
+        return response
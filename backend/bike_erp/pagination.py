@@ -0,0 +1,145 @@
+"""
+Pagination des listes de l'API.
+
+Par défaut, pagination par numéro de page (?page=), utilisée par le front.
+Avec le paramètre ?cursor= (vide pour la première page), la liste passe en
+pagination par clé (keyset) sur (created_at, id) : pas de COUNT(*) ni
+d'OFFSET, chaque page est une lecture de l'index (created_at DESC, id DESC)
+à partir de la dernière ligne de la page précédente, quelle que soit la
+profondeur. En mode curseur, l'ordre est toujours du plus récent au plus
+ancien (?ordering= et le tri par pertinence sont ignorés).
+"""
+
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    invalid_cursor_message = 'Curseur invalide'
+
+    def __init__(self, page_size):
+        self.page_size = page_size
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def encode_cursor(self, instance, reverse):
+        # Instance de modèle, ou ligne de values() (listes ?compact=1)
+        if isinstance(instance, dict):
+            created_at, pk = instance['created_at'], instance['id']
+        else:
+            created_at, pk = instance.created_at, instance.pk
+        position = [created_at.isoformat(), pk, int(reverse)]
+        return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+    def decode_cursor(self, value):
+        try:
+            created_at, pk, reverse = json.loads(base64.urlsafe_b64decode(value.encode()))
+            created_at = parse_datetime(created_at)
+            pk = int(pk)
+        except (binascii.Error, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if created_at is None:
+            raise NotFound(self.invalid_cursor_message)
+        return created_at, pk, bool(reverse)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        value = request.query_params.get(self.cursor_query_param)
+
+        reverse = False
+        if value:
+            created_at, pk, reverse = self.decode_cursor(value)
+            if reverse:
+                queryset = queryset.filter(
+                    Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk)
+                )
+            else:
+                queryset = queryset.filter(
+                    Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk)
+                )
+        ordering = ('created_at', 'pk') if reverse else ('-created_at', '-pk')
+
+        # Une ligne de plus pour savoir s'il existe une page suivante
+        rows = list(queryset.order_by(*ordering)[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        self.next_cursor = self.previous_cursor = None
+        if rows:
+            if has_more or reverse:
+                self.next_cursor = self.encode_cursor(rows[-1], reverse=False)
+            if value and (has_more or not reverse):
+                self.previous_cursor = self.encode_cursor(rows[0], reverse=True)
+        return rows
+
+    def get_link(self, cursor):
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_link(self.next_cursor)),
+            ('previous', self.get_link(self.previous_cursor)),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class StandardPagination(PageNumberPagination):
+    """
+    PageNumberPagination, ou KeysetPagination si ?cursor= est présent et que
+    le modèle a un champ created_at.
+    """
+    keyset_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.keyset_class.cursor_query_param in request.query_params and self._has_created_at(queryset):
+            self.keyset = self.keyset_class(self.page_size)
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    @staticmethod
+    def _has_created_at(queryset):
+        try:
+            queryset.model._meta.get_field('created_at')
+        except FieldDoesNotExist:
+            return False
+        return True
@@ -0,0 +1,53 @@
+"""
+Budgets de requêtes SQL par action de ViewSet.
+
+Chaque ViewSet déclare le nombre maximal de requêtes autorisé par action,
+indépendamment du nombre de lignes renvoyées :
+
+    class OrderViewSet(QueryBudgetMixin, viewsets.ModelViewSet):
+        query_budgets = {'list': 4, 'retrieve': 3}
+
+Le réglage QUERY_BUDGET contrôle le comportement :
+- 'off'   : aucun comptage (production) ;
+- 'warn'  : journalise les dépassements (développement) ;
+- 'raise' : lève QueryBudgetExceeded (tests des applications, CI ; voir
+            bike_erp/query_budget_cases.py).
+"""
+
+import logging
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryBudgetMixin:
+    query_budgets = {}
+
+    def dispatch(self, request, *args, **kwargs):
+        mode = getattr(settings, 'QUERY_BUDGET', 'off')
+        if mode == 'off':
+            return super().dispatch(request, *args, **kwargs)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = super().dispatch(request, *args, **kwargs)
+
+        action = getattr(self, 'action', None)
+        budget = self.query_budgets.get(action)
+        used = len(queries)
+        response['X-Query-Count'] = str(used)
+        if budget is not None and used > budget:
+            message = (
+                f"{type(self).__name__}.{action} : {used} requêtes SQL "
+                f"pour un budget de {budget}"
+            )
+            if mode == 'raise':
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
@@ -0,0 +1,178 @@
+"""
+Cas de test des budgets de requêtes (bike_erp/query_budget.py).
+
+Chaque application déclare ses endpoints dans son tests.py :
+
+    class OrderQueryBudgetTests(QueryBudgetCases, TestCase):
+        endpoints = [
+            ('orders-list', 'get', '/api/orders/'),
+            ('orders-create', 'post', '/api/orders/', 'checkout'),
+        ]
+
+Les endpoints sont appelés avec QUERY_BUDGET='raise' sur deux volumes de
+données (SMALL puis LARGE commandes de autant de lignes) : le test échoue si
+un budget est dépassé ou si le nombre de requêtes grandit avec le volume
+(N+1). Les urls sont complétées avec les objets du jeu de données ; le
+quatrième élément, pour un POST, désigne le corps de la requête.
+
+Un TestCase ne valide jamais sa transaction : les callbacks on_commit
+(journal de synchronisation, caches) sont exécutés à la fin de chaque appel
+et comptés avec lui, comme dans une requête réellement validée. La mise en
+file des tâches Celery ne touche pas la base et n'est pas envoyée.
+"""
+
+from decimal import Decimal
+from unittest import mock
+from urllib.parse import urlsplit
+
+from celery import Task
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import resolve
+from rest_framework.test import APIClient
+
+from clients.models import Client
+from inventory.ledger import stores
+from inventory.models import StockMovement, StoreStock
+from invoices.models import Invoice
+from orders.models import DocumentSequence, Order, OrderItem
+from orders.numbering import series_key
+from products.models import Category, Product
+from sync.log import record_changes
+from .query_budget import QueryBudgetExceeded
+
+SMALL = 2
+LARGE = 20
+
+
+def seed_budget_data(size):
+    """Jeu de données : `size` commandes de `size` lignes chacune."""
+    user = get_user_model().objects.create_user(
+        username=f'budget{size}', email=f'budget{size}@example.com', password='budget',
+    )
+    category = Category.objects.create(name=f'Budget {size}')
+    products = Product.objects.bulk_create([
+        Product(
+            reference=f'BUDGET-{size}-{i}', name=f'Produit {i}', category=category,
+            price_ht=Decimal('100.00'), price_ttc=Decimal('120.00'),
+            barcode=f'BUDGET{size}{i:06d}', total_stock=2000,
+        )
+        for i in range(size)
+    ])
+    StoreStock.objects.bulk_create([
+        StoreStock(product=product, store_id=store, quantity=1000)
+        for product in products for store in ('ville_avray', 'garches')
+    ])
+    clients = Client.objects.bulk_create([
+        Client(first_name='Client', last_name=str(i), email=f'budget{size}-{i}@example.com', phone='0100000000')
+        for i in range(size)
+    ])
+    orders = Order.objects.bulk_create([
+        Order(order_number=f'BUDGET-{size}-{i}', client=clients[i], user=user, store_id='garches', status='completed')
+        for i in range(size)
+    ])
+    OrderItem.objects.bulk_create([
+        OrderItem(
+            order=order, product=product, quantity=1,
+            unit_price_ht=product.price_ht, unit_price_ttc=product.price_ttc, tva_rate=product.tva_rate,
+            subtotal_ht=product.price_ht, subtotal_ttc=product.price_ttc,
+        )
+        for order in orders for product in products
+    ])
+    invoices = Invoice.objects.bulk_create([
+        Invoice(invoice_number=f'BUDGET-{size}-{i}', order=order)
+        for i, order in enumerate(orders)
+    ])
+    StockMovement.objects.bulk_create([
+        StockMovement(product=product, store_id='garches', kind='sale', quantity=-1, order=order)
+        for order in orders for product in products
+    ])
+    # bulk_create n'envoie pas post_save : journal de synchronisation à la main
+    record_changes(Product, [product.pk for product in products])
+    record_changes(Client, [client.pk for client in clients])
+    # Référentiel des magasins en cache et séries de numéros ouvertes, comme
+    # en régime établi
+    stores()
+    for doc_type in ('order', 'invoice'):
+        year, store = series_key(doc_type, 'garches')
+        DocumentSequence.objects.get_or_create(doc_type=doc_type, year=year, store=store)
+    return {
+        'user': user,
+        'order': orders[0].pk,
+        'client': clients[0].pk,
+        'invoice': invoices[0].pk,
+        'product': products[0].pk,
+        'barcode': products[0].barcode,
+        'cancel': {'status': 'cancelled'},
+        'barcodes': {'codes': [product.barcode for product in products] + ['INCONNU']},
+        'checkout': {
+            'client': clients[0].pk,
+            'store': 'garches',
+            'items': [
+                {
+                    'product': product.pk, 'quantity': 1,
+                    'unit_price_ht': str(product.price_ht),
+                    'unit_price_ttc': str(product.price_ttc),
+                    'tva_rate': str(product.tva_rate),
+                }
+                for product in products
+            ],
+        },
+    }
+
+
+class QueryBudgetCases:
+    """À combiner avec django.test.TestCase ; voir le docstring du module."""
+
+    endpoints = []
+
+    def budget(self, method, url):
+        """Budget déclaré par le ViewSet pour l'action servie par `url`."""
+        view = resolve(urlsplit(url).path).func
+        action = view.actions.get(method)
+        return f"{view.cls.__name__}.{action}", view.cls.query_budgets.get(action)
+
+    def measure(self, size):
+        """Nombre de requêtes par endpoint, ou le message de dépassement."""
+        counts = {}
+        with transaction.atomic(), mock.patch.object(Task, 'apply_async'):
+            # Jeu de données validé avant les appels mesurés
+            with self.captureOnCommitCallbacks(execute=True):
+                data = seed_budget_data(size)
+            client = APIClient()
+            client.force_authenticate(data['user'])
+            for name, method, url, *payload in self.endpoints:
+                url = url.format(**data)
+                kwargs = {'format': 'json', 'data': data[payload[0]]} if payload else {}
+                # Chaque appel est annulé : les écritures ne faussent pas le suivant
+                try:
+                    with transaction.atomic():
+                        with CaptureQueriesContext(connection) as queries:
+                            with self.captureOnCommitCallbacks(execute=True):
+                                response = getattr(client, method)(url, **kwargs)
+                        transaction.set_rollback(True)
+                except QueryBudgetExceeded as exc:
+                    counts[name] = str(exc)
+                    continue
+                self.assertLess(response.status_code, 400, f"{name} : HTTP {response.status_code}")
+                view, budget = self.budget(method, url)
+                used = len(queries)
+                if budget is not None and used > budget:
+                    counts[name] = f"{view} : {used} requêtes SQL (callbacks on_commit compris) pour un budget de {budget}"
+                else:
+                    counts[name] = used
+            transaction.set_rollback(True)
+        return counts
+
+    # Validateurs des GET conditionnels non conservés : chaque liste compte
+    # la requête qui les calcule
+    @override_settings(QUERY_BUDGET='raise', CELERY_TASK_ALWAYS_EAGER=False, CONDITIONAL_GET={'TTL': 0})
+    def test_query_budgets(self):
+        small, large = self.measure(SMALL), self.measure(LARGE)
+        for name, *_ in self.endpoints:
+            with self.subTest(endpoint=name):
+                for count in (small[name], large[name]):
+                    if isinstance(count, str):
+                        self.fail(count)
+                self.assertEqual(small[name], large[name], f"{name} : N+1 ({SMALL} -> {LARGE} lignes)")
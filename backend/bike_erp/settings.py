@@ -15,6 +15,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework_simplejwt',
     'corsheaders',
@@ -25,17 +26,23 @@ INSTALLED_APPS = [
     'clients',
     'orders',
     'invoices',
+    'analytics',
+    'inventory',
+    'sync',
+    'benchmarks',
 ]
 
 # Custom User Model
 AUTH_USER_MODEL = 'accounts.CustomUser'
 
 MIDDLEWARE = [
+    'bike_erp.metrics.RequestMetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'bike_erp.middleware.ApiCacheControlMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
@@ -73,6 +80,95 @@ DATABASES = {
     )
 }
 
+# Cache partagé : Redis si CACHE_URL est défini (indispensable avec plusieurs
+# workers gunicorn), sinon cache mémoire local au processus
+CACHE_URL = config('CACHE_URL', default='')
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Cache des codes-barres (products/barcode_cache.py) : LRU local au processus,
+# doublé du cache partagé quand il existe
+BARCODE_CACHE = {
+    'SIZE': 4096,
+    'LOCAL_TTL': 60,
+    'SHARED_ALIAS': 'default' if CACHE_URL else None,
+    'SHARED_TTL': 3600,
+}
+
+# Déclinaisons des images produit (products/images.py) : côté du carré dans
+# lequel chaque déclinaison est réduite, formats produits, qualité d'encodage.
+# Changer ces réglages change les noms des fichiers : relancer
+# build_image_variants --force
+PRODUCT_IMAGES = {
+    'VARIANTS': {'thumb': 160, 'card': 480, 'detail': 1200},
+    'FORMATS': ['webp', 'jpeg'],
+    'QUALITY': {'webp': 80, 'jpeg': 82},
+}
+
+# GET conditionnels des listes (bike_erp/conditional.py) : durée de vie des
+# validateurs en cache, délai maximal de prise en compte d'une écriture qui
+# ne signalerait pas son modèle
+CONDITIONAL_GET = {
+    'TTL': 300,
+}
+
+# Mesures par requête (bike_erp/metrics.py) : en-tête Server-Timing, durées
+# par route gardées pour les quantiles, seuil de journalisation des requêtes
+# lentes ; /api/metrics/ n'est servi qu'avec METRICS_TOKEN défini
+METRICS = {
+    'ENABLED': config('METRICS_ENABLED', default=True, cast=bool),
+    'RESERVOIR': 1024,
+    'SLOW_REQUEST_MS': 1000,
+    'TOKEN': config('METRICS_TOKEN', default=''),
+}
+
+# Journaux sur la sortie standard, au format clé=valeur (bike_erp/logfmt.py)
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'logfmt': {
+            '()': 'bike_erp.logfmt.KeyValueFormatter',
+            'format': '%(asctime)s %(levelname)s %(name)s %(message)s',
+            'datefmt': '%Y-%m-%d %H:%M:%S',
+        },
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'logfmt'},
+    },
+    'root': {'handlers': ['console'], 'level': config('LOG_LEVEL', default='INFO')},
+    'loggers': {
+        # Pas de doublon avec le handler de Django pour les erreurs 4xx/5xx
+        'django': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
+# Instantanés du stock (inventory/ledger.py) : délai minimal entre l'instant
+# d'un instantané et sa prise, en secondes, pour que tous les mouvements
+# datés d'avant cet instant soient validés
+STOCK_SNAPSHOT = {
+    'SAFETY_LAG': 15 * 60,
+}
+
+# Numérotation des commandes et factures (orders/numbering.py) : une série
+# continue, sans trou, par type de document, par année et, si PER_STORE, par
+# magasin (le code du magasin figure alors dans le numéro)
+DOCUMENT_NUMBERING = {
+    'order': {'PREFIX': 'CMD', 'PER_STORE': True},
+    'invoice': {'PREFIX': 'FAC', 'PER_STORE': True},
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -92,6 +188,27 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Fichiers téléversés sur S3 (django-storages) si un bucket est configuré ;
+# identifiants lus par boto3 (AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY)
+AWS_STORAGE_BUCKET_NAME = config('AWS_STORAGE_BUCKET_NAME', default='')
+if AWS_STORAGE_BUCKET_NAME:
+    DEFAULT_FILE_STORAGE = 'storages.backends.s3boto3.S3Boto3Storage'
+    AWS_S3_REGION_NAME = config('AWS_S3_REGION_NAME', default='eu-west-3')
+    AWS_DEFAULT_ACL = None
+    AWS_QUERYSTRING_AUTH = True
+    AWS_S3_FILE_OVERWRITE = False
+
+# Livraison des fichiers (bike_erp/delivery.py) : 'django' (le worker envoie
+# le fichier), 'x-accel' (nginx), 'x-sendfile' (Apache), 's3' (URL signée du
+# bucket), 'signed' (URL signée locale, doublure de 's3') ou chemin d'une
+# classe. INTERNAL_PREFIX : location interne de nginx pour 'x-accel' ;
+# URL_TTL : durée de validité des URL signées, en secondes
+FILE_DELIVERY = {
+    'BACKEND': config('FILE_DELIVERY', default='s3' if AWS_STORAGE_BUCKET_NAME else 'django'),
+    'INTERNAL_PREFIX': '/protected-media/',
+    'URL_TTL': 300,
+}
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # CORS Configuration
@@ -101,21 +218,38 @@ CORS_ALLOW_CREDENTIALS = True
 # REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'bike_erp.metrics.TimedJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'bike_erp.pagination.StandardPagination',
     'PAGE_SIZE': 50,
 }
 
+# Budgets de requêtes SQL par endpoint (voir bike_erp/query_budget.py) :
+# 'off', 'warn' (journalise) ou 'raise' (tests des budgets / CI)
+QUERY_BUDGET = config('QUERY_BUDGET', default='warn' if DEBUG else 'off')
+
 # JWT Configuration
 from datetime import timedelta
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=5),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
+    'TOKEN_OBTAIN_SERIALIZER': 'accounts.serializers.VersionedTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'accounts.serializers.VersionedTokenRefreshSerializer',
+}
+
+# Utilisateurs authentifiés par JWT (accounts/authentication.py) : durée de
+# vie en cache ; borne le délai de prise en compte d'une modification par
+# les autres workers quand le cache est local au processus
+AUTH_USER_CACHE = {
+    'TTL': 60,
 }
 
 # Social Auth - Google OAuth
@@ -146,3 +280,18 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+# Une requête HTTP ne doit jamais attendre un broker indisponible
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'max_retries': 1,
+    'interval_start': 0,
+    'interval_step': 0.2,
+    'interval_max': 0.2,
+}
+
+# Mode synchrone en mémoire (tests, développement sans Redis) : les tâches
+# s'exécutent dans le processus appelant, sans broker.
+CELERY_TASK_ALWAYS_EAGER = config('CELERY_TASK_ALWAYS_EAGER', default=False, cast=bool)
+CELERY_TASK_EAGER_PROPAGATES = CELERY_TASK_ALWAYS_EAGER
+if CELERY_TASK_ALWAYS_EAGER:
+    CELERY_BROKER_URL = 'memory://'
+    CELERY_RESULT_BACKEND = 'cache+memory://'
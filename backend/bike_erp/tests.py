@@ -0,0 +1,117 @@
+import shutil
+import tempfile
+import time
+from unittest import mock
+from urllib.parse import urlsplit
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.http import Http404
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from .delivery import deliver, safe_name
+
+NAME = 'invoices/facture 1.pdf'
+CONTENT = b'%PDF-1.4 facture'
+
+
+def delivery_settings(backend, ttl=300):
+    return override_settings(FILE_DELIVERY={
+        'BACKEND': backend, 'INTERNAL_PREFIX': '/protected-media/', 'URL_TTL': ttl,
+    })
+
+
+class FakeS3Storage:
+    """Stockage réduit à url(), comme S3Boto3Storage."""
+
+    def url(self, name, parameters=None, expire=None):
+        self.call = (name, parameters, expire)
+        return f'https://bucket.s3.amazonaws.com/{name}?X-Amz-Signature=abc'
+
+
+class DeliveryTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.media = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media.enable()
+        default_storage.save(NAME, ContentFile(CONTENT))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.media.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.request = RequestFactory().get('/api/invoices/1/download/')
+
+    def deliver(self, **options):
+        return deliver(self.request, NAME, filename='facture.pdf', content_type='application/pdf', **options)
+
+    def test_safe_name(self):
+        self.assertEqual(safe_name('invoices/a.pdf'), 'invoices/a.pdf')
+        for name in ('', '..', '../settings.py', '/etc/passwd', 'invoices/../../x', 'invoices//a.pdf', './a.pdf'):
+            with self.subTest(name=name), self.assertRaises(Http404):
+                safe_name(name)
+
+    @delivery_settings('django')
+    def test_streaming(self):
+        response = self.deliver(cache_control='private, max-age=60')
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(response['Cache-Control'], 'private, max-age=60')
+        self.assertIn('attachment; filename="facture.pdf"', response['Content-Disposition'])
+
+    @delivery_settings('x-accel')
+    def test_x_accel_redirect(self):
+        response = self.deliver()
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/invoices/facture%201.pdf')
+        self.assertEqual(response.content, b'')
+        self.assertIn('attachment; filename="facture.pdf"', response['Content-Disposition'])
+
+    @delivery_settings('x-sendfile')
+    def test_x_sendfile(self):
+        response = self.deliver()
+        self.assertEqual(response['X-Sendfile'], default_storage.path(NAME))
+        self.assertEqual(response.content, b'')
+
+    @delivery_settings('s3', ttl=120)
+    def test_s3_redirect(self):
+        storage = FakeS3Storage()
+        response = deliver(self.request, NAME, filename='facture.pdf', storage=storage)
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response['Location'].startswith('https://bucket.s3.amazonaws.com/'))
+        self.assertEqual(response['Cache-Control'], 'private, max-age=60')
+        name, parameters, expire = storage.call
+        self.assertEqual((name, expire), (NAME, 120))
+        self.assertIn('facture.pdf', parameters['ResponseContentDisposition'])
+        self.assertEqual(parameters['ResponseContentType'], 'application/pdf')
+
+    def signed_location(self):
+        response = self.deliver()
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response['Cache-Control'], 'private, max-age=150')
+        return urlsplit(response['Location']).path
+
+    @delivery_settings('signed')
+    def test_signed_url_round_trip(self):
+        response = self.client.get(self.signed_location())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertIn('filename="facture.pdf"', response['Content-Disposition'])
+
+    @delivery_settings('signed')
+    def test_signed_url_tampered(self):
+        path = self.signed_location()
+        tampered = path[:-3] + ('A' if path[-3] != 'A' else 'B') + path[-2:]
+        response = self.client.get(tampered)
+        self.assertEqual(response.status_code, 403)
+
+    @delivery_settings('signed')
+    def test_signed_url_expired(self):
+        with mock.patch('django.core.signing.time.time', return_value=time.time() - 301):
+            path = self.signed_location()
+        self.assertEqual(self.client.get(path).status_code, 403)
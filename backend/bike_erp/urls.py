@@ -1,8 +1,12 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from bike_erp.delivery import signed_file
+from bike_erp.metrics import metrics_view
+from products.images import PRODUCT_IMAGES_DIR, VARIANTS_DIR
+from products.views import image_variant, product_image
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -18,9 +22,18 @@ urlpatterns = [
     path('api/orders/', include('orders.urls')),
     path('api/invoices/', include('invoices.urls')),
     path('api/analytics/', include('analytics.urls')),
+    path('api/stock/', include('inventory.urls')),
+    path('api/metrics/', metrics_view, name='metrics'),
+    # URL signées du stockage local (bike_erp/delivery.py, FILE_DELIVERY 'signed')
+    path('api/files/<str:token>/', signed_file, name='signed-file'),
     
     # Social Auth
     path('api/social-auth/', include('social_django.urls', namespace='social')),
+    
+    # Images produit, y compris hors DEBUG ; les autres médias (factures)
+    # ne passent que par les vues qui vérifient les droits
+    re_path(rf'^{settings.MEDIA_URL.lstrip("/")}{VARIANTS_DIR}/(?P<path>.+)$', image_variant),
+    re_path(rf'^{settings.MEDIA_URL.lstrip("/")}{PRODUCT_IMAGES_DIR}/(?P<path>.+)$', product_image),
 ]
 
 if settings.DEBUG:
@@ -0,0 +1,229 @@
+"""
+Lecture et écriture de fichiers XLSX en flux, sans dépendance externe.
+
+Un classeur XLSX est une archive zip de fichiers XML. stream_xlsx() produit
+l'archive morceau par morceau (feuille unique, chaînes en ligne, pas de
+table de chaînes partagées) : la mémoire utilisée ne dépend pas du nombre
+de lignes, et les premiers octets partent dès la première ligne écrite.
+
+iter_xlsx_rows() lit la première feuille ligne par ligne avec iterparse ;
+seule la table des chaînes partagées est chargée en mémoire.
+"""
+
+import datetime
+import decimal
+import posixpath
+import re
+import zipfile
+from xml.etree.ElementTree import ParseError, iterparse
+from xml.sax.saxutils import escape
+
+CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+_CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>
+<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>
+</Types>"""
+
+_ROOT_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>
+</Relationships>"""
+
+_WORKBOOK = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">
+<sheets><sheet name="{name}" sheetId="1" r:id="rId1"/></sheets>
+</workbook>"""
+
+_WORKBOOK_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>
+</Relationships>"""
+
+_SHEET_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_SHEET_TAIL = '</sheetData></worksheet>'
+
+
+class _Pipe:
+    """Fichier en écriture seule (non seekable) dont on vide le contenu au fil de l'eau."""
+
+    def __init__(self):
+        self.chunks = []
+        self.offset = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.offset
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _cell(value):
+    if value is None:
+        return '<c/>'
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float, decimal.Decimal)):
+        return f'<c><v>{value}</v></c>'
+    if isinstance(value, datetime.datetime):
+        value = value.strftime('%Y-%m-%d %H:%M:%S')
+    elif isinstance(value, datetime.date):
+        value = value.isoformat()
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{escape(str(value))}</t></is></c>'
+
+
+def _row(values):
+    return '<row>' + ''.join(_cell(value) for value in values) + '</row>'
+
+
+def stream_xlsx(rows, sheet_name='Feuille1', rows_per_chunk=500):
+    """
+    Génère les octets d'un classeur d'une feuille contenant `rows` (itérable
+    de séquences ; la première est en général l'en-tête).
+    """
+    pipe = _Pipe()
+    with zipfile.ZipFile(pipe, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', _CONTENT_TYPES)
+        archive.writestr('_rels/.rels', _ROOT_RELS)
+        archive.writestr('xl/workbook.xml', _WORKBOOK.format(name=escape(sheet_name)))
+        archive.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS)
+        yield pipe.drain()
+
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(_SHEET_HEAD.encode())
+            pending = []
+            for values in rows:
+                pending.append(_row(values))
+                if len(pending) >= rows_per_chunk:
+                    sheet.write(''.join(pending).encode())
+                    pending = []
+                    # Le compresseur garde parfois tout en tampon : rien à envoyer
+                    data = pipe.drain()
+                    if data:
+                        yield data
+            sheet.write((''.join(pending) + _SHEET_TAIL).encode())
+    yield pipe.drain()
+
+
+_MAIN_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+_PKG_REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+_COLUMN_RE = re.compile(r'[A-Z]+')
+
+
+class XLSXError(ValueError):
+    pass
+
+
+def _column_index(reference):
+    index = 0
+    for letter in _COLUMN_RE.match(reference).group():
+        index = index * 26 + ord(letter) - ord('A') + 1
+    return index - 1
+
+
+def _text(element):
+    """Texte d'un <si> ou <is>, y compris les morceaux en texte enrichi (<r><t>)."""
+    return ''.join(node.text or '' for node in element.iter(f'{_MAIN_NS}t'))
+
+
+def _first_sheet_path(archive):
+    with archive.open('xl/workbook.xml') as workbook:
+        for _, element in iterparse(workbook):
+            if element.tag == f'{_MAIN_NS}sheet':
+                rel_id = element.get(f'{_REL_NS}id')
+                break
+        else:
+            raise XLSXError('Classeur sans feuille')
+    with archive.open('xl/_rels/workbook.xml.rels') as rels:
+        for _, element in iterparse(rels):
+            if element.tag == f'{_PKG_REL_NS}Relationship' and element.get('Id') == rel_id:
+                target = element.get('Target')
+                if target.startswith('/'):
+                    return target.lstrip('/')
+                return posixpath.normpath(posixpath.join('xl', target))
+    raise XLSXError('Feuille introuvable')
+
+
+def _shared_strings(archive):
+    if 'xl/sharedStrings.xml' not in archive.namelist():
+        return []
+    strings = []
+    with archive.open('xl/sharedStrings.xml') as source:
+        for _, element in iterparse(source):
+            if element.tag == f'{_MAIN_NS}si':
+                strings.append(_text(element))
+                element.clear()
+    return strings
+
+
+def _cell_value(cell, strings):
+    cell_type = cell.get('t', 'n')
+    if cell_type == 'inlineStr':
+        inline = cell.find(f'{_MAIN_NS}is')
+        return _text(inline) if inline is not None else ''
+    value = cell.findtext(f'{_MAIN_NS}v')
+    if value is None:
+        return None
+    if cell_type == 's':
+        return strings[int(value)]
+    if cell_type == 'b':
+        return value == '1'
+    if cell_type == 'n':
+        number = decimal.Decimal(value)
+        return int(number) if number == number.to_integral_value() else number
+    return value
+
+
+def iter_xlsx_rows(file):
+    """
+    Génère les lignes de la première feuille de `file` (chemin ou fichier
+    seekable) sous forme de listes de valeurs ; les cellules vides
+    intermédiaires valent None et les lignes absentes du fichier sont rendues
+    vides, pour que la position corresponde au numéro de ligne Excel. Les
+    dates restent des numéros de série Excel.
+    """
+    try:
+        archive = zipfile.ZipFile(file)
+    except zipfile.BadZipFile as e:
+        raise XLSXError(f'Fichier XLSX illisible : {e}')
+    with archive:
+        try:
+            strings = _shared_strings(archive)
+            sheet_path = _first_sheet_path(archive)
+        except (KeyError, ParseError) as e:
+            raise XLSXError(f'Fichier XLSX illisible : {e}')
+        with archive.open(sheet_path) as sheet:
+            row_number = 0
+            for _, element in iterparse(sheet):
+                if element.tag != f'{_MAIN_NS}row':
+                    continue
+                number = int(element.get('r') or row_number + 1)
+                while row_number + 1 < number:
+                    row_number += 1
+                    yield []
+                row_number = number
+                values = []
+                for cell in element.iter(f'{_MAIN_NS}c'):
+                    reference = cell.get('r')
+                    index = _column_index(reference) if reference else len(values)
+                    values.extend([None] * (index - len(values)))
+                    values.append(_cell_value(cell, strings))
+                element.clear()
+                yield values
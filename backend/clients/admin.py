@@ -7,3 +7,4 @@ class ClientAdmin(admin.ModelAdmin):
     list_display = ['full_name', 'email', 'phone', 'total_purchases', 'visit_count']
     search_fields = ['first_name', 'last_name', 'email']
     list_filter = ['is_active']
+    readonly_fields = ['total_purchases', 'visit_count']
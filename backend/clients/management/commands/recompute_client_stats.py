@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from clients.stats import recompute_client_stats
+
+
+class Command(BaseCommand):
+    help = "Recalcule total_purchases et visit_count de tous les clients à partir des commandes terminées"
+
+    def handle(self, *args, **options):
+        count = recompute_client_stats()
+        self.stdout.write(self.style.SUCCESS(f"Statistiques recalculées pour {count} client(s)"))
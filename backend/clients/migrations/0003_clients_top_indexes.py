@@ -0,0 +1,46 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:42
+
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def compute_client_stats(apps, schema_editor):
+    """Valeurs initiales : les champs n'étaient jamais mis à jour jusqu'ici."""
+    Client = apps.get_model('clients', 'Client')
+    Order = apps.get_model('orders', 'Order')
+    completed = (
+        Order.objects.filter(client=OuterRef('pk'), status='completed')
+        .order_by().values('client')
+    )
+    money = DecimalField(max_digits=10, decimal_places=2)
+    Client.objects.update(
+        total_purchases=Coalesce(
+            Subquery(completed.annotate(total=Sum('total_ttc')).values('total'), output_field=money),
+            0, output_field=money,
+        ),
+        visit_count=Coalesce(
+            Subquery(completed.annotate(visits=Count('pk')).values('visits'), output_field=IntegerField()),
+            0,
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0002_clients_created_id_index'),
+        ('orders', '0005_order_store_fk'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['-total_purchases', '-id'], name='clients_top_purchases_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['-visit_count', '-id'], name='clients_top_visits_idx'),
+        ),
+        migrations.RunPython(compute_client_stats, migrations.RunPython.noop),
+    ]
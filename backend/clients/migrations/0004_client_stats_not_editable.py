@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0003_clients_top_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='client',
+            name='total_purchases',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10),
+        ),
+        migrations.AlterField(
+            model_name='client',
+            name='visit_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+    ]
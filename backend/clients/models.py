@@ -15,23 +15,38 @@ class Client(models.Model):
     notes = models.TextField(blank=True)
     
     is_active = models.BooleanField(default=True)
-    total_purchases = models.DecimalField(max_digits=10, decimal_places=2, default=0)
-    visit_count = models.IntegerField(default=0)
+    # Maintenus par clients.stats à chaque commande terminée ou annulée
+    total_purchases = models.DecimalField(max_digits=10, decimal_places=2, default=0, editable=False)
+    visit_count = models.IntegerField(default=0, editable=False)
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         db_table = 'clients'
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
         indexes = [
             models.Index(fields=['email']),
             models.Index(fields=['last_name', 'first_name']),
+            models.Index(fields=['-created_at', '-id'], name='clients_created_id_idx'),
+            # Classements de /clients/top/
+            models.Index(fields=['-total_purchases', '-id'], name='clients_top_purchases_idx'),
+            models.Index(fields=['-visit_count', '-id'], name='clients_top_visits_idx'),
         ]
     
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
     
+    def save(self, *args, **kwargs):
+        # Statistiques écrites uniquement par des UPDATE relatifs (clients.stats) :
+        # enregistrer une fiche lue avant une vente ne doit pas les écraser
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in ('total_purchases', 'visit_count')
+            ]
+        super().save(*args, **kwargs)
+    
     @property
     def full_name(self):
         return f"{self.first_name} {self.last_name}"
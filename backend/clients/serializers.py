@@ -1,8 +1,10 @@
 from rest_framework import serializers
+from bike_erp.fieldsets import SparseFieldsetsMixin
 from .models import Client
 
 
-class ClientSerializer(serializers.ModelSerializer):
+class ClientSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     class Meta:
         model = Client
         fields = '__all__'
+        read_only_fields = ['total_purchases', 'visit_count']
@@ -0,0 +1,23 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from bike_erp.conditional import mark_changed
+from orders.signals import order_cancelled, order_completed
+from .models import Client
+from .stats import apply_order
+
+
+@receiver(post_save, sender=Client)
+@receiver(post_delete, sender=Client)
+def mark_client_changed(sender, **kwargs):
+    mark_changed(Client)
+
+
+@receiver(order_completed)
+def add_order_to_client_stats(sender, order, items, **kwargs):
+    apply_order(order, sign=1)
+
+
+@receiver(order_cancelled)
+def remove_order_from_client_stats(sender, order, items, **kwargs):
+    apply_order(order, sign=-1)
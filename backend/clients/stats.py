@@ -0,0 +1,56 @@
+"""
+Statistiques client dénormalisées : total_purchases (somme TTC des commandes
+terminées) et visit_count (nombre de commandes terminées).
+
+Mises à jour par UPDATE relatif (F()) dans la transaction qui termine ou
+annule la commande (récepteurs de clients/signals.py) : deux caisses qui
+encaissent le même client en même temps ne s'écrasent pas.
+recompute_client_stats() les reconstruit depuis l'historique des commandes.
+"""
+
+from django.db.models import Count, DecimalField, F, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from bike_erp.conditional import mark_changed
+from sync.log import record_changes
+from orders.models import Order
+from .models import Client
+
+
+def apply_order(order, sign=1):
+    Client.objects.filter(pk=order.client_id).update(
+        total_purchases=F('total_purchases') + sign * order.total_ttc,
+        visit_count=F('visit_count') + sign,
+        updated_at=timezone.now(),
+    )
+    mark_changed(Client)
+    record_changes(Client, [order.client_id])
+
+
+def recompute_client_stats(queryset=None):
+    """
+    Recalcule les statistiques en un seul UPDATE, avec les agrégats par
+    client en sous-requêtes corrélées (index orders (client, created_at)).
+    Retourne le nombre de clients mis à jour.
+    """
+    if queryset is None:
+        queryset = Client.objects.all()
+    completed = (
+        Order.objects.filter(client=OuterRef('pk'), status='completed')
+        .order_by().values('client')
+    )
+    money = DecimalField(max_digits=10, decimal_places=2)
+    mark_changed(Client)
+    record_changes(Client, queryset.values_list('pk', flat=True))
+    return queryset.update(
+        total_purchases=Coalesce(
+            Subquery(completed.annotate(total=Sum('total_ttc')).values('total'), output_field=money),
+            0, output_field=money,
+        ),
+        visit_count=Coalesce(
+            Subquery(completed.annotate(visits=Count('pk')).values('visits'), output_field=IntegerField()),
+            0,
+        ),
+        updated_at=timezone.now(),
+    )
@@ -0,0 +1,66 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from bike_erp.query_budget_cases import QueryBudgetCases
+from inventory.models import StoreStock
+from orders.checkout import place_order
+from products.models import Category, Product
+from .models import Client
+
+
+class ClientStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username='vendeur', email='vendeur@example.com', password='vendeur')
+        category = Category.objects.create(name='Vélos')
+        cls.product = Product.objects.create(
+            reference='STATS-1', name='Vélo de route', category=category,
+            price_ht=Decimal('1000.00'), price_ttc=Decimal('1200.00'),
+        )
+        StoreStock.objects.create(product=cls.product, store_id='garches', quantity=5)
+
+    def setUp(self):
+        self.client_record = Client.objects.create(
+            first_name='Anne', last_name='Durand', email='anne@example.com', phone='0100000000',
+        )
+        # Fiche lue avant la vente, enregistrée après
+        self.stale = Client.objects.get(pk=self.client_record.pk)
+        place_order(
+            client_id=self.client_record.pk, user=self.user, store='garches',
+            items=[{
+                'product': self.product.pk, 'quantity': 1, 'unit_price_ht': '1000.00',
+                'unit_price_ttc': '1200.00', 'tva_rate': '20.00',
+            }],
+        )
+
+    def assertStats(self):
+        self.client_record.refresh_from_db()
+        self.assertEqual(self.client_record.total_purchases, Decimal('1200.00'))
+        self.assertEqual(self.client_record.visit_count, 1)
+
+    def test_saving_stale_instance_keeps_stats(self):
+        self.stale.phone = '0200000000'
+        self.stale.save()
+        self.assertStats()
+        self.assertEqual(self.client_record.phone, '0200000000')
+
+    def test_api_update_keeps_stats(self):
+        api = APIClient()
+        api.force_authenticate(self.user)
+        response = api.patch(f'/api/clients/{self.client_record.pk}/', {
+            'city': 'Garches', 'total_purchases': '0.00', 'visit_count': 0,
+        }, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertStats()
+
+
+class ClientQueryBudgetTests(QueryBudgetCases, TestCase):
+    endpoints = [
+        ('clients-list', 'get', '/api/clients/'),
+        ('clients-changes', 'get', '/api/clients/changes/'),
+        ('clients-top', 'get', '/api/clients/top/'),
+        ('clients-summary', 'get', '/api/clients/{client}/summary/'),
+    ]
@@ -1,11 +1,84 @@
-from rest_framework import viewsets, filters
+from decimal import Decimal
+
+from django.db.models import F
+from rest_framework import viewsets, filters, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from bike_erp.conditional import ConditionalListMixin
+from bike_erp.fieldsets import SparseFieldsetsViewMixin
+from bike_erp.query_budget import QueryBudgetMixin
+from orders.models import Order
+from sync.views import ChangesMixin
 from .models import Client
 from .serializers import ClientSerializer
 
+# Classements possibles de /clients/top/ (index clients_top_*_idx)
+TOP_ORDERINGS = {
+    'total_purchases': ['-total_purchases', '-id'],
+    'visit_count': ['-visit_count', '-id'],
+}
+TOP_DEFAULT_LIMIT = 10
+TOP_MAX_LIMIT = 100
+TWO_PLACES = Decimal('0.01')
+
 
-class ClientViewSet(viewsets.ModelViewSet):
+class ClientViewSet(QueryBudgetMixin, ConditionalListMixin, SparseFieldsetsViewMixin, ChangesMixin,
+                    viewsets.ModelViewSet):
     queryset = Client.objects.all()
     serializer_class = ClientSerializer
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['first_name', 'last_name', 'email', 'phone']
-    ordering_fields = ['created_at', 'last_name']
+    ordering_fields = ['created_at', 'last_name', 'total_purchases', 'visit_count']
+    fieldset_actions = ('list', 'retrieve', 'changes')
+    compact_fields = [
+        'id', 'first_name', 'last_name', 'email', 'phone', 'city',
+        'total_purchases', 'visit_count', 'is_active',
+    ]
+    query_budgets = {
+        'list': 3,
+        'changes': 3,
+        'top': 1,
+        'summary': 2,
+    }
+    
+    @action(detail=False, methods=['get'])
+    def top(self, request):
+        """Meilleurs clients : ?by=total_purchases|visit_count&limit=10."""
+        by = request.query_params.get('by', 'total_purchases')
+        if by not in TOP_ORDERINGS:
+            return Response(
+                {'error': f"by doit valoir : {', '.join(TOP_ORDERINGS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            limit = int(request.query_params.get('limit', TOP_DEFAULT_LIMIT))
+        except ValueError:
+            return Response({'error': 'limit invalide'}, status=status.HTTP_400_BAD_REQUEST)
+        limit = min(max(limit, 1), TOP_MAX_LIMIT)
+        clients = Client.objects.filter(is_active=True).order_by(*TOP_ORDERINGS[by])[:limit]
+        return Response(list(clients.values(
+            'id', 'first_name', 'last_name', 'email', 'phone', 'total_purchases', 'visit_count',
+        )))
+    
+    @action(detail=True, methods=['get'])
+    def summary(self, request, pk=None):
+        """Fiche synthétique : statistiques dénormalisées et dernière commande."""
+        client = self.get_object()
+        last_order = (
+            Order.objects.filter(client=client)
+            .order_by('-created_at', '-id')
+            .values('id', 'order_number', 'created_at', 'status', 'total_ttc', store_name=F('store__name'))
+            .first()
+        )
+        visits = client.visit_count
+        return Response({
+            'id': client.id,
+            'full_name': client.full_name,
+            'email': client.email,
+            'phone': client.phone,
+            'client_since': client.created_at,
+            'total_purchases': client.total_purchases,
+            'visit_count': visits,
+            'average_basket': (client.total_purchases / visits).quantize(TWO_PLACES) if visits else None,
+            'last_order': last_order,
+        })
@@ -0,0 +1,45 @@
+from django.contrib import admin
+from .models import StockMovement, StockSnapshot, Store, StoreStock
+
+
+@admin.register(Store)
+class StoreAdmin(admin.ModelAdmin):
+    list_display = ['code', 'name', 'phone', 'email', 'is_active']
+    list_filter = ['is_active']
+
+
+@admin.register(StoreStock)
+class StoreStockAdmin(admin.ModelAdmin):
+    list_display = ['product', 'store', 'quantity', 'alert_level', 'updated_at']
+    list_filter = ['store']
+    search_fields = ['product__reference', 'product__name']
+    list_select_related = ['product']
+    # Le stock se corrige par un mouvement d'ajustement
+    readonly_fields = ['product', 'store', 'quantity']
+
+
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+    list_display = ['created_at', 'product', 'store', 'kind', 'quantity', 'reference', 'user']
+    list_filter = ['kind', 'store']
+    search_fields = ['product__reference', 'product__name', 'reference']
+    list_select_related = ['product', 'user']
+    date_hierarchy = 'created_at'
+    
+    # Journal en insertion seule : les corrections passent par un ajustement
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+    
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(StockSnapshot)
+class StockSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['taken_at', 'product', 'store', 'quantity']
+    list_filter = ['store']
+    list_select_related = ['product']
+    date_hierarchy = 'taken_at'
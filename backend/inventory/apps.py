@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class InventoryConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'inventory'
+    verbose_name = 'Stock'
+    
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,239 @@
+"""
+Journal des mouvements de stock.
+
+record_movements() est le seul point d'écriture du stock : il insère les
+mouvements (en lot) et met à jour les compteurs StoreStock par des UPDATE
+relatifs (F() + delta), un par magasin, puis Product.total_stock par un
+UPDATE du même type. Une sortie qui rendrait un stock
+négatif est refusée par la clause WHERE, sans lecture préalable : deux
+ventes simultanées dans deux magasins ne peuvent pas s'écraser.
+
+Les instantanés (StockSnapshot) permettent de connaître le stock à une date
+passée à partir du dernier instantané antérieur et des seuls mouvements
+postérieurs, sans rejouer tout le journal.
+"""
+
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Max, Q, Sum, Value, When
+from django.utils import timezone
+
+from bike_erp.conditional import mark_changed
+from products.barcode_cache import barcode_cache
+from products.models import Product
+from sync.log import record_changes
+from .models import StockMovement, StockSnapshot, Store, StoreStock
+
+STORES_CACHE_KEY = 'inventory:stores'
+
+
+class StockError(Exception):
+    pass
+
+
+class InsufficientStock(StockError):
+    def __init__(self, products):
+        self.products = products
+        names = ', '.join(p.name for p in products)
+        super().__init__(f"Stock insuffisant pour : {names}")
+
+
+def stores():
+    """{code: actif} de tous les magasins, mis en cache (invalidé par inventory.signals)."""
+    codes = cache.get(STORES_CACHE_KEY)
+    if codes is None:
+        codes = dict(Store.objects.values_list('code', 'is_active'))
+        cache.set(STORES_CACHE_KEY, codes, 3600)
+    return codes
+
+
+def check_store(code, active=False):
+    known = stores()
+    if code not in known or (active and not known[code]):
+        raise StockError(f"Magasin inconnu : {code}")
+
+
+def _delta_case(deltas, field='product_id'):
+    """Expression CASE product_id WHEN ... THEN delta END pour un UPDATE groupé."""
+    return Case(
+        *[When(**{field: pk}, then=Value(delta)) for pk, delta in deltas.items()],
+        output_field=IntegerField(),
+    )
+
+
+def _apply(store, deltas, allow_negative):
+    withdrawals = {pk: -delta for pk, delta in deltas.items() if delta < 0}
+    if allow_negative or len(withdrawals) < len(deltas):
+        # Premier mouvement d'un produit dans ce magasin : ligne à 0
+        StoreStock.objects.bulk_create(
+            [StoreStock(product_id=pk, store_id=store) for pk in deltas],
+            ignore_conflicts=True,
+        )
+    queryset = StoreStock.objects.filter(store_id=store, product_id__in=deltas.keys())
+    if withdrawals and not allow_negative:
+        queryset = queryset.filter(
+            ~Q(product_id__in=withdrawals.keys())
+            | Q(quantity__gte=_delta_case(withdrawals))
+        )
+    # updated_at marque les lignes effectivement modifiées
+    marker = timezone.now()
+    updated = queryset.update(quantity=F('quantity') + _delta_case(deltas), updated_at=marker)
+    if updated != len(deltas):
+        done = set(
+            StoreStock.objects.filter(store_id=store, product_id__in=deltas.keys(), updated_at=marker)
+            .values_list('product_id', flat=True)
+        )
+        raise InsufficientStock(list(Product.objects.filter(pk__in=set(deltas) - done)))
+
+
+def record_movements(movements, allow_negative=False):
+    """
+    Enregistre des StockMovement (non sauvegardés) et met à jour les compteurs.
+
+    Requêtes : un INSERT groupé, un UPDATE par magasin concerné et un UPDATE
+    des produits (total_stock, updated_at : la fiche produit a changé). Lève
+    InsufficientStock si une sortie rend un stock négatif (sauf
+    allow_negative) ; la transaction est alors annulée.
+    """
+    movements = [movement for movement in movements if movement.quantity]
+    if not movements:
+        return []
+    deltas = defaultdict(lambda: defaultdict(int))
+    totals = defaultdict(int)
+    for movement in movements:
+        check_store(movement.store_id)
+        deltas[movement.store_id][movement.product_id] += movement.quantity
+        totals[movement.product_id] += movement.quantity
+
+    with transaction.atomic(savepoint=False):
+        StockMovement.objects.bulk_create(movements)
+        for store, product_deltas in deltas.items():
+            product_deltas = {pk: delta for pk, delta in product_deltas.items() if delta}
+            if product_deltas:
+                _apply(store, product_deltas, allow_negative)
+        Product.objects.filter(pk__in=totals.keys()).update(
+            total_stock=F('total_stock') + _delta_case(totals, field='pk'),
+            updated_at=timezone.now(),
+        )
+        mark_changed(Product, StoreStock)
+        record_changes(Product, totals.keys())
+        # Le stock renvoyé par les scans de codes-barres a changé
+        barcode_cache.invalidate_on_commit(
+            {'id': movement.product_id, 'barcode': None} for movement in movements
+        )
+    return movements
+
+
+def transfer(product, from_store, to_store, quantity, user=None, reference=''):
+    """Transfert entre magasins : deux mouvements liés par un même transfer_id."""
+    if from_store == to_store:
+        raise StockError("Les magasins de départ et d'arrivée sont identiques")
+    if quantity <= 0:
+        raise StockError("La quantité transférée doit être positive")
+    transfer_id = uuid.uuid4()
+    return record_movements([
+        StockMovement(product=product, store_id=from_store, kind='transfer', quantity=-quantity,
+                      transfer_id=transfer_id, user=user, reference=reference),
+        StockMovement(product=product, store_id=to_store, kind='transfer', quantity=quantity,
+                      transfer_id=transfer_id, user=user, reference=reference),
+    ])
+
+
+def set_stock_levels(products_levels, user=None, reference=''):
+    """
+    Ramène des stocks à des valeurs absolues (saisie d'inventaire, formulaire
+    produit) en enregistrant les ajustements correspondants.
+
+    `products_levels` : liste de (product, {code magasin: quantité}). Les
+    compteurs actuels sont relus sous verrou.
+    """
+    products_levels = [(product, levels) for product, levels in products_levels if levels]
+    if not products_levels:
+        return []
+    for _, levels in products_levels:
+        for store in levels:
+            check_store(store)
+    current = {
+        (product_id, store): quantity
+        for product_id, store, quantity in StoreStock.objects.select_for_update().filter(
+            product_id__in=[product.pk for product, _ in products_levels]
+        ).values_list('product_id', 'store_id', 'quantity')
+    }
+
+    movements = []
+    for product, levels in products_levels:
+        for store, quantity in levels.items():
+            delta = quantity - current.get((product.pk, store), 0)
+            if delta:
+                movements.append(StockMovement(
+                    product_id=product.pk, store_id=store, kind='adjustment',
+                    quantity=delta, user=user, reference=reference,
+                ))
+    return record_movements(movements, allow_negative=True)
+
+
+def latest_snapshot_time(at):
+    return StockSnapshot.objects.filter(taken_at__lte=at).aggregate(latest=Max('taken_at'))['latest']
+
+
+def stock_as_of(at, product_ids=None, store=None):
+    """
+    Stock à l'instant `at` : {(product_id, store): quantité}, couples non nuls.
+
+    Trois requêtes : date du dernier instantané antérieur, lignes de cet
+    instantané, somme des mouvements entre l'instantané et `at`.
+    """
+    base_time = latest_snapshot_time(at)
+    movements = StockMovement.objects.filter(created_at__lte=at)
+    snapshots = StockSnapshot.objects.none()
+    if base_time is not None:
+        movements = movements.filter(created_at__gt=base_time)
+        snapshots = StockSnapshot.objects.filter(taken_at=base_time)
+    if product_ids is not None:
+        movements = movements.filter(product_id__in=product_ids)
+        snapshots = snapshots.filter(product_id__in=product_ids)
+    if store is not None:
+        movements = movements.filter(store_id=store)
+        snapshots = snapshots.filter(store_id=store)
+
+    levels = defaultdict(int)
+    for product_id, snapshot_store, quantity in snapshots.values_list('product_id', 'store_id', 'quantity'):
+        levels[(product_id, snapshot_store)] += quantity
+    for row in movements.values('product_id', 'store_id').annotate(delta=Sum('quantity')).order_by():
+        levels[(row['product_id'], row['store_id'])] += row['delta']
+    return {key: quantity for key, quantity in levels.items() if quantity}
+
+
+def take_snapshot(at):
+    """
+    Enregistre l'instantané du stock à l'instant `at` ; retourne le nombre de lignes.
+
+    created_at d'un mouvement est fixé avant le commit de sa transaction : un
+    mouvement daté d'avant `at` mais validé après l'instantané en serait absent,
+    puis ignoré par stock_as_of() (created_at > instantané). `at` doit donc
+    précéder maintenant d'au moins STOCK_SNAPSHOT['SAFETY_LAG'] secondes, plus
+    que la plus longue transaction qui écrit des mouvements.
+    """
+    lag = timedelta(seconds=settings.STOCK_SNAPSHOT['SAFETY_LAG'])
+    if at > timezone.now() - lag:
+        raise StockError(
+            f"Instantané trop récent : attendre {lag} après {at:%Y-%m-%d %H:%M} "
+            "que les mouvements antérieurs soient tous validés"
+        )
+    with transaction.atomic():
+        if StockSnapshot.objects.filter(taken_at=at).exists():
+            raise StockError(f"Un instantané existe déjà pour {at}")
+        levels = stock_as_of(at)
+        StockSnapshot.objects.bulk_create(
+            [
+                StockSnapshot(product_id=product_id, store_id=store, taken_at=at, quantity=quantity)
+                for (product_id, store), quantity in levels.items()
+            ],
+            batch_size=1000,
+        )
+    return len(levels)
@@ -0,0 +1,65 @@
+from datetime import datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from inventory.ledger import StockError, stock_as_of, take_snapshot
+from inventory.models import StoreStock
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        "Enregistre un instantané du stock calculé depuis le journal des mouvements "
+        "(par défaut à minuit, début de la journée en cours). À planifier chaque nuit, "
+        "au moins STOCK_SNAPSHOT['SAFETY_LAG'] secondes après minuit."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--at', help="Instant de l'instantané (AAAA-MM-JJ[THH:MM])")
+        parser.add_argument('--verify', action='store_true', help="Comparer le journal aux compteurs des produits")
+
+    def handle(self, *args, **options):
+        if options['verify']:
+            return self.verify()
+
+        if options['at']:
+            at = parse_datetime(options['at']) or (
+                datetime.combine(datetime.fromisoformat(options['at']).date(), time.min)
+            )
+            if timezone.is_naive(at):
+                at = timezone.make_aware(at)
+        else:
+            at = timezone.make_aware(datetime.combine(timezone.localdate(), time.min))
+        if at > timezone.now():
+            raise CommandError("Impossible de prendre un instantané dans le futur")
+        try:
+            count = take_snapshot(at)
+        except StockError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"Instantané du {at:%Y-%m-%d %H:%M} : {count} lignes"))
+
+    def verify(self):
+        levels = stock_as_of(timezone.now())
+        mismatches = 0
+        rows = StoreStock.objects.values_list('product_id', 'product__reference', 'store_id', 'quantity')
+        for product_id, reference, store, quantity in rows.iterator():
+            expected = levels.pop((product_id, store), 0)
+            if quantity != expected:
+                mismatches += 1
+                self.stdout.write(f"  {reference} ({store}) : compteur {quantity}, journal {expected}")
+        # Mouvements sans ligne de stock correspondante
+        for (product_id, store), expected in levels.items():
+            mismatches += 1
+            self.stdout.write(f"  produit {product_id} ({store}) : aucun compteur, journal {expected}")
+        totals = Product.objects.annotate(stores_total=Sum('store_stocks__quantity', default=0)).exclude(
+            total_stock=F('stores_total')
+        )
+        for reference, total_stock, stores_total in totals.values_list('reference', 'total_stock', 'stores_total'):
+            mismatches += 1
+            self.stdout.write(f"  {reference} : total {total_stock}, somme des magasins {stores_total}")
+        if mismatches:
+            raise CommandError(f"{mismatches} compteur(s) différent(s) du journal")
+        self.stdout.write(self.style.SUCCESS("Compteurs de stock conformes au journal"))
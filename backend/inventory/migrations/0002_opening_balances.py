@@ -0,0 +1,40 @@
+from django.db import migrations
+from django.utils import timezone
+
+STOCK_FIELDS = {
+    'ville_avray': 'stock_ville_avray',
+    'garches': 'stock_garches',
+}
+
+
+def record_opening_balances(apps, schema_editor):
+    """Un ajustement « Stock initial » par produit et magasin, pour que le journal
+    corresponde aux compteurs existants."""
+    Product = apps.get_model('products', 'Product')
+    StockMovement = apps.get_model('inventory', 'StockMovement')
+    now = timezone.now()
+    batch = []
+    rows = Product.objects.values_list('pk', *STOCK_FIELDS.values()).order_by('pk')
+    for pk, *quantities in rows.iterator(chunk_size=2000):
+        for store, quantity in zip(STOCK_FIELDS, quantities):
+            if quantity:
+                batch.append(StockMovement(
+                    product_id=pk, store=store, kind='adjustment', quantity=quantity,
+                    reference='Stock initial', created_at=now,
+                ))
+        if len(batch) >= 2000:
+            StockMovement.objects.bulk_create(batch)
+            batch = []
+    StockMovement.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0001_initial'),
+        ('products', '0005_products_created_id_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(record_opening_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,100 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+STORES = [
+    ('ville_avray', "Ville d'Avray"),
+    ('garches', 'Garches'),
+]
+STOCK_FIELDS = {
+    'ville_avray': 'stock_ville_avray',
+    'garches': 'stock_garches',
+}
+
+
+def create_stores(apps, schema_editor):
+    Store = apps.get_model('inventory', 'Store')
+    for code, name in STORES:
+        Store.objects.get_or_create(code=code, defaults={'name': name})
+
+
+def copy_product_stock(apps, schema_editor):
+    """Une ligne StoreStock par produit et magasin, seuil repris de alert_stock."""
+    Product = apps.get_model('products', 'Product')
+    StoreStock = apps.get_model('inventory', 'StoreStock')
+    batch = []
+    rows = Product.objects.values_list('pk', 'alert_stock', *STOCK_FIELDS.values()).order_by('pk')
+    for pk, alert_stock, *quantities in rows.iterator(chunk_size=2000):
+        for store, quantity in zip(STOCK_FIELDS, quantities):
+            batch.append(StoreStock(product_id=pk, store_id=store, quantity=quantity, alert_level=alert_stock))
+        if len(batch) >= 2000:
+            StoreStock.objects.bulk_create(batch)
+            batch = []
+    StoreStock.objects.bulk_create(batch)
+
+
+def restore_product_stock(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    StoreStock = apps.get_model('inventory', 'StoreStock')
+    for stock in StoreStock.objects.filter(store_id__in=STOCK_FIELDS).iterator():
+        Product.objects.filter(pk=stock.product_id).update(**{STOCK_FIELDS[stock.store_id]: stock.quantity})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0002_opening_balances'),
+        ('products', '0005_products_created_id_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Store',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.SlugField(max_length=20, unique=True)),
+                ('name', models.CharField(max_length=100)),
+                ('address', models.TextField(blank=True)),
+                ('phone', models.CharField(blank=True, max_length=20)),
+                ('email', models.EmailField(blank=True, max_length=254)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'stores',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.RunPython(create_stores, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='stockmovement',
+            name='store',
+            field=models.ForeignKey(db_column='store', on_delete=django.db.models.deletion.PROTECT, related_name='stock_movements', to='inventory.store', to_field='code'),
+        ),
+        migrations.AlterField(
+            model_name='stocksnapshot',
+            name='store',
+            field=models.ForeignKey(db_column='store', on_delete=django.db.models.deletion.PROTECT, related_name='stock_snapshots', to='inventory.store', to_field='code'),
+        ),
+        migrations.CreateModel(
+            name='StoreStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField(default=0)),
+                ('alert_level', models.IntegerField(default=5)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='store_stocks', to='products.product')),
+                ('store', models.ForeignKey(db_column='store', on_delete=django.db.models.deletion.PROTECT, related_name='stocks', to='inventory.store', to_field='code')),
+            ],
+            options={
+                'db_table': 'store_stocks',
+                'indexes': [models.Index(condition=models.Q(('quantity__lte', models.F('alert_level'))), fields=['store', 'product'], name='store_stock_low_idx'), models.Index(condition=models.Q(('quantity__gt', 0)), fields=['store', 'product'], name='store_stock_available_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='storestock',
+            constraint=models.UniqueConstraint(fields=('store', 'product'), name='store_stock_unique'),
+        ),
+        migrations.RunPython(copy_product_stock, restore_product_stock),
+    ]
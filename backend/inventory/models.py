@@ -0,0 +1,146 @@
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+from products.models import Product
+
+
+class LedgerError(Exception):
+    pass
+
+
+class AppendOnlyQuerySet(models.QuerySet):
+    """Le journal ne se corrige que par de nouveaux mouvements."""
+
+    def update(self, **kwargs):
+        raise LedgerError("Les mouvements de stock ne peuvent pas être modifiés")
+
+    def delete(self):
+        raise LedgerError("Les mouvements de stock ne peuvent pas être supprimés")
+
+
+class Store(models.Model):
+    """Magasin. Le code sert de clé dans les commandes, stocks et mouvements."""
+    code = models.SlugField(max_length=20, unique=True)
+    name = models.CharField(max_length=100)
+    address = models.TextField(blank=True)
+    phone = models.CharField(max_length=20, blank=True)
+    email = models.EmailField(blank=True)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'stores'
+        ordering = ['name']
+    
+    def __str__(self):
+        return self.name
+
+
+class StoreStock(models.Model):
+    """
+    Stock d'un produit dans un magasin. Compteur mis à jour uniquement par
+    inventory.ledger.record_movements() ; une ligne absente vaut 0.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='store_stocks')
+    store = models.ForeignKey(Store, on_delete=models.PROTECT, to_field='code', db_column='store', related_name='stocks')
+    quantity = models.IntegerField(default=0)
+    alert_level = models.IntegerField(default=5)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'store_stocks'
+        constraints = [
+            models.UniqueConstraint(fields=['store', 'product'], name='store_stock_unique'),
+        ]
+        indexes = [
+            # Alertes de réassort et disponibilité par magasin (index partiels)
+            models.Index(
+                fields=['store', 'product'], name='store_stock_low_idx',
+                condition=models.Q(quantity__lte=models.F('alert_level')),
+            ),
+            models.Index(
+                fields=['store', 'product'], name='store_stock_available_idx',
+                condition=models.Q(quantity__gt=0),
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.product_id} ({self.store_id}) : {self.quantity}"
+    
+    @property
+    def is_low(self):
+        return self.quantity <= self.alert_level
+
+
+class StockMovement(models.Model):
+    """
+    Journal des mouvements de stock, en insertion seule.
+
+    `quantity` est signée : négative pour une sortie (vente, transfert
+    sortant, ajustement à la baisse), positive pour une entrée. Les compteurs
+    StoreStock sont mis à jour dans la même transaction par
+    inventory.ledger.record_movements().
+    """
+    KIND_CHOICES = [
+        ('sale', 'Vente'),
+        ('return', 'Retour'),
+        ('transfer', 'Transfert'),
+        ('adjustment', 'Ajustement'),
+        ('reception', 'Réception'),
+    ]
+    
+    product = models.ForeignKey(Product, on_delete=models.PROTECT, related_name='stock_movements')
+    store = models.ForeignKey(Store, on_delete=models.PROTECT, to_field='code', db_column='store', related_name='stock_movements')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    quantity = models.IntegerField()
+    
+    order = models.ForeignKey('orders.Order', on_delete=models.SET_NULL, null=True, blank=True, related_name='stock_movements')
+    # Relie les deux lignes d'un transfert entre magasins
+    transfer_id = models.UUIDField(null=True, blank=True)
+    reference = models.CharField(max_length=100, blank=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='stock_movements')
+    
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    objects = AppendOnlyQuerySet.as_manager()
+    
+    class Meta:
+        db_table = 'stock_movements'
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['product', 'store', 'created_at']),
+            models.Index(fields=['created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.quantity:+d} {self.product_id} ({self.store_id})"
+    
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise LedgerError("Les mouvements de stock ne peuvent pas être modifiés")
+        super().save(*args, **kwargs)
+    
+    def delete(self, *args, **kwargs):
+        raise LedgerError("Les mouvements de stock ne peuvent pas être supprimés")
+
+
+class StockSnapshot(models.Model):
+    """
+    Stock d'un produit dans un magasin à l'instant `taken_at`, calculé depuis
+    le journal (inventory.ledger.take_snapshot). Tous les couples d'un même
+    instantané partagent le même taken_at ; un couple absent vaut 0.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_snapshots')
+    store = models.ForeignKey(Store, on_delete=models.PROTECT, to_field='code', db_column='store', related_name='stock_snapshots')
+    taken_at = models.DateTimeField()
+    quantity = models.IntegerField()
+    
+    class Meta:
+        db_table = 'stock_snapshots'
+        ordering = ['-taken_at']
+        constraints = [
+            models.UniqueConstraint(fields=['taken_at', 'product', 'store'], name='stock_snapshot_unique'),
+        ]
+    
+    def __str__(self):
+        return f"{self.product_id} {self.store_id} @ {self.taken_at}: {self.quantity}"
@@ -0,0 +1,75 @@
+from rest_framework import serializers
+from bike_erp.fieldsets import SparseFieldsetsMixin
+from .models import StockMovement, Store, StoreStock
+
+# Les ventes ne sont enregistrées que par le passage en caisse
+MANUAL_KINDS = ['return', 'adjustment', 'reception']
+
+
+class StoreCodeField(serializers.SlugRelatedField):
+    """Code magasin, lu dans la colonne de clé étrangère : aucune requête sur stores."""
+    
+    def __init__(self, **kwargs):
+        kwargs.setdefault('slug_field', 'code')
+        super().__init__(**kwargs)
+    
+    def use_pk_only_optimization(self):
+        return True
+    
+    def to_representation(self, obj):
+        return obj.pk
+
+
+class StockMovementSerializer(serializers.ModelSerializer):
+    product_name = serializers.CharField(source='product.name', read_only=True)
+    store = StoreCodeField(queryset=Store.objects.all())
+    
+    class Meta:
+        model = StockMovement
+        fields = '__all__'
+        read_only_fields = ['order', 'transfer_id', 'user', 'created_at']
+    
+    def validate_kind(self, value):
+        if value not in MANUAL_KINDS:
+            raise serializers.ValidationError(
+                f"Mouvement manuel limité à : {', '.join(MANUAL_KINDS)} (transferts : /transfer/)"
+            )
+        return value
+    
+    def validate(self, attrs):
+        if attrs['quantity'] == 0:
+            raise serializers.ValidationError({'quantity': 'La quantité ne peut pas être nulle'})
+        if attrs['kind'] in ('return', 'reception') and attrs['quantity'] < 0:
+            raise serializers.ValidationError({'quantity': 'Un retour ou une réception est une entrée (quantité positive)'})
+        return attrs
+
+
+class TransferSerializer(serializers.Serializer):
+    product = serializers.IntegerField()
+    from_store = StoreCodeField(queryset=Store.objects.filter(is_active=True))
+    to_store = StoreCodeField(queryset=Store.objects.filter(is_active=True))
+    quantity = serializers.IntegerField(min_value=1)
+    reference = serializers.CharField(max_length=100, required=False, allow_blank=True, default='')
+    
+    def validate(self, attrs):
+        if attrs['from_store'] == attrs['to_store']:
+            raise serializers.ValidationError("Les magasins de départ et d'arrivée sont identiques")
+        return attrs
+
+
+class StoreSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Store
+        fields = '__all__'
+
+
+class StoreStockSerializer(serializers.ModelSerializer):
+    store = StoreCodeField(read_only=True)
+    product_name = serializers.CharField(source='product.name', read_only=True)
+    product_reference = serializers.CharField(source='product.reference', read_only=True)
+    
+    class Meta:
+        model = StoreStock
+        fields = ['id', 'store', 'product', 'product_reference', 'product_name', 'quantity', 'alert_level', 'updated_at']
+        # La quantité ne change que par le journal des mouvements
+        read_only_fields = ['store', 'product', 'quantity', 'updated_at']
@@ -0,0 +1,22 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from bike_erp.conditional import mark_changed
+from .ledger import STORES_CACHE_KEY
+from .models import Store, StoreStock
+
+
+@receiver(post_save, sender=Store)
+@receiver(post_delete, sender=Store)
+def invalidate_stores(sender, **kwargs):
+    transaction.on_commit(lambda: cache.delete(STORES_CACHE_KEY))
+    mark_changed(Store)
+
+
+# Seuils d'alerte modifiés par l'API ; les quantités passent par le journal
+@receiver(post_save, sender=StoreStock)
+@receiver(post_delete, sender=StoreStock)
+def mark_store_stock_changed(sender, **kwargs):
+    mark_changed(StoreStock)
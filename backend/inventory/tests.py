@@ -0,0 +1,47 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from bike_erp.query_budget_cases import QueryBudgetCases
+from products.models import Category, Product
+from .ledger import StockError, stock_as_of, take_snapshot
+from .models import StockMovement, StockSnapshot
+
+
+@override_settings(STOCK_SNAPSHOT={'SAFETY_LAG': 600})
+class StockSnapshotTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Pièces')
+        cls.product = Product.objects.create(
+            reference='SNAP-1', name='Chambre à air', category=category,
+            price_ht=Decimal('5.00'), price_ttc=Decimal('6.00'),
+        )
+
+    def test_refuses_recent_instant(self):
+        for at in (timezone.now(), timezone.now() - timedelta(seconds=300)):
+            with self.subTest(at=at), self.assertRaises(StockError):
+                take_snapshot(at)
+        self.assertFalse(StockSnapshot.objects.exists())
+
+    def test_snapshot_then_later_movements(self):
+        now = timezone.now()
+        at = now - timedelta(hours=1)
+        StockMovement.objects.bulk_create([
+            StockMovement(product=self.product, store_id='garches', kind='reception', quantity=10,
+                          created_at=at - timedelta(hours=1)),
+            StockMovement(product=self.product, store_id='garches', kind='sale', quantity=-3,
+                          created_at=at + timedelta(minutes=1)),
+        ])
+
+        self.assertEqual(take_snapshot(at), 1)
+        self.assertEqual(stock_as_of(at), {(self.product.pk, 'garches'): 10})
+        self.assertEqual(stock_as_of(now), {(self.product.pk, 'garches'): 7})
+
+
+class InventoryQueryBudgetTests(QueryBudgetCases, TestCase):
+    endpoints = [
+        ('stock-movements-list', 'get', '/api/stock/movements/'),
+    ]
@@ -0,0 +1,12 @@
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from . import views
+
+router = DefaultRouter()
+router.register(r'movements', views.StockMovementViewSet, basename='stock-movement')
+router.register(r'stores', views.StoreViewSet, basename='store')
+router.register(r'levels', views.StoreStockViewSet, basename='store-stock')
+
+urlpatterns = [
+    path('', include(router.urls)),
+]
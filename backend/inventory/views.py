@@ -0,0 +1,117 @@
+from datetime import date, datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from bike_erp.fieldsets import SparseFieldsetsViewMixin
+from bike_erp.query_budget import QueryBudgetMixin
+from products.models import Product
+from .ledger import StockError, record_movements, stock_as_of, transfer
+from .models import StockMovement, Store, StoreStock
+from .serializers import StockMovementSerializer, StoreSerializer, StoreStockSerializer, TransferSerializer
+
+
+class StoreViewSet(SparseFieldsetsViewMixin, viewsets.ModelViewSet):
+    queryset = Store.objects.all()
+    serializer_class = StoreSerializer
+    lookup_field = 'code'
+
+
+class StoreStockViewSet(QueryBudgetMixin,
+                        mixins.ListModelMixin,
+                        mixins.RetrieveModelMixin,
+                        mixins.UpdateModelMixin,
+                        viewsets.GenericViewSet):
+    """
+    Stock par magasin. ?low=1 : sous le seuil d'alerte ; ?available=1 : en
+    stock (index partiels store_stock_low_idx / store_stock_available_idx).
+    Seul le seuil d'alerte est modifiable ici.
+    """
+    queryset = StoreStock.objects.select_related('product')
+    serializer_class = StoreStockSerializer
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['store', 'product']
+    query_budgets = {
+        'list': 3,
+        'retrieve': 1,
+    }
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        params = self.request.query_params
+        if params.get('low') in ('1', 'true'):
+            queryset = queryset.filter(quantity__lte=F('alert_level'), product__is_active=True)
+        if params.get('available') in ('1', 'true'):
+            queryset = queryset.filter(quantity__gt=0)
+        return queryset.order_by('store', 'product_id')
+
+
+class StockMovementViewSet(QueryBudgetMixin,
+                           mixins.CreateModelMixin,
+                           mixins.ListModelMixin,
+                           mixins.RetrieveModelMixin,
+                           viewsets.GenericViewSet):
+    """Journal des mouvements : lecture et ajout uniquement."""
+    queryset = StockMovement.objects.select_related('product')
+    serializer_class = StockMovementSerializer
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['product', 'store', 'kind', 'order', 'transfer_id']
+    query_budgets = {
+        'list': 3,
+        'retrieve': 1,
+        'create': 7,
+        'transfer': 9,
+        'as_of': 4,
+    }
+    
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        movement = StockMovement(user=request.user, **serializer.validated_data)
+        try:
+            with transaction.atomic():
+                record_movements([movement])
+        except StockError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(movement).data, status=status.HTTP_201_CREATED)
+    
+    @action(detail=False, methods=['post'])
+    def transfer(self, request):
+        serializer = TransferSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        product = get_object_or_404(Product, pk=data['product'])
+        try:
+            with transaction.atomic():
+                movements = transfer(
+                    product, data['from_store'].code, data['to_store'].code, data['quantity'],
+                    user=request.user, reference=data['reference'],
+                )
+        except StockError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(movements, many=True).data, status=status.HTTP_201_CREATED)
+    
+    @action(detail=False, methods=['get'], url_path='as-of')
+    def as_of(self, request):
+        """Stock en fin de journée : ?date=AAAA-MM-JJ[&store=][&product=]."""
+        params = request.query_params
+        try:
+            day = date.fromisoformat(params['date']) if params.get('date') else timezone.localdate()
+            product_ids = [int(pk) for pk in params.getlist('product')] or None
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        at = timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min)) - timedelta(microseconds=1)
+        levels = stock_as_of(at, product_ids=product_ids, store=params.get('store') or None)
+        return Response({
+            'date': day,
+            'results': [
+                {'product': product_id, 'store': store, 'quantity': quantity}
+                for (product_id, store), quantity in sorted(levels.items())
+            ],
+        })
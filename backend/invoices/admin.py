@@ -4,6 +4,6 @@ from .models import Invoice
 
 @admin.register(Invoice)
 class InvoiceAdmin(admin.ModelAdmin):
-    list_display = ['invoice_number', 'order', 'invoice_date', 'is_paid']
-    list_filter = ['is_paid', 'invoice_date']
+    list_display = ['invoice_number', 'order', 'invoice_date', 'pdf_status', 'is_paid']
+    list_filter = ['is_paid', 'pdf_status', 'invoice_date']
     search_fields = ['invoice_number']
@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from invoices.models import Invoice
+from invoices.pdf import INVOICE_TEMPLATE, InvoiceTemplate, invoice_content_hash, invoice_items
+
+
+class Command(BaseCommand):
+    help = "Mesure le débit de rendu PDF des factures (rendus par seconde)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--invoice', type=int, help="Id de la facture (par défaut : la plus récente)")
+        parser.add_argument('--iterations', type=int, default=50)
+
+    def handle(self, *args, **options):
+        queryset = Invoice.objects.select_related('order__client', 'order__store')
+        if options['invoice']:
+            invoice = queryset.filter(pk=options['invoice']).first()
+        else:
+            invoice = queryset.first()
+        if invoice is None:
+            raise CommandError("Aucune facture à rendre")
+
+        iterations = options['iterations']
+        items = invoice_items(invoice)
+        content_hash = invoice_content_hash(invoice, items)
+
+        cases = [
+            # Ancien comportement : styles et en-têtes reconstruits à chaque rendu
+            ('template reconstruit', lambda: InvoiceTemplate().render(invoice, items)),
+            ('template précompilé', lambda: INVOICE_TEMPLATE.render(invoice, items)),
+            # Facture inchangée : seule l'empreinte est recalculée
+            ('cache (empreinte)', lambda: invoice_content_hash(invoice, items) == content_hash),
+        ]
+
+        self.stdout.write(f"Facture {invoice.invoice_number} - {len(items)} ligne(s), {iterations} itérations")
+        results = {}
+        for label, run in cases:
+            run()  # échauffement
+            start = time.perf_counter()
+            for _ in range(iterations):
+                run()
+            elapsed = time.perf_counter() - start
+            results[label] = iterations / elapsed
+            self.stdout.write(f"  {label:<22} {results[label]:>10.1f} rendus/s")
+
+        speedup = results['template précompilé'] / results['template reconstruit']
+        self.stdout.write(self.style.SUCCESS(f"Gain du template précompilé : x{speedup:.2f}"))
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:12
+
+from django.db import migrations, models
+
+
+def mark_existing_pdfs_ready(apps, schema_editor):
+    Invoice = apps.get_model('invoices', 'Invoice')
+    Invoice.objects.exclude(pdf_file='').exclude(pdf_file__isnull=True).update(pdf_status='ready')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invoices', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='invoice',
+            name='pdf_status',
+            field=models.CharField(choices=[('not_generated', 'Non générée'), ('pending', "En file d'attente"), ('rendering', 'En cours de génération'), ('ready', 'Prête'), ('failed', 'Échec')], default='not_generated', max_length=20),
+        ),
+        migrations.RunPython(mark_existing_pdfs_ready, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invoices', '0002_invoice_pdf_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='invoice',
+            name='pdf_content_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invoices', '0004_invoices_created_id_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='invoice',
+            name='invoice_number',
+            field=models.CharField(editable=False, max_length=40, unique=True),
+        ),
+    ]
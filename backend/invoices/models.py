@@ -1,22 +1,30 @@
-from django.db import models
+from django.core.files.base import ContentFile
+from django.db import models, transaction
 from orders.models import Order
-from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
-from reportlab.lib.units import cm
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_CENTER, TA_RIGHT
-from io import BytesIO
-import os
+from orders.numbering import allocate_number
+from .pdf import INVOICE_TEMPLATE, invoice_content_hash, invoice_items
+import logging
+
+logger = logging.getLogger(__name__)
 
 class Invoice(models.Model):
-    invoice_number = models.CharField(max_length=20, unique=True, editable=False)
+    PDF_STATUS_CHOICES = [
+        ('not_generated', 'Non générée'),
+        ('pending', 'En file d\'attente'),
+        ('rendering', 'En cours de génération'),
+        ('ready', 'Prête'),
+        ('failed', 'Échec'),
+    ]
+    
+    invoice_number = models.CharField(max_length=40, unique=True, editable=False)
     order = models.OneToOneField(Order, on_delete=models.PROTECT, related_name='invoice')
     
     invoice_date = models.DateField(auto_now_add=True)
     due_date = models.DateField(null=True, blank=True)
     
     pdf_file = models.FileField(upload_to='invoices/', blank=True, null=True)
+    pdf_status = models.CharField(max_length=20, choices=PDF_STATUS_CHOICES, default='not_generated')
+    pdf_content_hash = models.CharField(max_length=64, blank=True, editable=False)
     
     is_paid = models.BooleanField(default=False)
     paid_at = models.DateTimeField(null=True, blank=True)
@@ -26,105 +34,73 @@ class Invoice(models.Model):
     
     class Meta:
         db_table = 'invoices'
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='invoices_created_id_idx'),
+        ]
     
     def __str__(self):
         return f"Facture {self.invoice_number}"
     
     def save(self, *args, **kwargs):
-        if not self.invoice_number:
-            from django.utils import timezone
-            timestamp = timezone.now().strftime('%Y%m%d%H%M%S')
-            self.invoice_number = f"FAC-{timestamp}"
-        super().save(*args, **kwargs)
+        if self.invoice_number:
+            return super().save(*args, **kwargs)
+        # Série légale sans trou : le numéro n'est consommé que si la facture
+        # est enregistrée (même transaction)
+        with transaction.atomic(savepoint=False):
+            self.invoice_number = allocate_number('invoice', store=self.order.store_id)
+            super().save(*args, **kwargs)
     
-    def generate_pdf(self):
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=2*cm, bottomMargin=2*cm)
-        elements = []
-        styles = getSampleStyleSheet()
+    @property
+    def pdf_ready(self):
+        return self.pdf_status == 'ready' and bool(self.pdf_file)
+    
+    def schedule_pdf(self):
+        """Met la facture en file d'attente ; le rendu part après le commit."""
+        from .tasks import render_invoice_pdf
+        if self.pdf_status != 'pending':
+            Invoice.objects.filter(pk=self.pk).update(pdf_status='pending')
+            self.pdf_status = 'pending'
+        invoice_id = self.pk
         
-        # En-tête
-        title_style = ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontSize=24, textColor=colors.HexColor('#2563eb'), alignment=TA_CENTER)
-        elements.append(Paragraph(f"FACTURE N° {self.invoice_number}", title_style))
-        elements.append(Spacer(1, 0.5*cm))
+        def enqueue():
+            try:
+                render_invoice_pdf.apply_async((invoice_id,), retry=False)
+            except Exception:
+                # Broker injoignable : le prochain téléchargement relancera le rendu
+                logger.exception("Impossible de mettre en file la facture %s", invoice_id)
+                Invoice.objects.filter(pk=invoice_id).update(pdf_status='failed')
         
-        # Informations magasin
-        store_name = "Ville d'Avray" if self.order.store == 'ville_avray' else "Garches"
-        store_info = f"""
-        <b>Magasin de Vélos - {store_name}</b><br/>
-        Adresse magasin<br/>
-        Téléphone: 01 XX XX XX XX<br/>
-        Email: contact@bikestore.fr
+        transaction.on_commit(enqueue)
+    
+    def generate_pdf(self, force=False):
         """
-        elements.append(Paragraph(store_info, styles['Normal']))
-        elements.append(Spacer(1, 0.5*cm))
+        Génère le PDF et l'enregistre dans pdf_file.
         
-        # Informations client
-        client = self.order.client
-        client_info = f"""
-        <b>Client:</b><br/>
-        {client.full_name}<br/>
-        {client.address}<br/>
-        {client.postal_code} {client.city}<br/>
-        Email: {client.email}<br/>
-        Téléphone: {client.phone}
+        Si le contenu imprimé (commande, lignes, client) n'a pas changé depuis
+        le dernier rendu et que le fichier existe encore, le PDF stocké est
+        réutilisé sans relancer ReportLab. Retourne True si un rendu a eu lieu.
         """
-        elements.append(Paragraph(client_info, styles['Normal']))
-        elements.append(Spacer(1, 1*cm))
-        
-        # Tableau des articles
-        data = [['Article', 'Qté', 'Prix HT', 'TVA', 'Total TTC']]
-        for item in self.order.items.all():
-            data.append([
-                item.product.name,
-                str(item.quantity),
-                f"{item.unit_price_ht:.2f} €",
-                f"{item.tva_rate}%",
-                f"{item.subtotal_ttc:.2f} €"
-            ])
-        
-        table = Table(data, colWidths=[8*cm, 2*cm, 3*cm, 2*cm, 3*cm])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2563eb')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        elements.append(table)
-        elements.append(Spacer(1, 1*cm))
-        
-        # Totaux
-        totals_data = [
-            ['Sous-total HT:', f"{self.order.subtotal_ht:.2f} €"],
-            ['TVA:', f"{self.order.total_tva:.2f} €"],
-            ['Remise:', f"{self.order.discount_amount:.2f} €"],
-            ['<b>TOTAL TTC:</b>', f"<b>{self.order.total_ttc:.2f} €</b>"]
-        ]
-        
-        totals_table = Table(totals_data, colWidths=[14*cm, 4*cm])
-        totals_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
-            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, -1), (-1, -1), 14),
-            ('TEXTCOLOR', (0, -1), (-1, -1), colors.HexColor('#2563eb')),
-        ]))
-        elements.append(totals_table)
+        items = invoice_items(self)
+        content_hash = invoice_content_hash(self, items)
         
-        # Pied de page
-        elements.append(Spacer(1, 2*cm))
-        footer_style = ParagraphStyle('Footer', parent=styles['Normal'], fontSize=8, alignment=TA_CENTER, textColor=colors.grey)
-        elements.append(Paragraph("Merci de votre confiance", footer_style))
+        if (not force and self.pdf_file and content_hash == self.pdf_content_hash
+                and self.pdf_file.storage.exists(self.pdf_file.name)):
+            if self.pdf_status != 'ready':
+                self.pdf_status = 'ready'
+                self.save(update_fields=['pdf_status', 'updated_at'])
+            return False
         
-        doc.build(elements)
-        buffer.seek(0)
+        pdf = INVOICE_TEMPLATE.render(self, items)
         
-        # Sauvegarder le fichier PDF
-        from django.core.files.base import ContentFile
-        self.pdf_file.save(f'invoice_{self.invoice_number}.pdf', ContentFile(buffer.read()), save=True)
+        # Sauvegarder le fichier PDF (en remplaçant l'ancien rendu)
+        if self.pdf_file:
+            self.pdf_file.delete(save=False)
+        self.pdf_status = 'ready'
+        self.pdf_content_hash = content_hash
+        self.pdf_file.save(f'invoice_{self.invoice_number}.pdf', ContentFile(pdf), save=False)
+        # Colonnes du rendu seulement : un paiement enregistré pendant le rendu
+        # ne doit pas être écrasé
+        self.save(update_fields=['pdf_file', 'pdf_status', 'pdf_content_hash', 'updated_at'])
         
-        return buffer
+        return True
@@ -0,0 +1,159 @@
+"""
+Rendu PDF des factures.
+
+Les styles et les TableStyle ne dépendent pas de la facture : ils sont
+construits une seule fois dans INVOICE_TEMPLATE et réutilisés à chaque
+rendu. Les coordonnées du magasin viennent de inventory.Store.
+invoice_content_hash() résume tout ce qui est imprimé sur la facture, ce
+qui permet de ne pas régénérer un PDF inchangé.
+"""
+
+import hashlib
+from io import BytesIO
+
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import cm
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+# À incrémenter à chaque changement de mise en page : invalide tous les PDF
+TEMPLATE_VERSION = '2'
+
+
+class InvoiceTemplate:
+    """Éléments de mise en page communs à toutes les factures."""
+
+    def __init__(self):
+        styles = getSampleStyleSheet()
+        self.normal_style = styles['Normal']
+        self.title_style = ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontSize=24, textColor=colors.HexColor('#2563eb'), alignment=TA_CENTER)
+        self.footer_style = ParagraphStyle('Footer', parent=styles['Normal'], fontSize=8, alignment=TA_CENTER, textColor=colors.grey)
+
+        self.items_table_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2563eb')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 12),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ])
+        self.totals_table_style = TableStyle([
+            ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
+            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, -1), (-1, -1), 14),
+            ('TEXTCOLOR', (0, -1), (-1, -1), colors.HexColor('#2563eb')),
+        ])
+        self.items_col_widths = [8*cm, 2*cm, 3*cm, 2*cm, 3*cm]
+        self.totals_col_widths = [14*cm, 4*cm]
+
+    @staticmethod
+    def store_header(store):
+        return f"""
+        <b>Magasin de Vélos - {store.name}</b><br/>
+        {store.address or 'Adresse magasin'}<br/>
+        Téléphone: {store.phone or '01 XX XX XX XX'}<br/>
+        Email: {store.email or 'contact@bikestore.fr'}
+        """
+
+    def render(self, invoice, items):
+        """Retourne le PDF de la facture (bytes) ; `items` : lignes avec produit chargé."""
+        order = invoice.order
+        client = order.client
+
+        buffer = BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=2*cm, bottomMargin=2*cm)
+        elements = []
+
+        # En-tête
+        elements.append(Paragraph(f"FACTURE N° {invoice.invoice_number}", self.title_style))
+        elements.append(Spacer(1, 0.5*cm))
+
+        # Informations magasin
+        elements.append(Paragraph(self.store_header(order.store), self.normal_style))
+        elements.append(Spacer(1, 0.5*cm))
+
+        # Informations client
+        client_info = f"""
+        <b>Client:</b><br/>
+        {client.full_name}<br/>
+        {client.address}<br/>
+        {client.postal_code} {client.city}<br/>
+        Email: {client.email}<br/>
+        Téléphone: {client.phone}
+        """
+        elements.append(Paragraph(client_info, self.normal_style))
+        elements.append(Spacer(1, 1*cm))
+
+        # Tableau des articles
+        data = [['Article', 'Qté', 'Prix HT', 'TVA', 'Total TTC']]
+        for item in items:
+            data.append([
+                item.product.name,
+                str(item.quantity),
+                f"{item.unit_price_ht:.2f} €",
+                f"{item.tva_rate}%",
+                f"{item.subtotal_ttc:.2f} €"
+            ])
+
+        table = Table(data, colWidths=self.items_col_widths)
+        table.setStyle(self.items_table_style)
+        elements.append(table)
+        elements.append(Spacer(1, 1*cm))
+
+        # Totaux
+        totals_data = [
+            ['Sous-total HT:', f"{order.subtotal_ht:.2f} €"],
+            ['TVA:', f"{order.total_tva:.2f} €"],
+            ['Remise:', f"{order.discount_amount:.2f} €"],
+            ['<b>TOTAL TTC:</b>', f"<b>{order.total_ttc:.2f} €</b>"]
+        ]
+
+        totals_table = Table(totals_data, colWidths=self.totals_col_widths)
+        totals_table.setStyle(self.totals_table_style)
+        elements.append(totals_table)
+
+        # Pied de page
+        elements.append(Spacer(1, 2*cm))
+        elements.append(Paragraph("Merci de votre confiance", self.footer_style))
+
+        doc.build(elements)
+        return buffer.getvalue()
+
+
+INVOICE_TEMPLATE = InvoiceTemplate()
+
+
+def invoice_items(invoice):
+    return list(invoice.order.items.select_related('product').order_by('pk'))
+
+
+def invoice_content_hash(invoice, items):
+    """Empreinte SHA-256 de tout ce qui est imprimé sur la facture."""
+    order = invoice.order
+    client = order.client
+    parts = [
+        TEMPLATE_VERSION,
+        invoice.invoice_number,
+        order.store.name, order.store.address, order.store.phone, order.store.email,
+        client.full_name, client.address, client.postal_code, client.city,
+        client.email, client.phone,
+        f"{order.subtotal_ht:.2f}", f"{order.total_tva:.2f}",
+        f"{order.discount_amount:.2f}", f"{order.total_ttc:.2f}",
+    ]
+    for item in items:
+        parts.extend([
+            item.product.name,
+            str(item.quantity),
+            f"{item.unit_price_ht:.2f}",
+            str(item.tva_rate),
+            f"{item.subtotal_ttc:.2f}",
+        ])
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode('utf-8'))
+        digest.update(b'\x1f')
+    return digest.hexdigest()
@@ -1,8 +1,9 @@
 from rest_framework import serializers
+from bike_erp.fieldsets import SparseFieldsetsMixin
 from .models import Invoice
 
 
-class InvoiceSerializer(serializers.ModelSerializer):
+class InvoiceSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     class Meta:
         model = Invoice
         fields = '__all__'
@@ -0,0 +1,29 @@
+from celery import shared_task
+
+from .models import Invoice
+
+
+@shared_task(bind=True, ignore_result=True, max_retries=3, default_retry_delay=10)
+def render_invoice_pdf(self, invoice_id):
+    """Génère le PDF d'une facture hors du worker HTTP."""
+    invoice = (
+        Invoice.objects
+        .select_related('order__client', 'order__store')
+        .filter(pk=invoice_id)
+        .first()
+    )
+    if invoice is None:
+        return None
+    
+    Invoice.objects.filter(pk=invoice_id).update(pdf_status='rendering')
+    try:
+        invoice.generate_pdf()
+    except Exception as exc:
+        if self.request.retries >= self.max_retries:
+            Invoice.objects.filter(pk=invoice_id).update(pdf_status='failed')
+            raise
+        # Toujours en file : un téléchargement pendant le délai ne relance
+        # pas un second rendu
+        Invoice.objects.filter(pk=invoice_id).update(pdf_status='pending')
+        raise self.retry(exc=exc)
+    return invoice.pdf_file.name
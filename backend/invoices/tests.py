@@ -0,0 +1,75 @@
+import shutil
+import tempfile
+from decimal import Decimal
+from unittest import mock
+
+from celery.exceptions import Retry
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+from bike_erp.query_budget_cases import QueryBudgetCases
+from clients.models import Client
+from orders.models import Order
+from .models import Invoice
+from .tasks import render_invoice_pdf
+
+User = get_user_model()
+
+
+class InvoicePdfTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.media = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.media.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username='compta', email='compta@example.com', password='compta')
+        client = Client.objects.create(first_name='Jean', last_name='Martin', email='jean@example.com', phone='0100000000')
+        order = Order.objects.create(
+            order_number='TEST-1', client=client, user=user, store_id='garches', status='completed',
+            subtotal_ht=Decimal('100.00'), total_tva=Decimal('20.00'), total_ttc=Decimal('120.00'),
+        )
+        cls.invoice = Invoice.objects.create(order=order)
+
+    def test_generate_pdf_keeps_concurrent_payment(self):
+        invoice = Invoice.objects.get(pk=self.invoice.pk)
+        # Paiement enregistré par une autre requête pendant le rendu
+        Invoice.objects.filter(pk=invoice.pk).update(is_paid=True)
+
+        self.assertTrue(invoice.generate_pdf())
+
+        invoice.refresh_from_db()
+        self.assertTrue(invoice.is_paid)
+        self.assertEqual(invoice.pdf_status, 'ready')
+        self.assertTrue(invoice.pdf_file.name.endswith('.pdf'))
+
+    def test_status_stays_pending_while_retries_remain(self):
+        with mock.patch.object(Invoice, 'generate_pdf', side_effect=RuntimeError("ReportLab")), \
+                mock.patch.object(render_invoice_pdf, 'retry', side_effect=Retry):
+            with self.assertRaises(Retry):
+                render_invoice_pdf(self.invoice.pk)
+        self.invoice.refresh_from_db()
+        self.assertEqual(self.invoice.pdf_status, 'pending')
+
+    def test_status_failed_once_retries_exhausted(self):
+        with mock.patch.object(Invoice, 'generate_pdf', side_effect=RuntimeError("ReportLab")):
+            with self.assertRaises(RuntimeError):
+                render_invoice_pdf.apply((self.invoice.pk,), retries=render_invoice_pdf.max_retries, throw=True)
+        self.invoice.refresh_from_db()
+        self.assertEqual(self.invoice.pdf_status, 'failed')
+
+
+class InvoiceQueryBudgetTests(QueryBudgetCases, TestCase):
+    endpoints = [
+        ('invoices-list', 'get', '/api/invoices/'),
+        ('invoices-retrieve', 'get', '/api/invoices/{invoice}/'),
+    ]
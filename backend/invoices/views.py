@@ -1,24 +1,48 @@
-from rest_framework import viewsets
+from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.http import FileResponse
+from bike_erp.delivery import deliver
+from bike_erp.fieldsets import SparseFieldsetsViewMixin
+from bike_erp.query_budget import QueryBudgetMixin
 from .models import Invoice
 from .serializers import InvoiceSerializer
 
 
-class InvoiceViewSet(viewsets.ModelViewSet):
+class InvoiceViewSet(QueryBudgetMixin, SparseFieldsetsViewMixin, viewsets.ModelViewSet):
     queryset = Invoice.objects.all()
     serializer_class = InvoiceSerializer
+    compact_fields = [
+        'id', 'invoice_number', 'order', 'invoice_date', 'due_date',
+        'pdf_status', 'is_paid', 'paid_at', 'created_at',
+    ]
+    query_budgets = {
+        'list': 3,
+        'retrieve': 2,
+        'download': 3,
+        'generate_pdf': 3,
+    }
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('download', 'generate_pdf'):
+            # Le rendu PDF lit la commande et le client
+            queryset = queryset.select_related('order__client', 'order__store')
+        return queryset
     
     @action(detail=True, methods=['post'])
     def generate_pdf(self, request, pk=None):
         invoice = self.get_object()
-        invoice.generate_pdf()
-        return Response({'message': 'PDF generated successfully'})
+        invoice.schedule_pdf()
+        return Response({'message': 'PDF generation queued', 'pdf_status': invoice.pdf_status}, status=status.HTTP_202_ACCEPTED)
     
     @action(detail=True, methods=['get'])
     def download(self, request, pk=None):
         invoice = self.get_object()
-        if invoice.pdf_file:
-            return FileResponse(invoice.pdf_file.open('rb'), as_attachment=True, filename=f'invoice_{invoice.invoice_number}.pdf')
-        return Response({'error': 'PDF not generated'}, status=404)
+        if invoice.pdf_ready:
+            # Envoi confié au serveur frontal ou au stockage (FILE_DELIVERY)
+            return deliver(request, invoice.pdf_file, filename=f'invoice_{invoice.invoice_number}.pdf', content_type='application/pdf')
+        
+        # Facture jamais générée ou en échec : relancer le rendu
+        if invoice.pdf_status in ('not_generated', 'failed'):
+            invoice.schedule_pdf()
+        return Response({'pdf_status': invoice.pdf_status}, status=status.HTTP_202_ACCEPTED)
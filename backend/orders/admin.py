@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Order, OrderItem
+from .models import DocumentSequence, Order, OrderItem
 
 
 class OrderItemInline(admin.TabularInline):
@@ -11,5 +11,22 @@ class OrderItemInline(admin.TabularInline):
 class OrderAdmin(admin.ModelAdmin):
     list_display = ['order_number', 'client', 'store', 'total_ttc', 'status', 'created_at']
     list_filter = ['status', 'store', 'created_at']
-    search_fields = ['order_number', 'client__first_name', 'client__last_name']
+    search_fields = ['order_number', 'idempotency_key', 'client__first_name', 'client__last_name']
+    readonly_fields = ['idempotency_key']
     inlines = [OrderItemInline]
+
+
+@admin.register(DocumentSequence)
+class DocumentSequenceAdmin(admin.ModelAdmin):
+    list_display = ['doc_type', 'year', 'store', 'last_value']
+    list_filter = ['doc_type', 'year']
+    
+    # Modifier un compteur casserait la continuité des numéros
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+    
+    def has_add_permission(self, request):
+        return False
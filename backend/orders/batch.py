@@ -0,0 +1,154 @@
+"""
+Tickets de caisse rejoués après une coupure : POST /api/orders/batch/
+
+    {"orders": [{"idempotency_key": "caisse1-2024-05-02-0042", "client": 12,
+                 "store": "garches", "items": [...], "payment_method": "card"}, ...]}
+
+Chaque ticket porte une clé générée par la caisse, enregistrée dans
+Order.idempotency_key (index unique) : un ticket déjà reçu, dans ce lot ou
+un précédent dont la réponse s'est perdue, n'est pas recréé et le stock
+n'est pas décompté deux fois.
+
+Coût indépendant du nombre de tickets pour les lectures : une requête pour
+les clés déjà connues, une pour les clients, une pour tous les produits du
+lot. Chaque ticket est ensuite enregistré dans sa propre transaction : les
+verrous de numérotation et de stock de son magasin sont relâchés aussitôt
+(les caisses en service n'attendent pas la fin du lot, deux lots ne se
+bloquent pas mutuellement) et un ticket refusé (stock insuffisant...)
+n'annule pas les autres.
+"""
+
+from django.db import IntegrityError, transaction
+
+from clients.models import Client
+from products.models import Product
+from .checkout import place_order
+from .models import Order
+
+BATCH_MAX_ORDERS = 200
+IDEMPOTENCY_KEY_MAX_LENGTH = 64
+
+
+class BatchError(Exception):
+    """Enveloppe du lot invalide : rien n'est enregistré."""
+
+
+def _product_ids(order_data):
+    ids = set()
+    for item in order_data.get('items') or []:
+        try:
+            ids.add(int(item['product']))
+        except (KeyError, TypeError, ValueError):
+            pass  # Signalé par place_order pour ce ticket
+    return ids
+
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _key(order_data):
+    key = order_data.get('idempotency_key') if isinstance(order_data, dict) else None
+    if not isinstance(key, str) or not key.strip() or len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+        return None
+    return key.strip()
+
+
+def _known_orders(keys):
+    if not keys:
+        return []
+    return list(Order.objects.filter(idempotency_key__in=keys).values('idempotency_key', 'id', 'order_number'))
+
+
+def _duplicate(result, row):
+    result.update(status='duplicate', order=row['id'], order_number=row['order_number'])
+
+
+def _fail(result, message):
+    result.update(status='error', error=message)
+
+
+def submit_batch(orders, user):
+    """
+    Enregistre les tickets et retourne un résultat par ticket, dans l'ordre :
+    {'idempotency_key', 'status': 'created' | 'duplicate' | 'error', 'order',
+    'order_number', 'error'}.
+    """
+    from invoices.models import Invoice
+
+    if not isinstance(orders, list) or not orders:
+        raise BatchError("'orders' doit être une liste non vide")
+    if len(orders) > BATCH_MAX_ORDERS:
+        raise BatchError(f"Au plus {BATCH_MAX_ORDERS} commandes par lot")
+
+    results = [{'idempotency_key': _key(order_data), 'status': None} for order_data in orders]
+    keys = [result['idempotency_key'] for result in results if result['idempotency_key']]
+    known = {row['idempotency_key']: row for row in _known_orders(keys)}
+    client_ids = set()
+    product_ids = set()
+    for order_data in orders:
+        if isinstance(order_data, dict):
+            client_ids.add(_int(order_data.get('client')))
+            product_ids |= _product_ids(order_data)
+    client_ids.discard(None)
+    clients = set(Client.objects.filter(pk__in=client_ids).values_list('pk', flat=True))
+    # Tous les produits du lot en une requête
+    products = Product.objects.in_bulk(list(product_ids))
+
+    first_seen = {}
+    repeats = {}
+    pending = []
+    for index, (order_data, result) in enumerate(zip(orders, results)):
+        key = result['idempotency_key']
+        if key is None:
+            _fail(result, f"idempotency_key manquante ou invalide ({IDEMPOTENCY_KEY_MAX_LENGTH} caractères au plus)")
+        elif key in known:
+            _duplicate(result, known[key])
+        elif key in first_seen:
+            # Ticket mis deux fois en file : même résultat que le premier
+            repeats[index] = first_seen[key]
+        elif _int(order_data.get('client')) not in clients:
+            _fail(result, f"Client introuvable : {order_data.get('client')}")
+        else:
+            pending.append(index)
+        if key is not None:
+            first_seen.setdefault(key, index)
+
+    for index in pending:
+        order_data, result = orders[index], results[index]
+        try:
+            with transaction.atomic():
+                order = place_order(
+                    client_id=_int(order_data['client']),
+                    user=user,
+                    store=order_data.get('store'),
+                    items=order_data.get('items') or [],
+                    payment_method=order_data.get('payment_method', 'cash'),
+                    installments=order_data.get('installments', 1),
+                    products=products,
+                    idempotency_key=result['idempotency_key'],
+                )
+                invoice = Invoice.objects.create(order=order, pdf_status='pending')
+                invoice.schedule_pdf()
+        except IntegrityError as e:
+            # Même ticket reçu entre-temps par une autre requête ?
+            existing = _known_orders([result['idempotency_key']])
+            if existing:
+                _duplicate(result, existing[0])
+            else:
+                _fail(result, str(e))
+        except Exception as e:
+            _fail(result, str(e))
+        else:
+            result.update(status='created', order=order.pk, order_number=order.order_number)
+
+    for index, first in repeats.items():
+        if results[first]['status'] == 'error':
+            _fail(results[index], results[first]['error'])
+        else:
+            _duplicate(results[index], {'id': results[first]['order'], 'order_number': results[first]['order_number']})
+    return results
+
@@ -0,0 +1,115 @@
+from collections import OrderedDict
+from decimal import Decimal
+
+from django.utils import timezone
+
+from inventory.ledger import StockError, check_store, record_movements
+from inventory.models import StockMovement
+from products.models import Product
+from .models import Order, OrderItem
+from .signals import order_completed
+
+TWO_PLACES = Decimal('0.01')
+
+
+class CheckoutError(Exception):
+    pass
+
+
+def place_order(*, client_id, user, store, items, payment_method='cash', installments=1,
+                products=None, idempotency_key=None):
+    """
+    Crée une commande terminée avec ses lignes en un nombre constant de requêtes.
+
+    - un SELECT ... FOR UPDATE de tous les produits de la commande ;
+    - l'attribution du numéro (orders.numbering) et l'INSERT de la commande
+      (totaux déjà calculés) ;
+    - un INSERT groupé des OrderItem ;
+    - un INSERT groupé des mouvements de stock et un UPDATE conditionnel du
+      stock du magasin (inventory.ledger) ;
+    - les mises à jour des récepteurs de order_completed (agrégats...).
+
+    `products` : produits déjà chargés ({pk: Product}) pour tout un lot de
+    commandes (submit_batch) ; ils ne sont alors pas relus. Le stock reste
+    vérifié par l'UPDATE conditionnel du journal.
+
+    Doit être appelée dans un bloc transaction.atomic().
+    """
+    try:
+        check_store(store, active=True)
+    except StockError as e:
+        raise CheckoutError(str(e))
+    if not items:
+        raise CheckoutError('Aucun article dans la commande')
+
+    lines = []
+    quantities = OrderedDict()
+    for item_data in items:
+        product_id = int(item_data['product'])
+        quantity = int(item_data['quantity'])
+        if quantity <= 0:
+            raise CheckoutError(f"Quantité invalide pour le produit {product_id}")
+        lines.append((product_id, quantity, item_data))
+        quantities[product_id] = quantities.get(product_id, 0) + quantity
+
+    if products is None:
+        products = Product.objects.select_for_update().in_bulk(list(quantities))
+    missing = [pk for pk in quantities if pk not in products]
+    if missing:
+        raise CheckoutError(f"Produit(s) introuvable(s) : {', '.join(map(str, missing))}")
+
+    # Calcul des lignes et des totaux en une seule passe, en Decimal
+    order_items = []
+    subtotal_ht = Decimal('0')
+    subtotal_ttc = Decimal('0')
+    for product_id, quantity, item_data in lines:
+        unit_price_ht = Decimal(str(item_data['unit_price_ht']))
+        unit_price_ttc = Decimal(str(item_data['unit_price_ttc']))
+        line_ht = (unit_price_ht * quantity).quantize(TWO_PLACES)
+        line_ttc = (unit_price_ttc * quantity).quantize(TWO_PLACES)
+        order_items.append(OrderItem(
+            product=products[product_id],
+            quantity=quantity,
+            unit_price_ht=unit_price_ht,
+            unit_price_ttc=unit_price_ttc,
+            tva_rate=Decimal(str(item_data['tva_rate'])),
+            subtotal_ht=line_ht,
+            subtotal_ttc=line_ttc,
+        ))
+        subtotal_ht += line_ht
+        subtotal_ttc += line_ttc
+
+    order = Order.objects.create(
+        client_id=client_id,
+        user=user,
+        store_id=store,
+        payment_method=payment_method,
+        installments=installments,
+        subtotal_ht=subtotal_ht,
+        total_tva=subtotal_ttc - subtotal_ht,
+        total_ttc=subtotal_ttc,
+        status='completed',
+        completed_at=timezone.now(),
+        idempotency_key=idempotency_key,
+    )
+
+    for order_item in order_items:
+        order_item.order = order
+    OrderItem.objects.bulk_create(order_items)
+
+    # Les prestations (services) n'ont pas de stock physique
+    stocked = OrderedDict(
+        (pk, qty) for pk, qty in quantities.items()
+        if products[pk].product_type != 'service'
+    )
+    record_movements([
+        StockMovement(
+            product=products[pk], store_id=store, kind='sale', quantity=-qty,
+            order=order, reference=order.order_number, user=user,
+        )
+        for pk, qty in stocked.items()
+    ])
+
+    order_completed.send(sender=Order, order=order, items=order_items)
+
+    return order
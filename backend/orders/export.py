@@ -0,0 +1,117 @@
+"""
+Export comptable des commandes : une ligne par article, à plat.
+
+Les commandes sont lues par paquets de EXPORT_CHUNK_SIZE, en pagination par
+clé sur (created_at, id) (index orders_created_id_idx), et les lignes de
+chaque paquet en une seule requête values_list() jointe aux produits.
+Aucun curseur serveur n'est nécessaire (compatible avec le pooler en mode
+transaction) et la mémoire reste bornée quelle que soit la période.
+"""
+
+import csv
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Order, OrderItem
+
+EXPORT_CHUNK_SIZE = 500
+
+ORDER_FIELDS = [
+    'id', 'order_number', 'created_at', 'completed_at', 'status', 'store__name',
+    'payment_method', 'installments', 'client__last_name', 'client__first_name',
+    'client__email', 'invoice__invoice_number', 'subtotal_ht', 'total_tva',
+    'total_ttc', 'discount_amount',
+]
+ITEM_FIELDS = [
+    'order_id', 'product__reference', 'product__name', 'quantity',
+    'unit_price_ht', 'unit_price_ttc', 'tva_rate', 'subtotal_ht', 'subtotal_ttc',
+]
+
+HEADER = [
+    'N° commande', 'Date', 'Date de clôture', 'Statut', 'Magasin',
+    'Mode de paiement', 'Échéances', 'Nom client', 'Prénom client', 'Email client',
+    'N° facture', 'Total HT commande', 'TVA commande', 'Total TTC commande',
+    'Remise commande', 'Référence', 'Article', 'Quantité', 'Prix unitaire HT',
+    'Prix unitaire TTC', 'Taux TVA', 'Total HT ligne', 'Total TTC ligne',
+]
+EMPTY_ITEM = [None] * (len(ITEM_FIELDS) - 1)
+
+# Libellés lisibles pour statut et mode de paiement (le magasin est lu par jointure)
+LABELS = {
+    'status': dict(Order.STATUS_CHOICES),
+    'payment_method': dict(Order.PAYMENT_METHODS),
+}
+
+
+def _order_chunks(start, end):
+    """Commandes créées dans [start, end[ par paquets, en ordre chronologique."""
+    queryset = Order.objects.filter(created_at__gte=start, created_at__lt=end)
+    position = None
+    while True:
+        chunk = queryset
+        if position is not None:
+            created_at, pk = position
+            chunk = chunk.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk))
+        rows = list(chunk.order_by('created_at', 'pk').values_list(*ORDER_FIELDS)[:EXPORT_CHUNK_SIZE])
+        if not rows:
+            return
+        yield rows
+        if len(rows) < EXPORT_CHUNK_SIZE:
+            return
+        position = (rows[-1][2], rows[-1][0])
+
+
+def export_rows(start, end):
+    """En-tête puis une ligne par article (une ligne vide d'article si la commande n'en a pas)."""
+    yield HEADER
+    for orders in _order_chunks(start, end):
+        items = {}
+        for item in (
+            OrderItem.objects.filter(order_id__in=[row[0] for row in orders])
+            .order_by('order_id', 'pk')
+            .values_list(*ITEM_FIELDS)
+        ):
+            items.setdefault(item[0], []).append(list(item[1:]))
+        for row in orders:
+            order = _format_order(row)
+            for item in items.get(row[0], [EMPTY_ITEM]):
+                yield order + item
+
+
+def _format_datetime(value):
+    return timezone.localtime(value).strftime('%Y-%m-%d %H:%M:%S') if value else None
+
+
+def _format_order(row):
+    (_, number, created_at, completed_at, order_status, store, payment_method,
+     *rest) = row
+    return [
+        number,
+        _format_datetime(created_at),
+        _format_datetime(completed_at),
+        LABELS['status'].get(order_status, order_status),
+        store,
+        LABELS['payment_method'].get(payment_method, payment_method),
+        *rest,
+    ]
+
+
+class _Echo:
+    """csv.writer écrit dans cet objet, qui rend simplement la ligne formatée."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows, rows_per_chunk=200):
+    # BOM : Excel détecte l'UTF-8 et affiche correctement les accents
+    yield '\ufeff'
+    writer = csv.writer(_Echo(), delimiter=';')
+    pending = []
+    for row in rows:
+        pending.append(writer.writerow(row))
+        if len(pending) >= rows_per_chunk:
+            yield ''.join(pending)
+            pending = []
+    yield ''.join(pending)
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_order_installments'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['client', 'created_at'], name='orders_client__bc22a2_idx'),
+        ),
+    ]
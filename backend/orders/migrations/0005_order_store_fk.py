@@ -0,0 +1,20 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0003_store_storestock'),
+        ('orders', '0004_orders_created_id_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='order',
+            name='store',
+            field=models.ForeignKey(db_column='store', on_delete=django.db.models.deletion.PROTECT, related_name='orders', to='inventory.store', to_field='code'),
+        ),
+    ]
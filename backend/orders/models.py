@@ -1,6 +1,7 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
 from clients.models import Client
+from inventory.models import Store
 from products.models import Product
 
 User = get_user_model()
@@ -20,15 +21,10 @@ class Order(models.Model):
         ('transfer', 'Virement'),
     ]
     
-    STORE_CHOICES = [
-        ('ville_avray', 'Ville d\'Avray'),
-        ('garches', 'Garches'),
-    ]
-    
-    order_number = models.CharField(max_length=20, unique=True, editable=False)
+    order_number = models.CharField(max_length=40, unique=True, editable=False)
     client = models.ForeignKey(Client, on_delete=models.PROTECT, related_name='orders')
     user = models.ForeignKey(User, on_delete=models.PROTECT, related_name='orders')
-    store = models.CharField(max_length=20, choices=STORE_CHOICES)
+    store = models.ForeignKey(Store, on_delete=models.PROTECT, to_field='code', db_column='store', related_name='orders')
     
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     payment_method = models.CharField(max_length=20, choices=PAYMENT_METHODS, default='cash')
@@ -43,27 +39,37 @@ class Order(models.Model):
     
     notes = models.TextField(blank=True)
     
+    # Clé fournie par la caisse pour les tickets rejoués (POST /api/orders/batch/) :
+    # un ticket renvoyé après une coupure ne crée pas de seconde commande
+    idempotency_key = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     completed_at = models.DateTimeField(null=True, blank=True)
     
     class Meta:
         db_table = 'orders'
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
         indexes = [
             models.Index(fields=['order_number']),
             models.Index(fields=['status']),
+            models.Index(fields=['client', 'created_at']),
+            # Pagination par curseur (bike_erp/pagination.py)
+            models.Index(fields=['-created_at', '-id'], name='orders_created_id_idx'),
         ]
     
     def __str__(self):
         return f"Commande {self.order_number}"
     
     def save(self, *args, **kwargs):
-        if not self.order_number:
-            from django.utils import timezone
-            timestamp = timezone.now().strftime('%Y%m%d%H%M%S')
-            self.order_number = f"CMD-{timestamp}"
-        super().save(*args, **kwargs)
+        if self.order_number:
+            return super().save(*args, **kwargs)
+        # Numéro et commande dans la même transaction : pas de trou si
+        # l'enregistrement échoue
+        from .numbering import allocate_number
+        with transaction.atomic(savepoint=False):
+            self.order_number = allocate_number('order', store=self.store_id)
+            super().save(*args, **kwargs)
 
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
@@ -87,3 +93,24 @@ class OrderItem(models.Model):
         self.subtotal_ht = self.unit_price_ht * self.quantity
         self.subtotal_ttc = self.unit_price_ttc * self.quantity
         super().save(*args, **kwargs)
+
+
+class DocumentSequence(models.Model):
+    """
+    Compteur d'une série de numéros (orders/numbering.py). `store` vaut ''
+    pour une série commune à tous les magasins : une clé étrangère nulle ne
+    serait pas prise en compte par la contrainte d'unicité.
+    """
+    doc_type = models.CharField(max_length=20)
+    year = models.PositiveSmallIntegerField()
+    store = models.CharField(max_length=20, blank=True)
+    last_value = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        db_table = 'document_sequences'
+        constraints = [
+            models.UniqueConstraint(fields=['doc_type', 'year', 'store'], name='document_sequence_unique'),
+        ]
+    
+    def __str__(self):
+        return f"{self.doc_type} {self.year} {self.store or '*'} : {self.last_value}"
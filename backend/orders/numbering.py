@@ -0,0 +1,78 @@
+"""
+Numérotation continue des commandes et factures.
+
+Chaque série (type de document, année, magasin ou '') a une ligne compteur
+dans DocumentSequence. Le numéro est pris par un UPDATE relatif de cette
+ligne, qui la verrouille jusqu'à la fin de la transaction appelante :
+
+- deux caisses qui valident dans la même seconde obtiennent deux numéros
+  différents (la seconde attend le commit de la première) ;
+- si la transaction est annulée, l'incrément l'est aussi : la série reste
+  sans trou, comme l'exige la facturation.
+
+Le verrou ne porte que sur une série : avec PER_STORE, les magasins ne
+s'attendent pas entre eux. Voir DOCUMENT_NUMBERING dans les settings.
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import DocumentSequence
+
+
+def _increment(doc_type, year, store):
+    """Incrémente le compteur et retourne sa valeur, ou None si la série n'existe pas."""
+    connection = transaction.get_connection()
+    if connection.features.can_return_columns_from_insert:
+        # PostgreSQL, SQLite >= 3.35 : incrément et lecture en un aller-retour
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {quote(DocumentSequence._meta.db_table)} "
+                f"SET {quote('last_value')} = {quote('last_value')} + 1 "
+                f"WHERE {quote('doc_type')} = %s AND {quote('year')} = %s AND {quote('store')} = %s "
+                f"RETURNING {quote('last_value')}",
+                [doc_type, year, store],
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
+    sequence = DocumentSequence.objects.filter(doc_type=doc_type, year=year, store=store)
+    if sequence.update(last_value=F('last_value') + 1):
+        return sequence.values_list('last_value', flat=True).get()
+    return None
+
+
+def next_value(doc_type, year, store=''):
+    """Valeur suivante de la série ; à appeler dans une transaction."""
+    if not transaction.get_connection().in_atomic_block:
+        raise RuntimeError("L'attribution d'un numéro doit se faire dans une transaction")
+    value = _increment(doc_type, year, store)
+    if value is None:
+        # Première valeur de la série : une insertion concurrente est ignorée
+        DocumentSequence.objects.bulk_create(
+            [DocumentSequence(doc_type=doc_type, year=year, store=store)],
+            ignore_conflicts=True,
+        )
+        value = _increment(doc_type, year, store)
+    return value
+
+
+def series_key(doc_type, store=None, day=None):
+    """(année, magasin) de la série dans laquelle numéroter un document."""
+    config = settings.DOCUMENT_NUMBERING[doc_type]
+    year = (day or timezone.localdate()).year
+    return year, (store or '') if config['PER_STORE'] else ''
+
+
+def format_number(doc_type, year, store, value):
+    prefix = settings.DOCUMENT_NUMBERING[doc_type]['PREFIX']
+    parts = [prefix, store.upper()] if store else [prefix]
+    return '-'.join(parts + [str(year), f'{value:06d}'])
+
+
+def allocate_number(doc_type, store=None):
+    """Numéro suivant, p. ex. FAC-GARCHES-2026-000042."""
+    year, store = series_key(doc_type, store)
+    return format_number(doc_type, year, store, next_value(doc_type, year, store))
@@ -1,7 +1,10 @@
 from rest_framework import serializers
+from bike_erp.fieldsets import SparseFieldsetsMixin
 from .models import Order, OrderItem
 from products.serializers import ProductSerializer
 from invoices.serializers import InvoiceSerializer
+from inventory.models import Store
+from inventory.serializers import StoreCodeField
 
 
 class OrderItemSerializer(serializers.ModelSerializer):
@@ -13,10 +16,11 @@ class OrderItemSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, read_only=True)
     invoice = InvoiceSerializer(read_only=True)
     client_name = serializers.CharField(source='client.full_name', read_only=True)
+    store = StoreCodeField(queryset=Store.objects.all())
     
     class Meta:
         model = Order
@@ -0,0 +1,28 @@
+from django.dispatch import Signal
+
+# Envoyés dans la transaction qui modifie la commande, avec les arguments
+# `order` et `items` (lignes de la commande). Les récepteurs mettent à jour
+# leurs données dérivées dans cette même transaction : order_completed
+# ajoute la vente, order_cancelled la retire (annulation, ou retour en
+# attente d'une commande terminée).
+order_completed = Signal()
+order_cancelled = Signal()
+
+# Champs repris par les agrégats et statistiques clients : figés tant que
+# la commande est terminée, sans quoi le retrait ne compenserait plus l'ajout
+AGGREGATED_FIELDS = ('client', 'store', 'payment_method', 'subtotal_ht', 'total_tva', 'total_ttc', 'completed_at')
+
+
+def send_status_signals(order, previous_status, items=None):
+    """Émet le signal correspondant à un changement de statut de commande."""
+    if order.status == previous_status:
+        return
+    if order.status == 'completed':
+        signal = order_completed
+    elif previous_status == 'completed':
+        signal = order_cancelled
+    else:
+        return
+    if items is None:
+        items = list(order.items.all())
+    signal.send(sender=type(order), order=order, items=items)
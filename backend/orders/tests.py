@@ -0,0 +1,330 @@
+import logging
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import OperationalError, connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from analytics.models import DailySalesSummary
+from bike_erp.query_budget_cases import QueryBudgetCases
+from clients.models import Client
+from inventory.ledger import set_stock_levels, stores
+from invoices.models import Invoice
+from inventory.models import StoreStock
+from products.models import Category, Product
+from .checkout import place_order
+from .models import DocumentSequence, Order
+from .numbering import series_key
+
+User = get_user_model()
+
+STORE = 'garches'
+
+
+def _items(products, quantity=1):
+    return [
+        {
+            'product': product.pk, 'quantity': quantity,
+            'unit_price_ht': str(product.price_ht),
+            'unit_price_ttc': str(product.price_ttc),
+            'tva_rate': str(product.tva_rate),
+        }
+        for product in products
+    ]
+
+
+class PlaceOrderTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='caisse', email='caisse@example.com', password='caisse')
+        cls.client_id = Client.objects.create(
+            first_name='Jean', last_name='Martin', email='jean@example.com', phone='0100000000',
+        ).pk
+        category = Category.objects.create(name='Pièces')
+        cls.products = Product.objects.bulk_create([
+            Product(
+                reference=f'CHECKOUT-{i}', name=f'Produit {i}', category=category,
+                price_ht=Decimal('10.00'), price_ttc=Decimal('12.00'), total_stock=100,
+            )
+            for i in range(40)
+        ])
+        StoreStock.objects.bulk_create([
+            StoreStock(product=product, store_id=STORE, quantity=100) for product in cls.products
+        ])
+
+    def setUp(self):
+        # Régime établi : référentiel des magasins en cache, séries ouvertes
+        stores()
+        for doc_type in ('order', 'invoice'):
+            year, store = series_key(doc_type, STORE)
+            DocumentSequence.objects.get_or_create(doc_type=doc_type, year=year, store=store)
+
+    def place(self, products, quantity=1):
+        return place_order(
+            client_id=self.client_id, user=self.user, store=STORE,
+            items=_items(products, quantity), payment_method='card',
+        )
+
+    def test_query_count_independent_of_line_count(self):
+        counts = {}
+        for size in (1, 5, 15, 40):
+            with CaptureQueriesContext(connection) as queries:
+                self.place(self.products[:size])
+            counts[size] = len(queries)
+        self.assertEqual(len(set(counts.values())), 1, counts)
+
+        with self.assertNumQueries(counts[1]):
+            self.place(self.products[:40])
+
+    def test_totals_and_stock(self):
+        order = self.place(self.products[:3], quantity=2)
+        self.assertEqual(order.status, 'completed')
+        self.assertEqual(order.subtotal_ht, Decimal('60.00'))
+        self.assertEqual(order.total_ttc, Decimal('72.00'))
+        self.assertEqual(order.total_tva, Decimal('12.00'))
+        self.assertEqual(order.items.count(), 3)
+        self.assertEqual(
+            list(StoreStock.objects.filter(product__in=self.products[:3], store_id=STORE)
+                 .values_list('quantity', flat=True)),
+            [98, 98, 98],
+        )
+
+
+class OrderQueryBudgetTests(QueryBudgetCases, TestCase):
+    endpoints = [
+        ('orders-list', 'get', '/api/orders/'),
+        ('orders-list-compact', 'get', '/api/orders/?compact=1'),
+        ('orders-retrieve', 'get', '/api/orders/{order}/'),
+        ('orders-create', 'post', '/api/orders/', 'checkout'),
+        ('orders-cancel', 'patch', '/api/orders/{order}/', 'cancel'),
+    ]
+
+
+class OrderStatusTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='gerant', email='gerant@example.com', password='gerant')
+        category = Category.objects.create(name='Vélos')
+        cls.products = Product.objects.bulk_create([
+            Product(
+                reference=f'STATUS-{i}', name=f'Vélo {i}', category=category,
+                price_ht=Decimal('100.00'), price_ttc=Decimal('120.00'), total_stock=10,
+            )
+            for i in range(2)
+        ])
+        StoreStock.objects.bulk_create([StoreStock(product=product, store_id=STORE, quantity=10) for product in cls.products])
+
+    def setUp(self):
+        self.client_record = Client.objects.create(
+            first_name='Anne', last_name='Durand', email='anne@example.com', phone='0100000000',
+        )
+        self.order = place_order(
+            client_id=self.client_record.pk, user=self.user, store=STORE,
+            items=_items(self.products), payment_method='card',
+        )
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def patch(self, **data):
+        return self.api.patch(f'/api/orders/{self.order.pk}/', data, format='json')
+
+    def assertCounted(self, times):
+        summary = DailySalesSummary.objects.get(store=STORE, payment_method='card')
+        self.client_record.refresh_from_db()
+        self.assertEqual(summary.order_count, times)
+        self.assertEqual(summary.revenue_ttc, Decimal('240.00') * times)
+        self.assertEqual(self.client_record.visit_count, times)
+        self.assertEqual(self.client_record.total_purchases, Decimal('240.00') * times)
+
+    def test_back_to_pending_and_completed_again_counts_once(self):
+        self.assertCounted(1)
+        self.assertEqual(self.patch(status='pending').status_code, 200)
+        self.assertCounted(0)
+        self.assertEqual(self.patch(status='completed').status_code, 200)
+        self.assertCounted(1)
+
+    def test_cancel_removes_sale(self):
+        self.assertEqual(self.patch(status='cancelled').status_code, 200)
+        self.assertCounted(0)
+
+    def test_delete_removes_sale(self):
+        self.assertEqual(self.api.delete(f'/api/orders/{self.order.pk}/').status_code, 204)
+        self.assertCounted(0)
+
+    def test_delete_pending_order_removes_nothing(self):
+        self.assertEqual(self.patch(status='pending').status_code, 200)
+        self.assertEqual(self.api.delete(f'/api/orders/{self.order.pk}/').status_code, 204)
+        self.assertCounted(0)
+
+    def test_aggregated_fields_frozen_while_completed(self):
+        other = Client.objects.create(first_name='Paul', last_name='Petit', email='paul@example.com', phone='0100000000')
+        for data in ({'total_ttc': '10.00'}, {'payment_method': 'cash'}, {'store': 'ville_avray'},
+                     {'client': other.pk}, {'status': 'pending', 'total_ttc': '10.00'}):
+            with self.subTest(**data):
+                response = self.patch(**data)
+                self.assertEqual(response.status_code, 400, response.data)
+        self.assertCounted(1)
+        # Valeur inchangée ou champ non agrégé : accepté
+        self.assertEqual(self.patch(total_ttc='240.00', notes='Livraison').status_code, 200)
+
+        self.assertEqual(self.patch(status='pending').status_code, 200)
+        self.assertEqual(self.patch(total_ttc='200.00').status_code, 200)
+        self.assertEqual(self.patch(status='completed').status_code, 200)
+        summary = DailySalesSummary.objects.get(store=STORE, payment_method='card')
+        self.assertEqual(summary.revenue_ttc, Decimal('200.00'))
+
+
+class _Rollback(Exception):
+    pass
+
+
+@override_settings(CELERY_TASK_ALWAYS_EAGER=False)
+class NumberingConcurrencyTests(TransactionTestCase):
+    """
+    Commandes et factures créées depuis plusieurs threads, une transaction sur
+    ROLLBACK_EVERY annulée après avoir pris ses numéros : chaque série doit
+    rester continue, sans doublon ni trou.
+    """
+
+    # Magasins créés par les migrations, rétablis après le vidage de la base
+    serialized_rollback = True
+
+    THREADS = 8
+    ORDERS = 240
+    ROLLBACK_EVERY = 10
+    NUMBER_RE = re.compile(r'^(?P<series>.+)-(?P<value>\d{6})$')
+
+    def setUp(self):
+        # SQLite : la numérotation du journal de synchronisation après le
+        # commit échoue parfois (base verrouillée) ; l'échec est journalisé
+        self.enterContext(mock.patch.object(logging.getLogger('django.db.backends.base'), 'disabled', True))
+        self.user = User.objects.create_user(username='numbering', email='numbering@example.com', password='numbering')
+        self.client_id = Client.objects.create(
+            first_name='Test', last_name='Numérotation', email='numbering@example.com', phone='0100000000',
+        ).pk
+        self.product = Product.objects.create(
+            reference='NUMBERING', name='Produit test', price_ht=Decimal('10.00'), price_ttc=Decimal('12.00'),
+        )
+        with transaction.atomic():
+            set_stock_levels([(self.product, {code: 10 ** 6 for code in stores()})])
+
+    def worker(self, index, store_codes, committed, errors, lock):
+        item = _items([self.product])[0]
+        try:
+            for n in range(index, self.ORDERS, self.THREADS):
+                store = store_codes[n % len(store_codes)]
+                while True:
+                    try:
+                        with transaction.atomic():
+                            order = place_order(client_id=self.client_id, user=self.user, store=store, items=[item])
+                            Invoice.objects.create(order=order)
+                            if n % self.ROLLBACK_EVERY == 0:
+                                raise _Rollback
+                        with lock:
+                            committed.append(n)
+                    except _Rollback:
+                        pass
+                    except OperationalError:
+                        # SQLite : base verrouillée par un autre thread
+                        time.sleep(random.uniform(0, 0.002 * self.THREADS))
+                        continue
+                    break
+        except Exception as e:
+            with lock:
+                errors.append(f"thread {index} : {type(e).__name__} : {e}")
+        finally:
+            connection.close()
+
+    def test_series_without_duplicates_or_gaps(self):
+        store_codes = sorted(code for code, active in stores().items() if active)
+        committed, errors, lock = [], [], threading.Lock()
+        pool = [
+            threading.Thread(target=self.worker, args=(i, store_codes, committed, errors, lock))
+            for i in range(self.THREADS)
+        ]
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(committed), self.ORDERS - len(range(0, self.ORDERS, self.ROLLBACK_EVERY)))
+        for model, field in ((Order, 'order_number'), (Invoice, 'invoice_number')):
+            numbers = list(model.objects.values_list(field, flat=True))
+            self.assertEqual(len(numbers), len(committed))
+            series = defaultdict(list)
+            for number in numbers:
+                match = self.NUMBER_RE.match(number)
+                series[match['series']].append(int(match['value']))
+            self.assertEqual(len(series), len(store_codes))
+            for name, values in series.items():
+                with self.subTest(series=name):
+                    self.assertEqual(sorted(values), list(range(1, len(values) + 1)))
+        # Les compteurs n'ont pas avancé pour les transactions annulées
+        self.assertEqual(
+            sum(DocumentSequence.objects.values_list('last_value', flat=True)), 2 * len(committed),
+        )
+
+
+class OrderBatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='caisse2', email='caisse2@example.com', password='caisse')
+        cls.client_id = Client.objects.create(
+            first_name='Luc', last_name='Bernard', email='luc@example.com', phone='0100000000',
+        ).pk
+        category = Category.objects.create(name='Accessoires')
+        cls.products = Product.objects.bulk_create([
+            Product(
+                reference=f'BATCH-{i}', name=f'Accessoire {i}', category=category,
+                price_ht=Decimal('10.00'), price_ttc=Decimal('12.00'), total_stock=3,
+            )
+            for i in range(3)
+        ])
+        StoreStock.objects.bulk_create([StoreStock(product=product, store_id=STORE, quantity=3) for product in cls.products])
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def ticket(self, key, products, quantity=1, **extra):
+        return {
+            'idempotency_key': key, 'client': self.client_id, 'store': STORE,
+            'payment_method': 'card', 'items': _items(products, quantity), **extra,
+        }
+
+    def submit(self, *tickets):
+        response = self.api.post('/api/orders/batch/', {'orders': list(tickets)}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        return [result['status'] for result in response.data['results']]
+
+    def test_each_ticket_independent_and_idempotent(self):
+        tickets = [
+            self.ticket('caisse1-0001', self.products[:2]),
+            self.ticket('caisse1-0002', self.products[2:], quantity=99),
+            self.ticket('caisse1-0001', self.products[:1]),
+            self.ticket('caisse1-0003', self.products[:1], client=999999),
+            self.ticket('', self.products[:1]),
+            self.ticket('caisse1-0004', self.products[:1]),
+        ]
+        self.assertEqual(self.submit(*tickets), ['created', 'error', 'duplicate', 'error', 'error', 'created'])
+        self.assertEqual(Order.objects.count(), 2)
+        self.assertEqual(StoreStock.objects.get(product=self.products[0], store_id=STORE).quantity, 1)
+
+        # Réponse perdue, lot renvoyé : rien n'est recréé ni décompté
+        self.assertEqual(self.submit(*tickets), ['duplicate', 'error', 'duplicate', 'error', 'error', 'duplicate'])
+        self.assertEqual(Order.objects.count(), 2)
+        self.assertEqual(StoreStock.objects.get(product=self.products[0], store_id=STORE).quantity, 1)
+
+    def test_invalid_envelope(self):
+        response = self.api.post('/api/orders/batch/', {'orders': []}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
@@ -1,175 +1,221 @@
-from rest_framework import viewsets, status
+import logging
+from datetime import date, datetime, time, timedelta
+
+from rest_framework import serializers, viewsets, status
+from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.db import transaction
+from django.db.models import F, Prefetch, Value
+from django.db.models.functions import Concat
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from bike_erp import xlsx
+from bike_erp.fieldsets import SparseFieldsetsViewMixin
+from bike_erp.metrics import current_metrics
+from bike_erp.query_budget import QueryBudgetMixin
+from .batch import BatchError, submit_batch
+from .export import export_rows, stream_csv
 from .models import Order, OrderItem
 from .serializers import OrderSerializer
-from products.models import Product
+from .checkout import place_order
+from .signals import AGGREGATED_FIELDS, order_cancelled, send_status_signals
+
+logger = logging.getLogger(__name__)
+
+
+def order_detail_queryset():
+    """Commandes avec tout ce que lit OrderSerializer, en un nombre fixe de requêtes."""
+    return Order.objects.select_related('client', 'invoice').prefetch_related(
+        Prefetch('items', queryset=OrderItem.objects.select_related('product__category')),
+        'items__product__store_stocks',
+    )
 
 
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(QueryBudgetMixin, SparseFieldsetsViewMixin, viewsets.ModelViewSet):
     queryset = Order.objects.all()
     serializer_class = OrderSerializer
     ordering = ['-created_at']
+    # ?compact=1 : liste des commandes sans lignes ni facture
+    compact_fields = [
+        'id', 'order_number', 'client', 'store', 'status', 'payment_method',
+        'total_ttc', 'created_at', 'completed_at',
+    ]
+    compact_annotations = {
+        'client_name': Concat(F('client__first_name'), Value(' '), F('client__last_name')),
+    }
+    # Écritures : callbacks on_commit compris (journal de synchronisation,
+    # caches, mise en file du PDF et son repli si le broker est injoignable)
+    query_budgets = {
+        'list': 4,
+        'retrieve': 3,
+        'create': 30,
+        'update': 21,
+        'partial_update': 21,
+    }
+    
+    def perform_content_negotiation(self, request, force=False):
+        # Pour l'export, ?format= désigne le fichier produit, pas un renderer
+        return super().perform_content_negotiation(request, force=force or self.action == 'export')
+    
+    def get_queryset(self):
+        if self.action == 'destroy':
+            return Order.objects.all()
+        return order_detail_queryset()
     
     def create(self, request, *args, **kwargs):
-        # Debug: afficher les données reçues
-        print("===== DONNÉES REÇUES =====")
-        print(request.data)
-        print("===========================")
+        items_data = request.data.get('items', [])
+        if not items_data:
+            return Response(
+                {'error': 'Aucun article dans la commande'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
         try:
             with transaction.atomic():
-                # Extraire les items
-                items_data = request.data.get('items', [])
-                
-                if not items_data:
-                    return Response(
-                        {'error': 'Aucun article dans la commande'}, 
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-                
-                # Créer la commande
-                order = Order.objects.create(
+                # Créer la commande, ses lignes et déduire le stock en lot
+                order = place_order(
                     client_id=request.data['client'],
                     user=request.user,
                     store=request.data['store'],
+                    items=items_data,
                     payment_method=request.data.get('payment_method', 'cash'),
                     installments=request.data.get('installments', 1),
                 )
                 
-                # Créer les items et calculer les totaux
-                subtotal_ht = 0
-                total_tva = 0
-                
-                for item_data in items_data:
-                    product = Product.objects.get(id=item_data['product'])
-                    
-                    # Créer l'item
-                    order_item = OrderItem.objects.create(
-                        order=order,
-                        product=product,
-                        quantity=item_data['quantity'],
-                        unit_price_ht=float(item_data['unit_price_ht']),
-                        unit_price_ttc=float(item_data['unit_price_ttc']),
-                        tva_rate=float(item_data['tva_rate']),
-                    )
-                    
-                    subtotal_ht += float(order_item.subtotal_ht)
-                    total_tva += (float(order_item.subtotal_ttc) - float(order_item.subtotal_ht))
-                    
-                    # Déduire du stock
-                    if order.store == 'ville_avray':
-                        product.stock_ville_avray -= item_data['quantity']
-                    else:
-                        product.stock_garches -= item_data['quantity']
-                    product.save()
-                
-                # Mettre à jour les totaux de la commande
-                order.subtotal_ht = subtotal_ht
-                order.total_tva = total_tva
-                order.total_ttc = subtotal_ht + total_tva
-                order.status = 'completed'
-                order.save()
-                
-                # Créer la facture automatiquement
+                # Créer la facture ; le PDF est généré en tâche de fond
                 from invoices.models import Invoice
-                invoice = Invoice.objects.create(order=order)
-                
-                serializer = self.get_serializer(order)
-                return Response(serializer.data, status=status.HTTP_201_CREATED)
+                invoice = Invoice.objects.create(order=order, pdf_status='pending')
+                invoice.schedule_pdf()
                 
         except Exception as e:
-            print("===== ERREUR =====")
-            print("Type:", type(e).__name__)
-            print("Message:", str(e))
-            print("==================")
+            logger.warning(
+                "Commande refusée : %s", e,
+                extra={
+                    'error': type(e).__name__,
+                    'client': request.data.get('client'),
+                    'store': request.data.get('store'),
+                    'items': len(items_data),
+                    **self._timings(),
+                },
+            )
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
-
-'''
-from rest_framework import viewsets, status
-from rest_framework.response import Response
-from django.db import transaction
-from .models import Order, OrderItem
-from .serializers import OrderSerializer
-from products.models import Product
-
-
-class OrderViewSet(viewsets.ModelViewSet):
-    queryset = Order.objects.all()
-    serializer_class = OrderSerializer
-    ordering = ['-created_at']
+        
+        order = order_detail_queryset().get(pk=order.pk)
+        serializer = self.get_serializer(order)
+        data = serializer.data
+        logger.info(
+            "Commande créée : %s", order.order_number,
+            extra={
+                'order': order.pk,
+                'client': order.client_id,
+                'store': order.store_id,
+                'items': len(items_data),
+                'total_ttc': order.total_ttc,
+                **self._timings(),
+            },
+        )
+        return Response(data, status=status.HTTP_201_CREATED)
     
-    def create(self, request, *args, **kwargs):
-        # Debug: afficher les données reçues
-        print("===== DONNÉES REÇUES =====")
-        print(request.data)
-        print("===========================")
+    def _timings(self):
+        # Mesures de la requête jusqu'ici (le rendu de la réponse vient après)
+        metrics = current_metrics()
+        return metrics.as_log() if metrics is not None else {}
+    
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """
+        Tickets mis en file hors ligne par la caisse, rejoués en un appel
+        (voir orders/batch.py). Réponse : {"results": [un résultat par ticket]}.
+        """
+        try:
+            orders = request.data.get('orders') if hasattr(request.data, 'get') else None
+            results = submit_batch(orders, request.user)
+        except BatchError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        counts = {'created': 0, 'duplicate': 0, 'error': 0}
+        for result in results:
+            counts[result['status']] += 1
+        logger.info(
+            "Lot de %s commande(s) rejoué", len(results),
+            extra={f'orders_{name}': count for name, count in counts.items()} | self._timings(),
+        )
+        return Response({'results': results})
+    
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Export comptable en flux : /api/orders/export/?from=&to=&format=csv|xlsx
         
+        Une ligne par article ; période par défaut : le mois en cours.
+        """
+        params = request.query_params
+        export_format = params.get('format', 'csv')
+        if export_format not in ('csv', 'xlsx'):
+            return Response({'error': f"Format inconnu : {export_format}"}, status=status.HTTP_400_BAD_REQUEST)
         try:
-            with transaction.atomic():
-                # Extraire les items
-                items_data = request.data.get('items', [])
-                
-                if not items_data:
-                    return Response(
-                        {'error': 'Aucun article dans la commande'}, 
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-                
-                # Créer la commande
-                order = Order.objects.create(
-                    client_id=request.data['client'],
-                    user=request.user,
-                    store=request.data['store'],
-                    payment_method=request.data.get('payment_method', 'cash'),
-                    installments=request.data.get('installments', 1),
-                )
-                
-                # Créer les items et calculer les totaux
-                subtotal_ht = 0
-                total_tva = 0
-                
-                for item_data in items_data:
-                    product = Product.objects.get(id=item_data['product'])
-                    
-                    # Créer l'item
-                    order_item = OrderItem.objects.create(
-                        order=order,
-                        product=product,
-                        quantity=item_data['quantity'],
-                        unit_price_ht=float(item_data['unit_price_ht']),
-                        unit_price_ttc=float(item_data['unit_price_ttc']),
-                        tva_rate=float(item_data['tva_rate']),
-                    )
-                    
-                    subtotal_ht += float(order_item.subtotal_ht)
-                    total_tva += (float(order_item.subtotal_ttc) - float(order_item.subtotal_ht))
-                    
-                    # Déduire du stock
-                    if order.store == 'ville_avray':
-                        product.stock_ville_avray -= item_data['quantity']
-                    else:
-                        product.stock_garches -= item_data['quantity']
-                    product.save()
-                
-                # Mettre à jour les totaux de la commande
-                order.subtotal_ht = subtotal_ht
-                order.total_tva = total_tva
-                order.total_ttc = subtotal_ht + total_tva
-                order.status = 'completed'
-                order.save()
-                
-                # Créer la facture automatiquement
-                from invoices.models import Invoice
-                invoice = Invoice.objects.create(order=order)
-                
-                serializer = self.get_serializer(order)
-                return Response(serializer.data, status=status.HTTP_201_CREATED)
-                
-        except Exception as e:
-            print("===== ERREUR =====")
-            print("Type:", type(e).__name__)
-            print("Message:", str(e))
-            print("==================")
+            end = date.fromisoformat(params['to']) if params.get('to') else timezone.localdate()
+            start = date.fromisoformat(params['from']) if params.get('from') else end.replace(day=1)
+        except ValueError as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
-            '''
\ No newline at end of file
+        if start > end:
+            return Response({'error': "'from' doit précéder 'to'"}, status=status.HTTP_400_BAD_REQUEST)
+        
+        rows = export_rows(
+            timezone.make_aware(datetime.combine(start, time.min)),
+            timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min)),
+        )
+        filename = f"commandes_{start}_{end}.{export_format}"
+        if export_format == 'xlsx':
+            response = StreamingHttpResponse(xlsx.stream_xlsx(rows, sheet_name='Commandes'), content_type=xlsx.CONTENT_TYPE)
+        else:
+            response = StreamingHttpResponse(stream_csv(rows), content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+    
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            # Verrouille la commande : deux annulations simultanées ne
+            # doivent retirer la vente des agrégats qu'une seule fois
+            frozen = {name: Order._meta.get_field(name).attname for name in AGGREGATED_FIELDS}
+            current = (
+                Order.objects.select_for_update()
+                .values('status', *frozen.values())
+                .get(pk=serializer.instance.pk)
+            )
+            previous_status = current['status']
+            if previous_status == 'completed':
+                self._check_frozen_fields(serializer.validated_data, current, frozen)
+            extra = {}
+            if (serializer.validated_data.get('status') == 'completed'
+                    and previous_status != 'completed' and not serializer.instance.completed_at):
+                extra['completed_at'] = timezone.now()
+            order = serializer.save(**extra)
+            send_status_signals(order, previous_status)
+        # Réponse relue avec ses préchargements (ceux de get_object() sont
+        # vidés après la sauvegarde, d'où un N+1 sur les lignes)
+        serializer.instance = order_detail_queryset().get(pk=order.pk)
+    
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            # Même verrou que perform_update ; commande relue sous le verrou :
+            # une commande terminée supprimée retire sa vente des agrégats
+            order = Order.objects.select_for_update().get(pk=instance.pk)
+            if order.status == 'completed':
+                order_cancelled.send(sender=Order, order=order, items=list(order.items.all()))
+            order.delete()
+    
+    @staticmethod
+    def _check_frozen_fields(data, current, frozen):
+        """Refuse de modifier les montants, client, magasin... d'une commande terminée."""
+        # Valeurs en colonnes (client_id...) pour les comparer à la ligne verrouillée
+        candidate = Order(**{name: data[name] for name in frozen if name in data})
+        changed = [
+            name for name, attname in frozen.items()
+            if name in data and getattr(candidate, attname) != current[attname]
+        ]
+        if changed:
+            raise serializers.ValidationError({
+                name: "Non modifiable sur une commande terminée : la repasser d'abord en attente"
+                for name in changed
+            })
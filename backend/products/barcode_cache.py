@@ -0,0 +1,156 @@
+"""
+Cache des résolutions code-barres -> produit sérialisé.
+
+Deux niveaux :
+- un LRU en mémoire du processus (quelques microsecondes, TTL court car il
+  n'est invalidé que dans le processus qui modifie le produit) ;
+- un niveau partagé optionnel (cache Django, typiquement Redis), invalidé
+  pour tous les workers.
+
+Les codes inconnus sont aussi mis en cache (MISSING) pour qu'une douchette
+qui répète un code inconnu ne frappe pas la base à chaque lecture.
+L'invalidation est déclenchée par les signaux de Product (products/signals.py)
+et par les mises à jour de stock groupées, qui ne passent pas par save().
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+MISSING = {'__missing__': True}
+
+
+def is_missing(payload):
+    return payload.get('__missing__', False)
+
+
+class LRUCache:
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_where(self, predicate):
+        with self._lock:
+            for key in [k for k, (v, _) in self._data.items() if predicate(v)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class BarcodeCache:
+    def __init__(self):
+        config = getattr(settings, 'BARCODE_CACHE', {})
+        self.local = LRUCache(config.get('SIZE', 4096), config.get('LOCAL_TTL', 60))
+        self.shared_alias = config.get('SHARED_ALIAS')
+        self.shared_ttl = config.get('SHARED_TTL', 3600)
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias] if self.shared_alias else None
+
+    @staticmethod
+    def _key(code):
+        return f'barcode:code:{code}'
+
+    @staticmethod
+    def _product_key(product_id):
+        return f'barcode:product:{product_id}'
+
+    def get_many(self, codes):
+        """Retourne {code: payload} pour les codes en cache (MISSING inclus)."""
+        found = {}
+        for code in codes:
+            value = self.local.get(code)
+            if value is not None:
+                found[code] = value
+        shared = self.shared
+        remaining = [code for code in codes if code not in found]
+        if shared is not None and remaining:
+            hits = shared.get_many([self._key(code) for code in remaining])
+            for code in remaining:
+                value = hits.get(self._key(code))
+                if value is not None:
+                    found[code] = value
+                    self.local.set(code, value)
+        return found
+
+    def get(self, code):
+        return self.get_many([code]).get(code)
+
+    def set_many(self, payloads):
+        """Enregistre {code: payload} ; payload vaut MISSING pour un code inconnu."""
+        for code, payload in payloads.items():
+            self.local.set(code, payload)
+        shared = self.shared
+        if shared is not None and payloads:
+            values = {self._key(code): payload for code, payload in payloads.items()}
+            # Index inverse produit -> code, pour invalider un code modifié
+            values.update({
+                self._product_key(payload['id']): code
+                for code, payload in payloads.items() if not is_missing(payload)
+            })
+            shared.set_many(values, self.shared_ttl)
+
+    def invalidate(self, products):
+        """Oublie les produits donnés (objets Product ou dicts avec id/barcode)."""
+        codes, ids = set(), set()
+        for product in products:
+            product_id = product['id'] if isinstance(product, dict) else product.pk
+            code = product.get('barcode') if isinstance(product, dict) else product.barcode
+            if product_id is not None:
+                ids.add(product_id)
+            if code:
+                codes.add(code)
+        if not ids and not codes:
+            return
+        for code in codes:
+            self.local.delete(code)
+        self.local.delete_where(lambda payload: payload.get('id') in ids)
+        shared = self.shared
+        if shared is not None:
+            previous = shared.get_many([self._product_key(pk) for pk in ids])
+            codes.update(previous.values())
+            shared.delete_many(
+                [self._key(code) for code in codes] + [self._product_key(pk) for pk in ids]
+            )
+
+    def invalidate_on_commit(self, products):
+        products = list(products)
+        transaction.on_commit(lambda: self.invalidate(products))
+
+    def clear(self):
+        self.local.clear()
+
+
+barcode_cache = BarcodeCache()
@@ -0,0 +1,155 @@
+"""
+Déclinaisons des images produit : vignettes WebP et JPEG à taille fixe.
+
+L'original téléversé reste dans Product.image ; chaque déclinaison de
+PRODUCT_IMAGES['VARIANTS'] (thumb, card, detail) est produite dans chaque
+format de PRODUCT_IMAGES['FORMATS'], réduite pour tenir dans un carré de la
+taille indiquée (jamais agrandie). Product.image_variants les décrit :
+
+    {'source': 'products/velo.png',
+     'webp': {'thumb': {'name': ..., 'width': 160, 'height': 107}, ...},
+     'jpeg': {...}}
+
+Les fichiers sont rangés sous products/variants/<empreinte>/ : l'empreinte
+couvre l'original et les réglages, un même nom désigne donc toujours le même
+contenu et peut être servi avec un cache immuable (voir image_variant dans
+products/views.py).
+
+Génération en tâche Celery après chaque changement d'image (products/
+signals.py), en mode synchrone sous CELERY_TASK_ALWAYS_EAGER ; rattrapage
+des images existantes : commande build_image_variants.
+"""
+
+import hashlib
+import io
+import logging
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+PRODUCT_IMAGES_DIR = 'products'
+VARIANTS_DIR = f'{PRODUCT_IMAGES_DIR}/variants'
+PIL_FORMATS = {'webp': 'WEBP', 'jpeg': 'JPEG'}
+EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+
+
+def _config():
+    return settings.PRODUCT_IMAGES
+
+
+def _fingerprint(content):
+    config = _config()
+    digest = hashlib.sha1(content)
+    digest.update(repr((sorted(config['VARIANTS'].items()), config['FORMATS'], sorted(config['QUALITY'].items()))).encode())
+    return digest.hexdigest()[:16]
+
+
+def _encode(image, fmt):
+    if fmt == 'jpeg' and image.mode != 'RGB':
+        # Pas de transparence en JPEG : fond blanc
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A') if 'A' in image.getbands() else None)
+        image = background
+    buffer = io.BytesIO()
+    quality = _config()['QUALITY'][fmt]
+    options = {'quality': quality, 'method': 6} if fmt == 'webp' else {'quality': quality, 'optimize': True}
+    image.save(buffer, PIL_FORMATS[fmt], **options)
+    return buffer.getvalue()
+
+
+def render_variants(name, storage=None):
+    """
+    Produit les déclinaisons de l'image `name` et retourne leur description.
+
+    Sans accès à la base : utilisable dans un processus de travail
+    (commande build_image_variants). Les fichiers déjà présents ne sont pas
+    réécrits.
+    """
+    storage = storage or default_storage
+    with storage.open(name, 'rb') as source:
+        content = source.read()
+    folder = f'{VARIANTS_DIR}/{_fingerprint(content)}'
+    stem = os.path.splitext(os.path.basename(name))[0][:60]
+
+    original = ImageOps.exif_transpose(Image.open(io.BytesIO(content)))
+    if original.mode not in ('RGB', 'RGBA'):
+        original = original.convert('RGBA' if 'transparency' in original.info or 'A' in original.getbands() else 'RGB')
+
+    data = {'source': name}
+    for label, size in _config()['VARIANTS'].items():
+        image = original.copy()
+        image.thumbnail((size, size), Image.LANCZOS)
+        for fmt in _config()['FORMATS']:
+            variant_name = f'{folder}/{stem}-{label}.{EXTENSIONS[fmt]}'
+            if not storage.exists(variant_name):
+                stored = storage.save(variant_name, ContentFile(_encode(image, fmt)))
+                if stored != variant_name:
+                    # Écrit entre-temps par un autre processus : même empreinte, même contenu
+                    storage.delete(stored)
+            data.setdefault(fmt, {})[label] = {'name': variant_name, 'width': image.width, 'height': image.height}
+    return data
+
+
+def apply_variants(product_id, data):
+    """
+    Enregistre la description si l'image du produit n'a pas changé entre-temps.
+
+    Retourne True si le produit a été mis à jour.
+    """
+    from .models import Product
+    with transaction.atomic():
+        product = Product.objects.select_for_update().filter(pk=product_id).first()
+        source = product.image.name if product and product.image else ''
+        if product is None or source != data.get('source', ''):
+            return False
+        product.image_variants = data
+        # post_save : caches, ETag et journal de synchronisation suivent
+        product.save(update_fields=['image_variants', 'updated_at'])
+    return True
+
+
+def build_variants(product_id):
+    from .models import Product
+    names = list(Product.objects.filter(pk=product_id).values_list('image', flat=True))
+    if not names:
+        return False
+    # Image retirée : les déclinaisons sont oubliées
+    return apply_variants(product_id, render_variants(names[0]) if names[0] else {})
+
+
+def schedule_variants(product):
+    """Met la génération en file ; elle part après le commit."""
+    from .tasks import render_image_variants
+    product_id = product.pk
+
+    def enqueue():
+        try:
+            render_image_variants.apply_async((product_id,), retry=False)
+        except Exception:
+            # Broker injoignable : build_image_variants rattrapera
+            logger.exception("Impossible de mettre en file les images du produit %s", product_id)
+
+    transaction.on_commit(enqueue)
+
+
+def needs_variants(product):
+    source = product.image.name if product.image else ''
+    return source != (product.image_variants or {}).get('source', '')
+
+
+def srcset(variants, fmt, url):
+    """'url 160w, url 480w, ...' pour un format, ou None."""
+    entries = (variants or {}).get(fmt)
+    if not entries:
+        return None
+    # Un original plus petit que les cadres donne plusieurs déclinaisons de même largeur
+    widths = {}
+    for entry in sorted(entries.values(), key=lambda entry: entry['width']):
+        widths.setdefault(entry['width'], entry['name'])
+    return ', '.join(f"{url(name)} {width}w" for width, name in widths.items())
@@ -0,0 +1,366 @@
+"""
+Import en masse d'un catalogue fournisseur (CSV ou XLSX), avec mise à jour
+des produits existants sur leur référence.
+
+Le fichier est lu ligne par ligne ; les lignes valides sont écrites par
+paquets de `chunk_size` avec un seul INSERT ... ON CONFLICT (reference) DO
+UPDATE par paquet, chaque paquet dans sa propre transaction. Les catégories
+sont résolues depuis un dictionnaire chargé une fois. Les lignes invalides
+sont écartées et décrites dans le rapport, sans bloquer le reste du fichier.
+
+Colonnes reconnues (en-tête insensible à la casse) : les noms des champs de
+Product listés dans IMPORT_FIELDS, plus quelques libellés français (ALIASES).
+Seules les colonnes présentes dans le fichier sont mises à jour ; une
+cellule vide vaut la valeur par défaut du champ. Les colonnes de stock
+stock_<code magasin> sont enregistrées comme ajustements du journal des
+mouvements (inventory) ; une cellule de stock vide laisse le stock inchangé.
+"""
+
+import csv
+import io
+import os
+from decimal import Decimal, InvalidOperation
+
+from django.db import IntegrityError, transaction
+
+from bike_erp.conditional import mark_changed
+from bike_erp.xlsx import iter_xlsx_rows
+from inventory.ledger import set_stock_levels, stores
+from sync.log import record_changes
+from .barcode_cache import barcode_cache
+from .models import Category, Product
+
+TWO_PLACES = Decimal('0.01')
+
+IMPORT_FIELDS = [
+    'reference', 'name', 'description', 'product_type', 'category', 'brand',
+    'price_ht', 'price_ttc', 'tva_rate', 'purchase_price_ht',
+    'alert_stock', 'barcode', 'weight',
+    'is_active', 'is_visible',
+]
+ALIASES = {
+    'référence': 'reference', 'ref': 'reference',
+    'nom': 'name', 'désignation': 'name', 'designation': 'name',
+    'type': 'product_type',
+    'catégorie': 'category', 'categorie': 'category',
+    'marque': 'brand',
+    'prix_ht': 'price_ht', 'prix ht': 'price_ht',
+    'prix_ttc': 'price_ttc', 'prix ttc': 'price_ttc',
+    'tva': 'tva_rate', 'taux_tva': 'tva_rate',
+    'prix_achat_ht': 'purchase_price_ht', "prix d'achat ht": 'purchase_price_ht',
+    'code_barre': 'barcode', 'code-barres': 'barcode', 'ean': 'barcode',
+    'poids': 'weight',
+}
+REQUIRED = ['reference', 'name', 'price_ht']
+
+TRUE_VALUES = {'1', 'true', 'vrai', 'oui', 'yes', 'o', 'y', 'x'}
+FALSE_VALUES = {'0', 'false', 'faux', 'non', 'no', 'n'}
+PRODUCT_TYPES = {
+    **{code: code for code, _ in Product.PRODUCT_TYPE},
+    **{label.casefold(): code for code, label in Product.PRODUCT_TYPE},
+}
+
+
+class ImportFileError(ValueError):
+    pass
+
+
+def read_rows(file, filename):
+    """Lignes (listes de valeurs) d'un fichier binaire CSV ou XLSX, en-tête compris."""
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.xlsx':
+        return iter_xlsx_rows(file)
+    if extension in ('.csv', '.txt'):
+        text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+        first_line = text.readline()
+        delimiter = ';' if first_line.count(';') > first_line.count(',') else ','
+        return csv.reader(_chain(first_line, text), delimiter=delimiter)
+    raise ImportFileError(f"Format non pris en charge : {extension or filename} (CSV ou XLSX)")
+
+
+def _chain(first_line, text):
+    yield first_line
+    yield from text
+
+
+def _clean(value):
+    if value is None:
+        return ''
+    return str(value).strip()
+
+
+def _decimal(value):
+    if isinstance(value, (int, Decimal)):
+        return Decimal(value)
+    text = _clean(value).replace('\xa0', '').replace(' ', '').replace('€', '').replace('%', '').replace(',', '.')
+    return Decimal(text)
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.errors = []
+
+    @property
+    def skipped(self):
+        return len(self.errors)
+
+    def add_error(self, line, reference, messages):
+        self.errors.append({'line': line, 'reference': reference, 'errors': messages})
+
+    def as_dict(self):
+        return {
+            'rows': self.rows,
+            'created': self.created,
+            'updated': self.updated,
+            'skipped': self.skipped,
+            'errors': self.errors,
+        }
+
+
+class ProductImporter:
+    def __init__(self, chunk_size=1000, create_categories=True, dry_run=False):
+        self.chunk_size = chunk_size
+        self.create_categories = create_categories
+        self.dry_run = dry_run
+        self.report = ImportReport()
+        self.categories = {
+            name.casefold(): pk for pk, name in Category.objects.values_list('pk', 'name')
+        }
+        self.seen_references = {}
+        self.seen_barcodes = {}
+        self.fields = {field.name: field for field in Product._meta.get_fields() if field.concrete}
+        self.stock_columns = {f'stock_{code}': code for code in stores()}
+
+    def run(self, rows):
+        rows = iter(rows)
+        try:
+            header = next(rows)
+        except StopIteration:
+            raise ImportFileError('Fichier vide')
+        columns = self._columns(header)
+
+        chunk = []
+        # Ligne 1 : en-tête
+        for line, values in enumerate(rows, start=2):
+            if not any(_clean(value) for value in values):
+                continue
+            self.report.rows += 1
+            row = self._parse(line, columns, values)
+            if row is not None:
+                chunk.append((line, row))
+            if len(chunk) >= self.chunk_size:
+                self._flush(chunk, columns)
+                chunk = []
+        if chunk:
+            self._flush(chunk, columns)
+        return self.report
+
+    def _columns(self, header):
+        columns = {}
+        for index, title in enumerate(header):
+            key = _clean(title).casefold()
+            field = ALIASES.get(key, key)
+            if (field in IMPORT_FIELDS or field in self.stock_columns) and field not in columns:
+                columns[field] = index
+        missing = [field for field in REQUIRED if field not in columns]
+        if missing:
+            raise ImportFileError(f"Colonne(s) obligatoire(s) absente(s) : {', '.join(missing)}")
+        return columns
+
+    def _parse(self, line, columns, values):
+        """Valide une ligne ; retourne les valeurs des champs, ou None si la ligne est rejetée."""
+        raw = {
+            field: values[index] if index < len(values) else None
+            for field, index in columns.items()
+        }
+        reference = _clean(raw['reference'])
+        errors = []
+        row = {}
+        for field, value in raw.items():
+            try:
+                row[field] = self._convert(field, value)
+            except (ValueError, InvalidOperation) as e:
+                message = str(e) if isinstance(e, ValueError) and str(e) else 'valeur invalide'
+                errors.append(f"{field} : {message}")
+
+        for field in REQUIRED:
+            if field in row and row[field] in (None, ''):
+                errors.append(f"{field} : obligatoire")
+
+        if reference:
+            first_line = self.seen_references.setdefault(reference, line)
+            if first_line != line:
+                errors.append(f"reference : déjà présente ligne {first_line}")
+        barcode = row.get('barcode')
+        if barcode:
+            first_line = self.seen_barcodes.setdefault(barcode, line)
+            if first_line != line:
+                errors.append(f"barcode : déjà présent ligne {first_line}")
+
+        if errors:
+            self.report.add_error(line, reference, errors)
+            return None
+        return row
+
+    def _convert(self, field, value):
+        text = _clean(value)
+        model_field = self.fields.get(field)
+        if field == 'category':
+            return text or None
+        if field == 'product_type':
+            if not text:
+                return model_field.default
+            code = PRODUCT_TYPES.get(text.casefold())
+            if code is None:
+                raise ValueError(f"type inconnu « {text} »")
+            return code
+        if field in ('is_active', 'is_visible'):
+            if isinstance(value, bool):
+                return value
+            if not text:
+                return model_field.default
+            if text.casefold() in TRUE_VALUES:
+                return True
+            if text.casefold() in FALSE_VALUES:
+                return False
+            raise ValueError(f"booléen attendu, « {text} » reçu")
+        if field in self.stock_columns or field == 'alert_stock':
+            if not text:
+                return model_field.default if model_field else None
+            number = _decimal(value)
+            if number != number.to_integral_value():
+                raise ValueError('nombre entier attendu')
+            return int(number)
+        if field in ('price_ht', 'price_ttc', 'tva_rate', 'purchase_price_ht', 'weight'):
+            if not text:
+                return Decimal(str(model_field.default)) if model_field.has_default() else None
+            number = _decimal(value)
+            if number < 0:
+                raise ValueError('valeur négative')
+            return number.quantize(TWO_PLACES)
+        if field == 'barcode':
+            # Les codes-barres numériques lus dans Excel arrivent comme nombres
+            return text or None
+        if model_field.max_length and len(text) > model_field.max_length:
+            raise ValueError(f"{model_field.max_length} caractères maximum")
+        return text
+
+    def _resolve_categories(self, chunk):
+        """Remplace les noms de catégorie par leur id ; crée les catégories manquantes si demandé."""
+        missing = {
+            row['category'] for _, row in chunk
+            if row.get('category') and row['category'].casefold() not in self.categories
+        }
+        if missing and self.create_categories:
+            Category.objects.bulk_create([Category(name=name) for name in missing], ignore_conflicts=True)
+            self.categories.update(
+                (name.casefold(), pk)
+                for pk, name in Category.objects.filter(name__in=missing).values_list('pk', 'name')
+            )
+        resolved = []
+        for line, row in chunk:
+            name = row.get('category')
+            if name and name.casefold() not in self.categories:
+                self.report.add_error(line, row['reference'], [f"category : catégorie inconnue « {name} »"])
+                continue
+            resolved.append((line, row))
+        return resolved
+
+    def _flush(self, chunk, columns):
+        with transaction.atomic():
+            chunk = self._resolve_categories(chunk)
+            references = [row['reference'] for _, row in chunk]
+            existing = {
+                reference: (pk, barcode, tva_rate)
+                for reference, pk, barcode, tva_rate in Product.objects.filter(
+                    reference__in=references
+                ).values_list('reference', 'pk', 'barcode', 'tva_rate')
+            }
+            barcodes = [row['barcode'] for _, row in chunk if row.get('barcode')]
+            taken = dict(
+                Product.objects.filter(barcode__in=barcodes)
+                .exclude(reference__in=references)
+                .values_list('barcode', 'reference')
+            )
+
+            products = []
+            valid = []
+            stock_levels = {}
+            for line, row in chunk:
+                barcode = row.get('barcode')
+                if barcode in taken:
+                    self.report.add_error(line, row['reference'], [f"barcode : déjà utilisé par {taken[barcode]}"])
+                    continue
+                values = dict(row)
+                levels = {
+                    self.stock_columns[field]: quantity
+                    for field, quantity in [(field, values.pop(field)) for field in self.stock_columns if field in values]
+                    if quantity is not None
+                }
+                if levels:
+                    stock_levels[row['reference']] = levels
+                category = values.pop('category', None)
+                if 'category' in columns:
+                    values['category_id'] = self.categories[category.casefold()] if category else None
+                if 'price_ttc' not in columns or values.get('price_ttc') is None:
+                    tva_rate = values.get('tva_rate')
+                    if tva_rate is None:
+                        tva_rate = existing[row['reference']][2] if row['reference'] in existing else Decimal('20.00')
+                    values['price_ttc'] = (values['price_ht'] * (1 + tva_rate / 100)).quantize(TWO_PLACES)
+                products.append(Product(**values))
+                valid.append((line, row))
+            if not products:
+                return
+
+            update_fields = [
+                field for field in columns
+                if field != 'reference' and field not in self.stock_columns
+            ]
+            if 'price_ttc' not in update_fields:
+                update_fields.append('price_ttc')
+            update_fields.append('updated_at')
+            try:
+                with transaction.atomic():
+                    Product.objects.bulk_create(
+                        products,
+                        update_conflicts=True,
+                        unique_fields=['reference'],
+                        update_fields=update_fields,
+                    )
+            except IntegrityError as e:
+                for line, row in valid:
+                    self.report.add_error(line, row['reference'], [f"conflit d'unicité dans le paquet : {e}"])
+                return
+
+            if stock_levels:
+                # Les quantités du fichier deviennent des ajustements du journal
+                ids = dict(Product.objects.filter(reference__in=stock_levels).values_list('reference', 'pk'))
+                set_stock_levels(
+                    [(Product(pk=ids[reference]), levels) for reference, levels in stock_levels.items()],
+                    reference='Import catalogue',
+                )
+
+            created = sum(1 for _, row in valid if row['reference'] not in existing)
+            self.report.created += created
+            self.report.updated += len(valid) - created
+
+            if self.dry_run:
+                transaction.set_rollback(True)
+                return
+            mark_changed(Product, Category)
+            record_changes(Product, Product.objects.filter(
+                reference__in=[row['reference'] for _, row in valid]
+            ).values_list('pk', flat=True))
+            barcode_cache.invalidate_on_commit(
+                [{'id': pk, 'barcode': barcode} for pk, barcode, _ in existing.values()]
+                + [{'id': None, 'barcode': row['barcode']} for _, row in valid if row.get('barcode')]
+            )
+
+
+def import_products(file, filename, **options):
+    """Importe un fichier catalogue ; retourne l'ImportReport."""
+    importer = ProductImporter(**options)
+    return importer.run(read_rows(file, filename))
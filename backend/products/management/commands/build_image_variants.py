@@ -0,0 +1,77 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from products.images import apply_variants, render_variants
+from products.models import Product
+
+
+def _init_worker():
+    # Processus lancés par spawn (macOS, Windows) : Django à initialiser
+    django.setup()
+
+
+class Command(BaseCommand):
+    help = (
+        "Produit les déclinaisons WebP/JPEG des images produit qui n'en ont pas "
+        "(toutes avec --force), dans un pool de processus."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--force', action='store_true', help="Reprendre aussi les images déjà déclinées")
+
+    def handle(self, *args, **options):
+        rows = Product.objects.exclude(image='').exclude(image__isnull=True).values_list('pk', 'image', 'image_variants')
+        todo = [
+            (pk, name) for pk, name, variants in rows.iterator()
+            if options['force'] or (variants or {}).get('source') != name
+        ]
+        if not todo:
+            self.stdout.write("Aucune image à décliner")
+            return
+
+        # Une image partagée par plusieurs produits n'est rendue qu'une fois
+        products_by_image = {}
+        for pk, name in todo:
+            products_by_image.setdefault(name, []).append(pk)
+
+        done = skipped = failed = 0
+        # Les processus fils rendent les images sans toucher à la base ;
+        # les descriptions sont enregistrées ici, une par produit
+        for name, result in self.render(list(products_by_image), options['workers']):
+            pks = products_by_image[name]
+            if isinstance(result, Exception):
+                failed += len(pks)
+                self.stderr.write(f"  {name} : {result}")
+                continue
+            for pk in pks:
+                if apply_variants(pk, result):
+                    done += 1
+                else:
+                    # Image remplacée pendant le rendu : la tâche du nouveau fichier s'en charge
+                    skipped += 1
+        message = f"{done} image(s) déclinée(s), {skipped} ignorée(s), {failed} en échec"
+        self.stdout.write(self.style.SUCCESS(message) if not failed else self.style.WARNING(message))
+
+    def render(self, names, workers):
+        """(nom, description ou exception) pour chaque image, dans l'ordre d'achèvement."""
+        if workers <= 1:
+            for name in names:
+                try:
+                    yield name, render_variants(name)
+                except Exception as exc:
+                    yield name, exc
+            return
+        # Une connexion ouverte ne doit pas être partagée avec les processus fils
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            futures = {pool.submit(render_variants, name): name for name in names}
+            for future in as_completed(futures):
+                try:
+                    yield futures[future], future.result()
+                except Exception as exc:
+                    yield futures[future], exc
@@ -0,0 +1,53 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bike_erp.xlsx import XLSXError
+from products.importer import ImportFileError, import_products
+
+
+class Command(BaseCommand):
+    help = (
+        "Importe un catalogue produits (CSV ou XLSX) : crée les nouvelles "
+        "références et met à jour les existantes, par paquets"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Fichier .csv ou .xlsx")
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Lignes par transaction")
+        parser.add_argument('--no-create-categories', action='store_true', help="Rejeter les lignes dont la catégorie n'existe pas")
+        parser.add_argument('--dry-run', action='store_true', help="Valider le fichier sans rien enregistrer")
+        parser.add_argument('--report', help="Écrire les lignes rejetées dans ce fichier CSV")
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size doit être positif")
+        started = time.monotonic()
+        try:
+            with open(options['path'], 'rb') as source:
+                report = import_products(
+                    source, options['path'],
+                    chunk_size=options['chunk_size'],
+                    create_categories=not options['no_create_categories'],
+                    dry_run=options['dry_run'],
+                )
+        except (OSError, ImportFileError, XLSXError) as e:
+            raise CommandError(str(e))
+
+        for error in report.errors[:20]:
+            self.stdout.write(f"  ligne {error['line']} ({error['reference'] or '?'}) : {' ; '.join(error['errors'])}")
+        if report.skipped > 20:
+            self.stdout.write(f"  ... et {report.skipped - 20} autres lignes rejetées")
+        if options['report']:
+            with open(options['report'], 'w', newline='', encoding='utf-8') as output:
+                writer = csv.writer(output, delimiter=';')
+                writer.writerow(['Ligne', 'Référence', 'Erreurs'])
+                for error in report.errors:
+                    writer.writerow([error['line'], error['reference'], ' ; '.join(error['errors'])])
+
+        prefix = "[simulation] " if options['dry_run'] else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}{report.rows} lignes : {report.created} créées, {report.updated} mises à jour, "
+            f"{report.skipped} rejetées ({time.monotonic() - started:.1f} s)"
+        ))
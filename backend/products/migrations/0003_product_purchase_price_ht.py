@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_product_size'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='purchase_price_ht',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name="Prix d'achat HT"),
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:20
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Recherche plein texte PostgreSQL : tsvector maintenu par trigger + pg_trgm.
+# L'équivalent SQLite (FTS5) est installé après chaque migrate par
+# products.search.ensure_sqlite_fts. Voir products/search.py.
+
+SEARCHED_COLUMNS = 'reference, barcode, name, brand'
+
+POSTGRES_SETUP = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    CREATE OR REPLACE FUNCTION products_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('simple', coalesce(NEW.reference, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(NEW.barcode, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(NEW.name, '')), 'B') ||
+            setweight(to_tsvector('simple', coalesce(NEW.brand, '')), 'C');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    f"""
+    CREATE TRIGGER products_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF {SEARCHED_COLUMNS} ON products
+    FOR EACH ROW EXECUTE FUNCTION products_search_vector_update()
+    """,
+    # Déclenche le trigger sur les lignes existantes
+    "UPDATE products SET name = name",
+    "CREATE INDEX products_search_vector_gin ON products USING gin (search_vector)",
+    "CREATE INDEX products_name_trgm ON products USING gin (name gin_trgm_ops)",
+    "CREATE INDEX products_reference_trgm ON products USING gin (reference gin_trgm_ops)",
+]
+
+POSTGRES_TEARDOWN = [
+    "DROP INDEX IF EXISTS products_reference_trgm",
+    "DROP INDEX IF EXISTS products_name_trgm",
+    "DROP INDEX IF EXISTS products_search_vector_gin",
+    "DROP TRIGGER IF EXISTS products_search_vector_trigger ON products",
+    "DROP FUNCTION IF EXISTS products_search_vector_update()",
+]
+
+def _run(schema_editor, statements):
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def install_search(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        _run(schema_editor, POSTGRES_SETUP)
+
+
+def uninstall_search(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        _run(schema_editor, POSTGRES_TEARDOWN)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_product_purchase_price_ht'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(install_search, uninstall_search),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:37
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_products_created_id_index'),
+        # Les compteurs sont recopiés dans StoreStock avant suppression
+        ('inventory', '0003_store_storestock'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='product',
+            name='stock_garches',
+        ),
+        migrations.RemoveField(
+            model_name='product',
+            name='stock_ville_avray',
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:52
+
+from django.db import migrations, models
+from django.db.models import IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def compute_total_stock(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    StoreStock = apps.get_model('inventory', 'StoreStock')
+    totals = (
+        StoreStock.objects.filter(product=OuterRef('pk'))
+        .order_by().values('product')
+        .annotate(total=Sum('quantity')).values('total')
+    )
+    Product.objects.update(total_stock=Coalesce(Subquery(totals, output_field=IntegerField()), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_move_stock_to_store_stock'),
+        ('inventory', '0003_store_storestock'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='total_stock',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(compute_total_stock, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True), ('total_stock__lte', models.F('alert_stock'))), fields=['category', 'name'], name='products_low_stock_idx'),
+        ),
+    ]
@@ -1,9 +1,11 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         db_table = 'categories'
@@ -20,12 +22,6 @@ class Product(models.Model):
         ('service', 'Service'),
     ]
     
-    STORE_CHOICES = [
-        ('ville_avray', 'Ville d\'Avray'),
-        ('garches', 'Garches'),
-        ('both', 'Les deux magasins'),
-    ]
-    
     reference = models.CharField(max_length=50, unique=True)
     name = models.CharField(max_length=200)
     description = models.TextField(blank=True)
@@ -35,13 +31,18 @@ class Product(models.Model):
     price_ht = models.DecimalField(max_digits=10, decimal_places=2)
     price_ttc = models.DecimalField(max_digits=10, decimal_places=2)
     tva_rate = models.DecimalField(max_digits=5, decimal_places=2, default=20.00)
+    purchase_price_ht = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, verbose_name="Prix d'achat HT")
     
-    stock_ville_avray = models.IntegerField(default=0)
-    stock_garches = models.IntegerField(default=0)
+    # Stock par magasin : inventory.StoreStock (related_name store_stocks).
+    # total_stock en est la somme, tenue à jour par inventory.ledger dans la
+    # même transaction que les compteurs par magasin.
+    total_stock = models.IntegerField(default=0, editable=False)
     alert_stock = models.IntegerField(default=5)
     
     barcode = models.CharField(max_length=100, blank=True, unique=True, null=True)
     image = models.ImageField(upload_to='products/', blank=True, null=True)
+    # Déclinaisons WebP/JPEG de l'image (products/images.py)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     
     is_active = models.BooleanField(default=True)
     is_visible = models.BooleanField(default=True)
@@ -49,16 +50,25 @@ class Product(models.Model):
     brand = models.CharField(max_length=100, blank=True)
     weight = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True)
     
+    # Maintenu par un trigger PostgreSQL (migration 0004_product_search)
+    search_vector = SearchVectorField(null=True, editable=False)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         db_table = 'products'
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
         indexes = [
             models.Index(fields=['reference']),
             models.Index(fields=['barcode']),
             models.Index(fields=['name']),
+            models.Index(fields=['-created_at', '-id'], name='products_created_id_idx'),
+            # Réassort : seuls les produits actifs sous le seuil sont indexés
+            models.Index(
+                fields=['category', 'name'], name='products_low_stock_idx',
+                condition=models.Q(total_stock__lte=models.F('alert_stock'), is_active=True),
+            ),
         ]
 
     size = models.CharField(max_length=50, blank=True, null=True, verbose_name='Taille')
@@ -67,9 +77,22 @@ class Product(models.Model):
     def __str__(self):
         return f"{self.reference} - {self.name}"
     
-    @property
-    def total_stock(self):
-        return self.stock_ville_avray + self.stock_garches
+    def save(self, *args, **kwargs):
+        # total_stock n'est écrit que par des UPDATE relatifs (inventory.ledger) :
+        # enregistrer le produit ne doit pas écraser une vente concurrente ;
+        # de même pour les déclinaisons d'image, écrites par leur tâche
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in ('total_stock', 'image_variants')
+            ]
+        super().save(*args, **kwargs)
+    
+    def stock_in(self, store_code):
+        for stock in self.store_stocks.all():
+            if stock.store_id == store_code:
+                return stock.quantity
+        return 0
     
     @property
     def is_low_stock(self):
@@ -0,0 +1,164 @@
+"""
+Recherche produits classée par pertinence.
+
+- PostgreSQL : colonne search_vector (tsvector maintenu par trigger, index
+  GIN) pour le plein texte, et pg_trgm (index GIN gin_trgm_ops sur le nom et
+  la référence) pour tolérer les fautes de frappe.
+- SQLite : table virtuelle FTS5 products_fts synchronisée par triggers,
+  classée par bm25 (pas de tolérance aux fautes). SQLite reconstruit la
+  table products lors de certaines migrations, ce qui supprime ses
+  triggers : ensure_sqlite_fts() les recrée après chaque migrate.
+- Autres moteurs : repli sur des icontains.
+
+Les requêtes sont découpées en mots, chacun recherché en préfixe : « canyo
+endur » trouve « Canyon Endurace ». Les index et triggers PostgreSQL
+sont créés par la migration products.0004.
+"""
+
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db import connection
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.db.models.functions import Greatest
+from rest_framework.filters import BaseFilterBackend
+
+SEARCH_CONFIG = 'simple'
+# Nombre maximal de résultats classés par FTS5 avant pagination
+SQLITE_MAX_HITS = 1000
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(query):
+    return _TOKEN_RE.findall(query or '')[:8]
+
+
+def _postgres_search(queryset, query, tokens):
+    prefix_query = SearchQuery(
+        ' & '.join(f"{token}:*" for token in tokens),
+        config=SEARCH_CONFIG,
+        search_type='raw',
+    )
+    return (
+        queryset
+        .annotate(
+            search_rank=SearchRank(F('search_vector'), prefix_query),
+            similarity=Greatest(
+                TrigramSimilarity('name', query),
+                TrigramSimilarity('reference', query),
+            ),
+        )
+        .filter(
+            Q(search_vector=prefix_query)
+            | Q(name__trigram_similar=query)
+            | Q(reference__trigram_similar=query)
+            | Q(barcode=query)
+        )
+        .order_by('-search_rank', '-similarity', 'pk')
+    )
+
+
+def _sqlite_ranked_ids(tokens, limit):
+    match = ' '.join('"{}"*'.format(token.replace('"', '""')) for token in tokens)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT rowid FROM products_fts WHERE products_fts MATCH %s "
+            "ORDER BY bm25(products_fts, 10.0, 10.0, 5.0, 1.0) LIMIT %s",
+            [match, limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _sqlite_search(queryset, tokens, limit):
+    ids = _sqlite_ranked_ids(tokens, limit)
+    if not ids:
+        return queryset.none()
+    rank = Case(
+        *[When(pk=pk, then=Value(position)) for position, pk in enumerate(ids)],
+        output_field=IntegerField(),
+    )
+    return queryset.filter(pk__in=ids).annotate(search_rank=rank).order_by('search_rank')
+
+
+def _fallback_search(queryset, tokens):
+    for token in tokens:
+        queryset = queryset.filter(
+            Q(name__icontains=token) | Q(reference__icontains=token)
+            | Q(barcode__icontains=token) | Q(brand__icontains=token)
+        )
+    return queryset
+
+
+def search_products(queryset, query, limit=SQLITE_MAX_HITS):
+    """Filtre `queryset` sur `query` et le trie par pertinence décroissante."""
+    tokens = tokenize(query)
+    if not tokens:
+        return queryset
+    vendor = connection.vendor
+    if vendor == 'postgresql':
+        return _postgres_search(queryset, query.strip(), tokens)
+    if vendor == 'sqlite':
+        return _sqlite_search(queryset, tokens, limit)
+    return _fallback_search(queryset, tokens)
+
+
+class ProductSearchFilter(BaseFilterBackend):
+    """Remplace SearchFilter : même paramètre ?search=, résultats classés."""
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '')
+        return search_products(queryset, query)
+
+
+SEARCHED_COLUMNS = 'reference, barcode, name, brand'
+_FTS_NEW = 'new.reference, new.barcode, new.name, new.brand'
+_FTS_OLD = 'old.reference, old.barcode, old.name, old.brand'
+
+SQLITE_FTS_TABLE = f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        {SEARCHED_COLUMNS},
+        content='products', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+"""
+
+SQLITE_FTS_TRIGGERS = {
+    'products_fts_insert': f"""
+        CREATE TRIGGER products_fts_insert AFTER INSERT ON products BEGIN
+            INSERT INTO products_fts(rowid, {SEARCHED_COLUMNS}) VALUES (new.id, {_FTS_NEW});
+        END
+    """,
+    'products_fts_delete': f"""
+        CREATE TRIGGER products_fts_delete AFTER DELETE ON products BEGIN
+            INSERT INTO products_fts(products_fts, rowid, {SEARCHED_COLUMNS}) VALUES ('delete', old.id, {_FTS_OLD});
+        END
+    """,
+    'products_fts_update': f"""
+        CREATE TRIGGER products_fts_update AFTER UPDATE OF {SEARCHED_COLUMNS} ON products BEGIN
+            INSERT INTO products_fts(products_fts, rowid, {SEARCHED_COLUMNS}) VALUES ('delete', old.id, {_FTS_OLD});
+            INSERT INTO products_fts(rowid, {SEARCHED_COLUMNS}) VALUES (new.id, {_FTS_NEW});
+        END
+    """,
+}
+
+
+def ensure_sqlite_fts(using='default'):
+    """Crée l'index FTS5 et ses triggers s'ils manquent, puis le reconstruit."""
+    from django.db import connections
+    conn = connections[using]
+    if conn.vendor != 'sqlite':
+        return
+    if 'products' not in conn.introspection.table_names():
+        return
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'products'")
+        existing = {row[0] for row in cursor.fetchall()}
+        if existing.issuperset(SQLITE_FTS_TRIGGERS):
+            return
+        cursor.execute(SQLITE_FTS_TABLE)
+        for name, statement in SQLITE_FTS_TRIGGERS.items():
+            if name not in existing:
+                cursor.execute(statement)
+        cursor.execute("INSERT INTO products_fts(products_fts) VALUES ('rebuild')")
@@ -1,16 +1,112 @@
+from django.core.files.storage import default_storage
 from rest_framework import serializers
+from bike_erp.fieldsets import SparseFieldsetsMixin
+from inventory.ledger import stores
+from inventory.models import StoreStock
+from inventory.serializers import StoreCodeField
+from .images import srcset
 from .models import Product, Category
 
+STOCK_PREFIX = 'stock_'
 
-class CategorySerializer(serializers.ModelSerializer):
+
+class CategorySerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = '__all__'
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class StoreStockLevelSerializer(serializers.ModelSerializer):
+    store = StoreCodeField(read_only=True)
+    
+    class Meta:
+        model = StoreStock
+        fields = ['store', 'quantity', 'alert_level']
+
+
+class ImageVariantsField(serializers.Field):
+    """
+    Déclinaisons de l'image (products/images.py) : URL par taille, srcset
+    WebP et srcset JPEG de repli ; None tant qu'elles ne sont pas prêtes.
+    """
+    
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+    
+    def to_representation(self, variants):
+        preferred = variants.get('webp') or variants.get('jpeg')
+        if not preferred:
+            return None
+        request = self.context.get('request')
+        
+        def url(name):
+            # Sans requête (cache des codes-barres), URL relative
+            url = default_storage.url(name)
+            return request.build_absolute_uri(url) if request is not None else url
+        
+        data = {label: url(entry['name']) for label, entry in preferred.items()}
+        data['srcset'] = srcset(variants, 'webp', url)
+        data['fallback_srcset'] = srcset(variants, 'jpeg', url)
+        return data
+
+
+class ProductSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     category_name = serializers.CharField(source='category.name', read_only=True)
+    stocks = StoreStockLevelSerializer(source='store_stocks', many=True, read_only=True)
+    images = ImageVariantsField(source='image_variants')
     
     class Meta:
         model = Product
-        fields = '__all__'
+        exclude = ['search_vector', 'image_variants']
+    
+    def derived_fields(self):
+        return {STOCK_PREFIX + code: 'stocks' for code in stores()}
+    
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Compatibilité : un champ stock_<magasin> par magasin, comme avant
+        # le passage à StoreStock
+        fieldset = self.fieldset
+        keys = {
+            code: STOCK_PREFIX + code for code in stores()
+            if fieldset is None or fieldset.wants(STOCK_PREFIX + code)
+        }
+        if keys:
+            for key in keys.values():
+                data[key] = 0
+            for level in instance.store_stocks.all():
+                if level.store_id in keys:
+                    data[keys[level.store_id]] = level.quantity
+        return data
+    
+    def to_internal_value(self, data):
+        """
+        Les champs stock_<magasin> saisis dans le formulaire deviennent
+        validated_data['stock_levels'] = {code magasin: quantité}, appliqué
+        par la vue sous forme d'ajustements (inventory.ledger.set_stock_levels).
+        """
+        validated_data = super().to_internal_value(data)
+        known = stores()
+        levels = {}
+        errors = {}
+        for key in data:
+            if not key.startswith(STOCK_PREFIX) or key[len(STOCK_PREFIX):] not in known:
+                continue
+            try:
+                levels[key[len(STOCK_PREFIX):]] = int(data[key])
+            except (TypeError, ValueError):
+                errors[key] = 'Un nombre entier est requis.'
+        if errors:
+            raise serializers.ValidationError(errors)
+        validated_data['stock_levels'] = levels
+        return validated_data
+
+
+class LowStockSerializer(serializers.ModelSerializer):
+    category_name = serializers.CharField(source='category.name', read_only=True, default=None)
+    stocks = StoreStockLevelSerializer(source='store_stocks', many=True, read_only=True)
+    
+    class Meta:
+        model = Product
+        fields = ['id', 'reference', 'name', 'category', 'category_name', 'total_stock', 'alert_stock', 'stocks']
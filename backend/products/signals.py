@@ -0,0 +1,29 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from bike_erp.conditional import mark_changed
+from .barcode_cache import barcode_cache
+from .images import needs_variants, schedule_variants
+from .models import Category, Product
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_barcode_cache(sender, instance, **kwargs):
+    barcode_cache.invalidate_on_commit([instance])
+
+
+@receiver(post_save, sender=Product)
+def render_image_variants(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and 'image' not in update_fields:
+        return
+    if needs_variants(instance):
+        schedule_variants(instance)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def mark_catalog_changed(sender, **kwargs):
+    mark_changed(sender)
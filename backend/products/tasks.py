@@ -0,0 +1,17 @@
+from celery import shared_task
+from PIL import UnidentifiedImageError
+
+from .images import build_variants, logger
+
+
+@shared_task(bind=True, ignore_result=True, max_retries=3, default_retry_delay=10)
+def render_image_variants(self, product_id):
+    """Produit les déclinaisons WebP/JPEG de l'image d'un produit."""
+    try:
+        return build_variants(product_id)
+    except UnidentifiedImageError:
+        # Fichier illisible : inutile de réessayer
+        logger.warning("Image illisible pour le produit %s", product_id)
+        return False
+    except OSError as exc:
+        raise self.retry(exc=exc)
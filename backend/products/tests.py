@@ -0,0 +1,222 @@
+import io
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from bike_erp import xlsx
+from bike_erp.query_budget_cases import QueryBudgetCases
+from inventory.models import StockMovement, StoreStock
+from .importer import import_products
+from .models import Category, Product
+from .search import search_products
+from .views import SUGGEST_FIELDS
+
+
+class FieldsetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username='vendeur', email='vendeur@example.com', password='vendeur')
+        category = Category.objects.create(name='Vélos')
+        Product.objects.create(
+            reference='VTT-1', name='VTT Rockrider', category=category, barcode='3700000000017',
+            price_ht=Decimal('200.00'), price_ttc=Decimal('240.00'),
+        )
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def test_unknown_fields_rejected(self):
+        response = self.api.get('/api/products/?fields=id,nonexistent,autre')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('autre, nonexistent', str(response.data['fields']))
+        response = self.api.get('/api/products/?compact=1&omit=stocks')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('stocks', str(response.data['omit']))
+
+    def test_known_fields_accepted(self):
+        response = self.api.get('/api/products/?fields=id,name,stock_garches')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data['results'][0]), {'id', 'name', 'stock_garches'})
+
+    def test_decimals_have_the_same_type_in_every_mode(self):
+        full = self.api.get('/api/products/').data['results'][0]
+        compact = self.api.get('/api/products/?compact=1').data['results'][0]
+        suggest = self.api.get('/api/products/suggest/?q=rockrider').data[0]
+        for row in (full, compact, suggest):
+            with self.subTest(row=row):
+                self.assertEqual(row['price_ttc'], '240.00')
+                self.assertEqual(row['tva_rate'], full['tva_rate'])
+
+
+class ProductSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username='vendeur', email='vendeur@example.com', password='vendeur')
+        category = Category.objects.create(name='Vélos')
+        products = {
+            # « route » dans la référence, le nom, puis la marque seulement
+            'reference': ('ROUTE-1', 'Vélo Triban', 'Btwin'),
+            'name': ('PNEU-1', 'Pneu route', 'Michelin'),
+            'brand': ('CASQUE-1', 'Casque', 'Route66'),
+            'accent': ('VILLE-1', 'Velo de ville Elops', 'Btwin'),
+        }
+        cls.products = {
+            key: Product.objects.create(
+                reference=reference, name=name, brand=brand, category=category,
+                price_ht=Decimal('100.00'), price_ttc=Decimal('120.00'),
+            )
+            for key, (reference, name, brand) in products.items()
+        }
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def search(self, query):
+        return list(search_products(Product.objects.all(), query).values_list('reference', flat=True))
+
+    def test_ranked_by_column_weight(self):
+        self.assertEqual(self.search('route'), ['ROUTE-1', 'PNEU-1', 'CASQUE-1'])
+
+    def test_prefix_and_accents(self):
+        self.assertEqual(self.search('vel'), ['ROUTE-1', 'VILLE-1'])
+        self.assertEqual(self.search('Vélo'), ['ROUTE-1', 'VILLE-1'])
+        self.assertEqual(self.search('vel vil'), ['VILLE-1'])
+
+    def test_quotes_in_query(self):
+        self.assertEqual(self.search('a"b'), [])
+        self.assertEqual(self.search('"pneu'), ['PNEU-1'])
+        response = self.api.get('/api/products/', {'search': 'a"b'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [])
+
+    def test_index_follows_rename(self):
+        product = self.products['accent']
+        product.name = 'Remorque enfant'
+        product.save()
+        self.assertEqual(self.search('elops'), [])
+        self.assertEqual(self.search('remorque'), ['VILLE-1'])
+
+    def test_suggest(self):
+        response = self.api.get('/api/products/suggest/', {'q': 'route', 'limit': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['reference'] for row in response.data], ['ROUTE-1', 'PNEU-1'])
+        for row in response.data:
+            self.assertEqual(set(row), set(SUGGEST_FIELDS))
+            self.assertEqual(row['price_ttc'], '120.00')
+        self.assertEqual(self.api.get('/api/products/suggest/', {'q': 'r'}).data, [])
+        self.assertEqual(self.api.get('/api/products/suggest/', {'q': 'route', 'limit': 'x'}).status_code, 400)
+
+
+class ProductImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Vélos')
+        cls.existing = Product.objects.create(
+            reference='EXIST-1', name='Vélo existant', category=category, barcode='3700000000024',
+            price_ht=Decimal('100.00'), price_ttc=Decimal('120.00'),
+        )
+
+    def import_csv(self, text, **options):
+        return import_products(io.BytesIO(text.encode('utf-8')), 'catalogue.csv', **options)
+
+    def errors(self, report):
+        return {error['line']: ' | '.join(error['errors']) for error in report.errors}
+
+    def test_aliases_and_semicolons(self):
+        report = self.import_csv(
+            "Référence;Désignation;Prix HT;TVA;Catégorie;EAN\n"
+            "NEW-1;Casque;10,50;5,5;Vélos;3700000000031\n"
+            "EXIST-1;Vélo renommé;150;;;\n"
+        )
+        self.assertEqual((report.created, report.updated, report.errors), (1, 1, []))
+        product = Product.objects.get(reference='NEW-1')
+        self.assertEqual((product.name, product.price_ht, product.tva_rate), ('Casque', Decimal('10.50'), Decimal('5.50')))
+        self.assertEqual(product.price_ttc, Decimal('11.08'))
+        self.assertEqual(product.category.name, 'Vélos')
+        self.assertEqual(product.barcode, '3700000000031')
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.name, 'Vélo renommé')
+        self.assertIsNone(self.existing.category)
+
+    def test_commas(self):
+        report = self.import_csv('reference,name,price_ht\nNEW-1,"Pneu, route",12.00\n')
+        self.assertEqual((report.created, report.errors), (1, []))
+        self.assertEqual(Product.objects.get(reference='NEW-1').name, 'Pneu, route')
+
+    def test_duplicates_rejected(self):
+        report = self.import_csv(
+            "reference,name,price_ht,barcode\n"
+            "NEW-1,Pneu,10,3700000000048\n"
+            "NEW-1,Pneu bis,10,\n"
+            "NEW-2,Chambre à air,5,3700000000048\n"
+            "NEW-3,Selle,20,3700000000024\n"
+        )
+        self.assertEqual(report.created, 1)
+        errors = self.errors(report)
+        self.assertIn('reference : déjà présente ligne 2', errors[3])
+        self.assertIn('barcode : déjà présent ligne 2', errors[4])
+        self.assertIn('barcode : déjà utilisé par EXIST-1', errors[5])
+        self.assertFalse(Product.objects.filter(reference__in=['NEW-2', 'NEW-3']).exists())
+
+    def test_missing_category(self):
+        text = "reference,name,price_ht,category\nNEW-1,Antivol,30,Accessoires\n"
+        report = self.import_csv(text, create_categories=False)
+        self.assertIn('catégorie inconnue « Accessoires »', self.errors(report)[2])
+        self.assertFalse(Product.objects.filter(reference='NEW-1').exists())
+
+        report = self.import_csv(text)
+        self.assertEqual((report.created, report.errors), (1, []))
+        self.assertEqual(Product.objects.get(reference='NEW-1').category.name, 'Accessoires')
+
+    def test_dry_run_writes_nothing(self):
+        report = self.import_csv(
+            "reference,name,price_ht,category,stock_garches\n"
+            "NEW-1,Antivol,30,Accessoires,4\n"
+            "EXIST-1,Vélo renommé,150,,\n",
+            dry_run=True,
+        )
+        self.assertEqual((report.created, report.updated, report.errors), (1, 1, []))
+        self.assertFalse(Product.objects.filter(reference='NEW-1').exists())
+        self.assertFalse(Category.objects.filter(name='Accessoires').exists())
+        self.assertFalse(StockMovement.objects.exists())
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.name, 'Vélo existant')
+
+    def test_stock_columns_become_adjustments(self):
+        StoreStock.objects.create(product=self.existing, store_id='garches', quantity=3)
+        rows = [
+            ['reference', 'name', 'price_ht', 'stock_garches', 'stock_ville_avray'],
+            ['EXIST-1', 'Vélo existant', 100, 5, None],
+            ['NEW-1', 'Antivol', 30, 2, 1],
+        ]
+        report = import_products(io.BytesIO(b''.join(xlsx.stream_xlsx(rows))), 'catalogue.xlsx')
+        self.assertEqual((report.created, report.updated, report.errors), (1, 1, []))
+        movements = StockMovement.objects.order_by('product__reference', 'store_id').values_list(
+            'product__reference', 'store_id', 'kind', 'quantity',
+        )
+        self.assertEqual(list(movements), [
+            ('EXIST-1', 'garches', 'adjustment', 2),
+            ('NEW-1', 'garches', 'adjustment', 2),
+            ('NEW-1', 'ville_avray', 'adjustment', 1),
+        ])
+        # Cellule vide : stock inchangé
+        self.assertFalse(StoreStock.objects.filter(product=self.existing, store_id='ville_avray').exclude(quantity=0).exists())
+
+
+class ProductQueryBudgetTests(QueryBudgetCases, TestCase):
+    endpoints = [
+        ('products-list', 'get', '/api/products/'),
+        ('products-list-fields', 'get', '/api/products/?fields=id,name,reference,price_ttc,stock_garches'),
+        ('products-list-compact', 'get', '/api/products/?compact=1'),
+        ('products-retrieve', 'get', '/api/products/{product}/'),
+        ('products-barcode', 'get', '/api/products/barcode/?code={barcode}'),
+        ('products-barcode-lookup', 'get', '/api/products/barcode/{barcode}/'),
+        ('products-barcode-batch', 'post', '/api/products/barcode/batch/', 'barcodes'),
+        ('products-changes', 'get', '/api/products/changes/'),
+        ('categories-list', 'get', '/api/products/categories/'),
+        ('products-low-stock', 'get', '/api/products/low-stock/'),
+    ]
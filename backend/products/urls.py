@@ -3,8 +3,9 @@ from rest_framework.routers import DefaultRouter
 from . import views
 
 router = DefaultRouter()
-router.register(r'', views.ProductViewSet, basename='product')
+# categories/ avant le préfixe vide, sinon capturé comme /<pk>/ d'un produit
 router.register(r'categories', views.CategoryViewSet, basename='category')
+router.register(r'', views.ProductViewSet, basename='product')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -1,30 +1,272 @@
-from rest_framework import viewsets, filters
+
+from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django_filters.rest_framework import DjangoFilterBackend
+from bike_erp.conditional import ConditionalListMixin
+from bike_erp.delivery import deliver
+from bike_erp.fieldsets import SparseFieldsetsViewMixin, render_decimals
+from bike_erp.query_budget import QueryBudgetMixin
+from bike_erp.xlsx import XLSXError
+from inventory.ledger import StockError, check_store, set_stock_levels, stores
+from inventory.models import Store, StoreStock
+from sync.views import ChangesMixin
+from .barcode_cache import MISSING, barcode_cache, is_missing
+from .images import PRODUCT_IMAGES_DIR, VARIANTS_DIR
+from .importer import ImportFileError, import_products
 from .models import Product, Category
-from .serializers import ProductSerializer, CategorySerializer
+from .search import ProductSearchFilter, search_products
+from .serializers import STOCK_PREFIX, CategorySerializer, LowStockSerializer, ProductSerializer
+
+# Champs renvoyés par l'autocomplétion : de quoi afficher et ajouter au panier
+SUGGEST_FIELDS = [
+    'id', 'reference', 'name', 'barcode', 'price_ht', 'price_ttc', 'tva_rate',
+    'total_stock',
+]
+SUGGEST_DEFAULT_LIMIT = 8
+SUGGEST_MAX_LIMIT = 25
+BARCODE_BATCH_MAX = 200
+# Déclinaisons d'image : le nom change avec le contenu
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Originaux : remplaçables sous le même nom
+IMAGE_CACHE_CONTROL = 'public, max-age=86400'
 
 
-class ProductViewSet(viewsets.ModelViewSet):
-    queryset = Product.objects.all()
+class ProductViewSet(QueryBudgetMixin, ConditionalListMixin, SparseFieldsetsViewMixin, ChangesMixin,
+                     viewsets.ModelViewSet):
+    queryset = Product.objects.select_related('category').prefetch_related('store_stocks')
     serializer_class = ProductSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, ProductSearchFilter, filters.OrderingFilter]
     filterset_fields = ['category', 'product_type', 'is_active', 'is_visible']
-    search_fields = ['name', 'reference', 'barcode', 'brand']
-    ordering_fields = ['created_at', 'name', 'price_ttc']
+    ordering_fields = ['created_at', 'name', 'price_ttc', 'total_stock']
+    # Lus par la représentation : nom de catégorie, stocks et liste des magasins
+    conditional_dependencies = (Category, StoreStock, Store)
+    fieldset_actions = ('list', 'retrieve', 'changes')
+    # ?compact=1 : grille de caisse, sans description, image ni dates
+    compact_fields = [
+        'id', 'reference', 'name', 'barcode', 'category', 'price_ht', 'price_ttc',
+        'tva_rate', 'total_stock', 'alert_stock', 'is_active',
+    ]
+    compact_annotations = {'category_name': F('category__name')}
+    query_budgets = {
+        'list': 4,
+        'low_stock': 5,
+        'changes': 4,
+        'retrieve': 2,
+        'barcode': 2,
+        'suggest': 2,
+        'barcode_lookup': 2,
+        'barcode_batch': 2,
+    }
+    
+    def get_compact_annotations(self):
+        annotations = super().get_compact_annotations()
+        for code in stores():
+            annotations[STOCK_PREFIX + code] = Coalesce(Subquery(
+                StoreStock.objects.filter(product=OuterRef('pk'), store_id=code).values('quantity')[:1]
+            ), 0)
+        return annotations
+    
+    # Le stock saisi dans le formulaire produit devient un ajustement du
+    # journal (inventory.ledger) plutôt qu'une écriture directe des compteurs
+    def perform_create(self, serializer):
+        self._save_with_stock(serializer, 'Création produit')
+    
+    def perform_update(self, serializer):
+        self._save_with_stock(serializer, 'Modification produit')
+    
+    def _save_with_stock(self, serializer, reference):
+        with transaction.atomic():
+            levels = serializer.validated_data.pop('stock_levels', {})
+            product = serializer.save()
+            if set_stock_levels([(product, levels)], user=self.request.user, reference=reference):
+                product.refresh_from_db(fields=['total_stock', 'updated_at'])
+        # Stocks préchargés par get_object() : périmés après l'ajustement
+        getattr(product, '_prefetched_objects_cache', {}).pop('store_stocks', None)
     
     @action(detail=False, methods=['get'])
     def barcode(self, request):
         barcode = request.query_params.get('code')
         try:
-            product = Product.objects.get(barcode=barcode)
+            product = self.get_queryset().get(barcode=barcode)
             serializer = self.get_serializer(product)
             return Response(serializer.data)
         except Product.DoesNotExist:
             return Response({'error': 'Product not found'}, status=404)
+    
+    def resolve_barcodes(self, codes):
+        """
+        Résout des codes-barres via le cache, puis en une requête pour le reste.
+        
+        Retourne {code: produit sérialisé ou None}.
+        """
+        unique_codes = list(dict.fromkeys(codes))
+        payloads = barcode_cache.get_many(unique_codes)
+        misses = [code for code in unique_codes if code not in payloads]
+        if misses:
+            products = self.get_queryset().filter(barcode__in=misses)
+            fetched = {
+                product.barcode: data
+                for product, data in zip(products, ProductSerializer(products, many=True).data)
+            }
+            # Sérialisé sans requête : les URLs d'image restent relatives en cache
+            fetched.update({code: MISSING for code in misses if code not in fetched})
+            barcode_cache.set_many(fetched)
+            payloads.update(fetched)
+        
+        resolved = {}
+        for code in unique_codes:
+            payload = payloads[code]
+            if is_missing(payload):
+                resolved[code] = None
+            else:
+                resolved[code] = self._absolute_image(dict(payload))
+        return resolved
+    
+    def _absolute_image(self, payload):
+        if payload.get('image'):
+            payload['image'] = self.request.build_absolute_uri(payload['image'])
+        if payload.get('images'):
+            payload['images'] = {
+                key: value and self._absolute_srcset(value) for key, value in payload['images'].items()
+            }
+        return payload
+    
+    def _absolute_srcset(self, value):
+        # Une URL, ou un srcset 'url 160w, url 480w'
+        return ', '.join(
+            ' '.join([self.request.build_absolute_uri(url), *descriptor])
+            for url, *descriptor in (entry.split(' ') for entry in value.split(', '))
+        )
+    
+    @action(detail=False, methods=['get'], url_path=r'barcode/(?P<code>[^/]+)')
+    def barcode_lookup(self, request, code=None):
+        product = self.resolve_barcodes([code])[code]
+        if product is None:
+            return Response({'error': 'Product not found'}, status=404)
+        return Response(product)
+    
+    @action(detail=False, methods=['post'], url_path='barcode/batch')
+    def barcode_batch(self, request):
+        """Résout les scans mis en mémoire par une douchette : {"codes": [...]}."""
+        codes = request.data.get('codes')
+        if not isinstance(codes, list) or not all(isinstance(code, str) for code in codes):
+            return Response({'error': 'codes doit être une liste de chaînes'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(codes) > BARCODE_BATCH_MAX:
+            return Response({'error': f'{BARCODE_BATCH_MAX} codes maximum'}, status=status.HTTP_400_BAD_REQUEST)
+        resolved = self.resolve_barcodes(codes)
+        return Response({
+            'results': [{'code': code, 'product': resolved[code]} for code in codes],
+            'missing': [code for code in dict.fromkeys(codes) if resolved[code] is None],
+        })
+    
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def import_catalog(self, request):
+        """
+        Import d'un catalogue fournisseur (champ `file`, CSV ou XLSX).
+        
+        ?dry_run=1 valide le fichier sans rien enregistrer ; la réponse est le
+        rapport ligne par ligne de products/importer.py.
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'Fichier manquant (champ file)'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            report = import_products(
+                upload.file, upload.name,
+                dry_run=request.query_params.get('dry_run') in ('1', 'true'),
+            )
+        except (ImportFileError, XLSXError) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report.as_dict())
+    
+    @action(detail=False, methods=['get'], url_path='low-stock')
+    def low_stock(self, request):
+        """
+        Produits à réassortir, regroupés par catégorie et triés par nom.
+        
+        Sans ?store : produits actifs dont le stock total est sous le seuil
+        (index partiel products_low_stock_idx). Avec ?store=<code> : produits
+        sous le seuil d'alerte de ce magasin (store_stock_low_idx). ?category=
+        restreint à une catégorie. La page est accompagnée du nombre d'alertes
+        par catégorie et par magasin.
+        """
+        params = request.query_params
+        queryset = Product.objects.filter(is_active=True)
+        store = params.get('store')
+        if store:
+            try:
+                check_store(store)
+            except StockError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            queryset = queryset.filter(
+                store_stocks__store_id=store,
+                store_stocks__quantity__lte=F('store_stocks__alert_level'),
+            )
+        else:
+            queryset = queryset.filter(total_stock__lte=F('alert_stock'))
+        if params.get('category'):
+            queryset = queryset.filter(category_id=params['category'])
+        
+        by_category = list(
+            queryset.values('category', 'category__name')
+            .annotate(count=Count('id'))
+            .order_by('category__name')
+        )
+        by_store = list(
+            StoreStock.objects.filter(quantity__lte=F('alert_level'), product__is_active=True)
+            .values('store').annotate(count=Count('id')).order_by('store')
+        )
+        page = self.paginate_queryset(
+            queryset.select_related('category').prefetch_related('store_stocks')
+            .order_by('category_id', 'name', 'pk')
+        )
+        response = self.get_paginated_response(LowStockSerializer(page, many=True).data)
+        response.data['categories'] = [
+            {'category': row['category'], 'name': row['category__name'], 'count': row['count']}
+            for row in by_category
+        ]
+        response.data['stores'] = by_store
+        return response
+    
+    @action(detail=False, methods=['get'])
+    def suggest(self, request):
+        """Autocomplétion : les N meilleurs produits actifs, sans sérialiseur."""
+        query = request.query_params.get('q', '').strip()
+        try:
+            limit = int(request.query_params.get('limit', SUGGEST_DEFAULT_LIMIT))
+        except ValueError:
+            return Response({'error': 'limit invalide'}, status=status.HTTP_400_BAD_REQUEST)
+        limit = min(max(limit, 1), SUGGEST_MAX_LIMIT)
+        if len(query) < 2:
+            return Response([])
+        
+        # Marge pour les produits inactifs écartés après le classement SQLite
+        queryset = search_products(Product.objects.filter(is_active=True), query, limit=limit * 4)
+        results = list(
+            queryset
+            .values(*SUGGEST_FIELDS)[:limit]
+        )
+        return Response(render_decimals(Product, results))
 
 
-class CategoryViewSet(viewsets.ModelViewSet):
-    queryset = Category.objects.all()
+class CategoryViewSet(QueryBudgetMixin, ConditionalListMixin, SparseFieldsetsViewMixin, viewsets.ModelViewSet):
+    queryset = Category.objects.order_by('name')
     serializer_class = CategorySerializer
+    query_budgets = {
+        'list': 3,
+    }
+
+
+def image_variant(request, path):
+    """Déclinaison d'image produit, servie avec un cache immuable."""
+    return deliver(request, f'{VARIANTS_DIR}/{path}', as_attachment=False, cache_control=IMMUTABLE_CACHE_CONTROL)
+
+
+def product_image(request, path):
+    """Image produit d'origine (publique, comme le catalogue), y compris hors DEBUG."""
+    return deliver(request, f'{PRODUCT_IMAGES_DIR}/{path}', as_attachment=False, cache_control=IMAGE_CACHE_CONTROL)
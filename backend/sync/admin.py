@@ -0,0 +1,29 @@
+from django.contrib import admin
+from .models import ChangeLog, SyncCounter
+
+
+@admin.register(ChangeLog)
+class ChangeLogAdmin(admin.ModelAdmin):
+    list_display = ['model', 'object_id', 'version', 'deleted', 'changed_at']
+    list_filter = ['model', 'deleted']
+    
+    # Journal tenu par sync/log.py : le modifier désynchroniserait les caisses
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(SyncCounter)
+class SyncCounterAdmin(admin.ModelAdmin):
+    list_display = ['name', 'value']
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+    
+    def has_add_permission(self, request):
+        return False
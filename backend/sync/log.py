@@ -0,0 +1,163 @@
+"""
+Journal des modifications pour la synchronisation différentielle des caisses.
+
+Chaque écriture d'un objet synchronisé (produits, clients) inscrit dans
+ChangeLog, dans sa transaction, une ligne par objet sans version (en
+attente) : seules les lignes des objets modifiés sont verrouillées, deux
+ventes dans deux magasins ne s'attendent pas.
+
+Après le commit, assign_versions() donne aux lignes en attente une version
+tirée du compteur global SyncCounter('version'), dans une courte transaction
+à part. Le compteur y est incrémenté par un UPDATE relatif qui verrouille sa
+ligne jusqu'au commit de cette transaction : les versions deviennent
+visibles dans l'ordre où elles sont attribuées, et un terminal qui a lu
+jusqu'à la version N ne peut plus voir apparaître une version inférieure ou
+égale à N. Le verrou du compteur n'est jamais pris dans la transaction d'une
+écriture, donc jamais avec ceux des commandes, factures ou stocks. Des
+lignes restées en attente (processus interrompu après le commit) reçoivent
+leur version à la modification suivante, quel qu'en soit l'objet.
+
+Le callback de numérotation est inscrit une seule fois par transaction, quel
+que soit le nombre d'écritures (schedule_assign_versions).
+
+Un objet n'a qu'une ligne, mise à jour à chaque modification ; une
+suppression la marque deleted (pierre tombale). La commande prune_sync_log
+purge les vieilles pierres tombales et relève SyncCounter('pruned') : un
+terminal resté hors ligne plus longtemps doit repartir de zéro.
+"""
+
+from django.db import transaction
+from django.db.models import F, Q
+
+from .models import ChangeLog, SyncCounter
+
+VERSION = 'version'
+PRUNED = 'pruned'
+# Attribut de la connexion : callback de numérotation inscrit et pas encore exécuté
+PENDING_CALLBACK = 'sync_assign_versions'
+
+
+class StaleToken(Exception):
+    """Jeton antérieur à la dernière purge : resynchronisation complète nécessaire."""
+
+
+def label(model):
+    return model._meta.label_lower
+
+
+def _increment(name):
+    """Incrémente le compteur et retourne sa valeur, ou None s'il n'existe pas."""
+    connection = transaction.get_connection()
+    if connection.features.can_return_columns_from_insert:
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {quote(SyncCounter._meta.db_table)} SET {quote('value')} = {quote('value')} + 1 "
+                f"WHERE {quote('name')} = %s RETURNING {quote('value')}",
+                [name],
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
+    counter = SyncCounter.objects.filter(name=name)
+    if counter.update(value=F('value') + 1):
+        return counter.values_list('value', flat=True).get()
+    return None
+
+
+def next_version():
+    value = _increment(VERSION)
+    if value is None:
+        SyncCounter.objects.bulk_create([SyncCounter(name=VERSION)], ignore_conflicts=True)
+        value = _increment(VERSION)
+    return value
+
+
+def assign_versions():
+    """Numérote les modifications validées encore en attente ; retourne la version."""
+    with transaction.atomic():
+        # Lignes d'une transaction en cours ignorées : numérotées à son commit
+        pending = list(
+            ChangeLog.objects.select_for_update(skip_locked=True)
+            .filter(version__isnull=True).values_list('pk', flat=True)
+        )
+        if not pending:
+            return None
+        version = next_version()
+        ChangeLog.objects.filter(pk__in=pending).update(version=version)
+    return version
+
+
+def record_changes(model, pks, deleted=False):
+    """Inscrit la modification (ou la suppression) des objets `pks` de `model`."""
+    # Ordre fixe des verrous de lignes entre deux transactions concurrentes
+    pks = sorted(set(pks))
+    if not pks:
+        return
+    with transaction.atomic(savepoint=False):
+        ChangeLog.objects.bulk_create(
+            [ChangeLog(model=label(model), object_id=pk, version=None, deleted=deleted) for pk in pks],
+            update_conflicts=True,
+            unique_fields=['model', 'object_id'],
+            update_fields=['version', 'deleted', 'changed_at'],
+        )
+        schedule_assign_versions()
+
+
+def schedule_assign_versions():
+    """Inscrit assign_versions() au commit de la transaction courante, une fois."""
+    connection = transaction.get_connection()
+    pending = getattr(connection, PENDING_CALLBACK, None)
+    # Un rollback (de la transaction ou du savepoint qui l'a inscrit) retire le
+    # callback sans l'exécuter : l'attribut ne compte que s'il est encore inscrit
+    if pending is not None and any(func is pending for _, func, _ in connection.run_on_commit):
+        return
+
+    def callback():
+        setattr(connection, PENDING_CALLBACK, None)
+        assign_versions()
+
+    setattr(connection, PENDING_CALLBACK, callback)
+    # Un échec est journalisé sans faire échouer l'écriture déjà validée :
+    # les lignes restent en attente jusqu'à la modification suivante
+    transaction.on_commit(callback, robust=True)
+
+
+def encode_token(version, object_id=None):
+    return str(version) if object_id is None else f'{version}.{object_id}'
+
+
+def decode_token(token):
+    """'12' ou '12.345' -> (version, object_id) ; ValueError si illisible."""
+    version, _, object_id = (token or '0').partition('.')
+    version, object_id = int(version), int(object_id) if object_id else None
+    if version < 0:
+        raise ValueError(token)
+    return version, object_id
+
+
+def changes_since(model, token, limit):
+    """
+    Modifications de `model` après `token`, par version croissante.
+
+    Retourne (lignes ChangeLog, jeton suivant, has_more). Le jeton suivant
+    désigne la dernière ligne renvoyée ; une page peut couper une version
+    (un import touche des milliers d'objets d'un coup), le jeton porte alors
+    aussi l'identifiant de l'objet.
+    """
+    version, object_id = decode_token(token)
+    pruned = SyncCounter.objects.filter(name=PRUNED).values_list('value', flat=True).first() or 0
+    if version and version < pruned:
+        raise StaleToken(token)
+
+    rows = ChangeLog.objects.filter(model=label(model))
+    if object_id is None:
+        rows = rows.filter(version__gt=version)
+    else:
+        rows = rows.filter(Q(version__gt=version) | Q(version=version, object_id__gt=object_id))
+    rows = list(rows.order_by('version', 'object_id')[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if not rows:
+        return rows, token or encode_token(0), False
+    last = rows[-1]
+    return rows, encode_token(last.version, last.object_id if has_more else None), has_more
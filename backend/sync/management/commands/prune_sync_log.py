@@ -0,0 +1,35 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from sync.log import PRUNED
+from sync.models import ChangeLog, SyncCounter
+
+
+class Command(BaseCommand):
+    help = (
+        "Purge les pierres tombales du journal de synchronisation plus anciennes que "
+        "--days jours. Un terminal dont le jeton précède la purge reçoit 410 et repart de zéro."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=90)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        with transaction.atomic():
+            tombstones = ChangeLog.objects.filter(deleted=True, changed_at__lt=cutoff)
+            watermark = tombstones.aggregate(version=Max('version'))['version']
+            if watermark is None:
+                self.stdout.write("Aucune pierre tombale à purger")
+                return
+            # Relevé avant la purge : aucun jeton plus ancien ne peut plus être servi
+            counter, _ = SyncCounter.objects.select_for_update().get_or_create(name=PRUNED)
+            if watermark > counter.value:
+                counter.value = watermark
+                counter.save(update_fields=['value'])
+            count, _ = tombstones.delete()
+        self.stdout.write(self.style.SUCCESS(f"{count} pierre(s) tombale(s) purgée(s), jetons antérieurs à {watermark} expirés"))
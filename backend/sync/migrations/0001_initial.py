@@ -0,0 +1,44 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=20, unique=True)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'sync_counters',
+            },
+        ),
+        migrations.CreateModel(
+            name='ChangeLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=50)),
+                ('object_id', models.BigIntegerField()),
+                ('version', models.BigIntegerField()),
+                ('deleted', models.BooleanField(default=False)),
+                ('changed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'sync_change_log',
+                'indexes': [models.Index(fields=['model', 'version', 'object_id'], name='sync_change_log_version_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='changelog',
+            constraint=models.UniqueConstraint(fields=('model', 'object_id'), name='sync_change_log_object_uniq'),
+        ),
+    ]
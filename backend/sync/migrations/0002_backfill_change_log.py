@@ -0,0 +1,38 @@
+from django.db import migrations
+
+SYNCED = [('products', 'Product'), ('clients', 'Client')]
+
+
+def backfill(apps, schema_editor):
+    """Objets existants en version 1 : une première synchronisation (since=0) les reçoit tous."""
+    ChangeLog = apps.get_model('sync', 'ChangeLog')
+    SyncCounter = apps.get_model('sync', 'SyncCounter')
+    for app_label, model_name in SYNCED:
+        model = apps.get_model(app_label, model_name)
+        label = f'{app_label}.{model_name.lower()}'
+        batch = []
+        for pk in model.objects.values_list('pk', flat=True).order_by('pk').iterator(chunk_size=2000):
+            batch.append(ChangeLog(model=label, object_id=pk, version=1))
+            if len(batch) >= 2000:
+                ChangeLog.objects.bulk_create(batch)
+                batch = []
+        ChangeLog.objects.bulk_create(batch)
+    SyncCounter.objects.bulk_create([SyncCounter(name='version', value=1), SyncCounter(name='pruned', value=0)])
+
+
+def clear(apps, schema_editor):
+    apps.get_model('sync', 'ChangeLog').objects.all().delete()
+    apps.get_model('sync', 'SyncCounter').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sync', '0001_initial'),
+        ('products', '0008_category_updated_at'),
+        ('clients', '0003_clients_top_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, clear),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sync', '0002_backfill_change_log'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='changelog',
+            name='version',
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.AddIndex(
+            model_name='changelog',
+            index=models.Index(condition=models.Q(('version__isnull', True)), fields=['id'], name='sync_change_log_pending_idx'),
+        ),
+    ]
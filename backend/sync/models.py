@@ -0,0 +1,42 @@
+from django.db import models
+
+
+class SyncCounter(models.Model):
+    """
+    Compteurs de sync/log.py : 'version' (dernière version attribuée) et
+    'pruned' (version en deçà de laquelle les suppressions ont été purgées).
+    """
+    name = models.CharField(max_length=20, unique=True)
+    value = models.BigIntegerField(default=0)
+    
+    class Meta:
+        db_table = 'sync_counters'
+    
+    def __str__(self):
+        return f"{self.name} = {self.value}"
+
+
+class ChangeLog(models.Model):
+    """
+    Dernière modification connue de chaque objet synchronisé ; deleted = pierre
+    tombale. version NULL : modification pas encore numérotée (sync/log.py).
+    """
+    model = models.CharField(max_length=50)
+    object_id = models.BigIntegerField()
+    version = models.BigIntegerField(null=True)
+    deleted = models.BooleanField(default=False)
+    changed_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'sync_change_log'
+        constraints = [
+            models.UniqueConstraint(fields=['model', 'object_id'], name='sync_change_log_object_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['model', 'version', 'object_id'], name='sync_change_log_version_idx'),
+            models.Index(fields=['id'], condition=models.Q(version__isnull=True), name='sync_change_log_pending_idx'),
+        ]
+    
+    def __str__(self):
+        state = 'supprimé' if self.deleted else 'modifié'
+        return f"{self.model} {self.object_id} {state} (v{self.version})"
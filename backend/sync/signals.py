@@ -0,0 +1,41 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from clients.models import Client
+from inventory.models import Store, StoreStock
+from products.models import Category, Product
+from .log import record_changes
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Client)
+def record_saved(sender, instance, **kwargs):
+    record_changes(sender, [instance.pk])
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Client)
+def record_deleted(sender, instance, **kwargs):
+    record_changes(sender, [instance.pk], deleted=True)
+
+
+# Données lues par la représentation des produits
+
+@receiver(post_save, sender=StoreStock)
+def record_store_stock(sender, instance, **kwargs):
+    record_changes(Product, [instance.product_id])
+
+
+@receiver(post_save, sender=Category)
+@receiver(pre_delete, sender=Category)
+def record_category_products(sender, instance, **kwargs):
+    # category_name, ou catégorie mise à NULL par la suppression
+    record_changes(Product, instance.products.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Store)
+@receiver(post_delete, sender=Store)
+def record_store_products(sender, instance, created=True, **kwargs):
+    # Un champ stock_<magasin> de plus ou de moins sur chaque produit
+    if created:
+        record_changes(Product, Product.objects.values_list('pk', flat=True))
@@ -0,0 +1,71 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.test import TestCase
+
+from products.models import Category, Product
+from .log import assign_versions, changes_since, record_changes
+from .models import ChangeLog, SyncCounter
+
+
+class ChangeLogTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Pièces')
+        cls.products = Product.objects.bulk_create([
+            Product(reference=f'SYNC-{i}', name=f'Produit {i}', category=category,
+                    price_ht=Decimal('5.00'), price_ttc=Decimal('6.00'))
+            for i in range(3)
+        ])
+        with cls.captureOnCommitCallbacks(execute=True):
+            record_changes(Product, [product.pk for product in cls.products])
+
+    def versions(self):
+        return dict(ChangeLog.objects.filter(object_id__in=[p.pk for p in self.products])
+                    .values_list('object_id', 'version'))
+
+    def test_version_assigned_after_commit(self):
+        start = SyncCounter.objects.get(name='version').value
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with transaction.atomic():
+                record_changes(Product, [self.products[1].pk, self.products[0].pk])
+                # Pas de verrou du compteur dans la transaction de l'écriture
+                self.assertEqual(SyncCounter.objects.get(name='version').value, start)
+                self.assertIsNone(self.versions()[self.products[0].pk])
+                rows, _, _ = changes_since(Product, str(start), 100)
+                self.assertNotIn(self.products[0].pk, [row.object_id for row in rows])
+        self.assertTrue(callbacks)
+        versions = self.versions()
+        self.assertEqual(versions[self.products[0].pk], start + 1)
+        self.assertEqual(versions[self.products[1].pk], start + 1)
+        self.assertLess(versions[self.products[2].pk], start + 1)
+
+    def test_one_callback_per_transaction(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            for product in self.products:
+                record_changes(Product, [product.pk])
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(len(set(self.versions().values())), 1)
+
+        # Callback retiré avec le savepoint annulé : inscrit de nouveau
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with transaction.atomic():
+                record_changes(Product, [self.products[0].pk])
+                transaction.set_rollback(True)
+            record_changes(Product, [self.products[1].pk])
+        self.assertEqual(len(callbacks), 1)
+        self.assertIsNotNone(self.versions()[self.products[1].pk])
+
+    def test_pending_rows_numbered_by_next_change(self):
+        # Processus interrompu entre le commit et la numérotation
+        ChangeLog.objects.filter(model='products.product', object_id=self.products[0].pk).update(version=None)
+        with self.captureOnCommitCallbacks(execute=True):
+            record_changes(Product, [self.products[2].pk])
+        versions = self.versions()
+        self.assertIsNotNone(versions[self.products[0].pk])
+        self.assertEqual(versions[self.products[0].pk], versions[self.products[2].pk])
+
+    def test_nothing_pending_leaves_counter(self):
+        start = SyncCounter.objects.get(name='version').value
+        self.assertIsNone(assign_versions())
+        self.assertEqual(SyncCounter.objects.get(name='version').value, start)
@@ -0,0 +1,46 @@
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from .log import StaleToken, changes_since
+
+CHANGES_DEFAULT_LIMIT = 500
+CHANGES_MAX_LIMIT = 2000
+
+
+class ChangesMixin:
+    """
+    Synchronisation différentielle : GET <liste>/changes/?since=<jeton>&limit=500
+
+    Sans ?since (ou since=0) : tout le référentiel, page par page. Réponse :
+    {"token": ..., "has_more": ..., "changed": [objets sérialisés],
+    "deleted": [identifiants]}. Le terminal rappelle avec since=token tant
+    que has_more est vrai. 410 : jeton trop ancien (purgé), repartir de zéro.
+    """
+
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        try:
+            limit = int(request.query_params.get('limit', CHANGES_DEFAULT_LIMIT))
+        except ValueError:
+            return Response({'error': 'limit invalide'}, status=status.HTTP_400_BAD_REQUEST)
+        limit = min(max(limit, 1), CHANGES_MAX_LIMIT)
+        model = self.get_queryset().model
+        try:
+            rows, token, has_more = changes_since(model, request.query_params.get('since'), limit)
+        except ValueError:
+            return Response({'error': 'Jeton invalide'}, status=status.HTTP_400_BAD_REQUEST)
+        except StaleToken:
+            return Response(
+                {'error': 'Jeton expiré : resynchronisation complète nécessaire', 'token': '0'},
+                status=status.HTTP_410_GONE,
+            )
+
+        changed_ids = [row.object_id for row in rows if not row.deleted]
+        changed = self.get_queryset().filter(pk__in=changed_ids).order_by('pk') if changed_ids else []
+        return Response({
+            'token': token,
+            'has_more': has_more,
+            'changed': self.get_serializer(changed, many=True).data,
+            'deleted': [row.object_id for row in rows if row.deleted],
+        })
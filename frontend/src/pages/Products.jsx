@@ -220,7 +220,19 @@ function ProductCard({ product, onToggleVisibility, onEdit, onDelete }) {
   return (
     <div className="bg-white rounded-xl shadow-lg overflow-hidden hover:shadow-xl transition group">
       <div className="aspect-square bg-gray-100 relative flex items-center justify-center text-6xl">
-        {product.image ? <img src={product.image} alt={product.name} className="w-full h-full object-cover" /> : '🚴'}
+        {product.images ? (
+          <picture className="w-full h-full">
+            <source type="image/webp" srcSet={product.images.srcset} sizes="(min-width: 1024px) 25vw, 50vw" />
+            <img
+              src={product.images.card}
+              srcSet={product.images.fallback_srcset}
+              sizes="(min-width: 1024px) 25vw, 50vw"
+              alt={product.name}
+              loading="lazy"
+              className="w-full h-full object-cover"
+            />
+          </picture>
+        ) : product.image ? <img src={product.image} alt={product.name} className="w-full h-full object-cover" /> : '🚴'}
         {product.is_low_stock && (
           <div className="absolute top-2 right-2 bg-red-500 text-white px-3 py-1 rounded-full text-sm font-semibold">
             Stock bas